@@ -1,22 +1,23 @@
-import json
-import requests
+import logging
 import os
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, jsonify
+
+from movectf import rpc
+
+# --- 配置日志 ---
+# 配置日志记录器，设置日志级别为INFO，并定义日志格式
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 # --- 配置常量 ---
-# SUI RPC 端点
-RPC_ENDPOINT = "https://fullnode.testnet.sui.io:443"
+# SUI RPC 端点及连接池配置见 movectf/rpc.py（环境变量 SUI_RPC_ENDPOINT 等）
 
-# SUI 交易查询选项
+# SUI 交易查询选项：校验只读取 effects.status 与 events，其余字段不再请求
 OPTIONS = {
-    "showInput": True,
-    "showRawInput": True,
     "showEffects": True,
     "showEvents": True,
-    "showObjectChanges": True,
-    "showBalanceChanges": True
 }
 
 # 合约中硬编码的 FLAG 值（可选，用于额外校验）
@@ -36,49 +37,40 @@ def check_success(tx_digest: str, github_id: str) -> bool:
     检查 SUI 交易是否成功且 github_id 匹配。
     根据提供的逻辑，它会尝试从交易事件中解析出 github_id 并进行比对。
     """
-    payload = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "sui_getTransactionBlock",
-        "params": [tx_digest, OPTIONS],
-    }
-
     try:
-        resp = requests.post(RPC_ENDPOINT, json=payload, timeout=10)
-        resp.raise_for_status()  # 如果响应状态码不是 2xx，则抛出异常
-        data = resp.json()
-
-        if "error" in data:
-            print(f"RPC error for tx_digest {tx_digest}: {data['error']}")
-            return False
+        # 通过共享的 RPC 客户端（keep-alive 连接池）查询交易
+        result = rpc.get_transaction_block(tx_digest, OPTIONS, timeout=10)
 
         # 检查交易执行是否成功
-        if data["result"]["effects"]["status"]["status"] != "success":
-            print(f"Transaction {tx_digest} status is not success.")
+        if result["effects"]["status"]["status"] != "success":
+            logger.warning(f"交易 {tx_digest} 执行状态不是 success。")
             return False
 
         # 检查事件中是否存在 github_id 并匹配
         # 这里假设 github_id 位于第一个事件的 parsedJson 字段中
-        if data["result"]["events"] and data["result"]["events"][0]["parsedJson"]:
-            parsed_github_id = data["result"]["events"][0]["parsedJson"].get("github_id")
+        if result["events"] and result["events"][0]["parsedJson"]:
+            parsed_github_id = result["events"][0]["parsedJson"].get("github_id")
             if parsed_github_id == github_id:
-                print(f"Transaction {tx_digest} successful and github_id matched: {parsed_github_id}")
+                logger.info(f"交易 {tx_digest} 执行成功，github_id 匹配: {parsed_github_id}")
                 return True
             else:
-                print(f"github_id mismatch. Expected: {github_id}, Got: {parsed_github_id}")
+                logger.warning(f"github_id 不匹配。期望: {github_id}，实际: {parsed_github_id}")
                 return False
         else:
-            print(f"No events or parsedJson found in transaction {tx_digest}.")
+            logger.warning(f"交易 {tx_digest} 中没有事件或 parsedJson。")
             return False
 
-    except requests.exceptions.RequestException as e:
-        print(f"RPC request failed: {e}")
+    except rpc.RpcResponseError as e:
+        logger.error(f"查询交易 {tx_digest} 时 RPC 返回错误: {e.error}")
+        return False
+    except rpc.RpcError as e:
+        logger.error(f"RPC 请求失败: {e}")
         return False
     except KeyError as e:
-        print(f"Missing expected key in RPC response: {e}")
+        logger.error(f"RPC 响应中缺少预期的字段: {e}")
         return False
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        logger.error(f"校验交易时发生意外错误: {e}", exc_info=True)
         return False
 
 def get_root_flag() -> str:
@@ -90,10 +82,10 @@ def get_root_flag() -> str:
         with open(ROOT_FLAG_PATH, 'r') as f:
             return f.read().strip()
     except FileNotFoundError:
-        print(f"Error: Flag file not found at {ROOT_FLAG_PATH}")
+        logger.error(f"Flag 文件未找到于 {ROOT_FLAG_PATH}。")
         return "flag{FLAG_NOT_FOUND_ON_SERVER}"
     except Exception as e:
-        print(f"Error reading flag file: {e}")
+        logger.error(f"读取 Flag 文件 {ROOT_FLAG_PATH} 失败: {e}", exc_info=True)
         return "flag{ERROR_READING_FLAG}"
     
 def get_github_id() -> str:
@@ -105,10 +97,10 @@ def get_github_id() -> str:
         with open(UUID_FILE_PATH, 'r') as f:
             return f.read().strip()
     except FileNotFoundError:
-        print(f"Error: UUID file not found at {UUID_FILE_PATH}")
+        logger.error(f"UUID 文件未找到于 {UUID_FILE_PATH}。")
         return "sahuang"
     except Exception as e:
-        print(f"Error reading UUID file: {e}")
+        logger.error(f"读取 UUID 文件 {UUID_FILE_PATH} 失败: {e}", exc_info=True)
         return "error_reading_uuid"
 
 # --- Flask 路由 ---
@@ -156,5 +148,15 @@ def index():
         flag_message=flag_message
     )
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    """
+    返回服务端运行统计（如交易缓存命中率、合并的并发查询数），便于观察 RPC 负载。
+    """
+    return jsonify(rpc.stats())
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
+    # 仅用于本地开发调试（单进程的 Flask 开发服务器）；容器中由 python3 -m movectf.serve 以生产配置启动，
+    # 每个 worker 启动后各自预热 RPC 连接（见 movectf/serve.py）
+    rpc.warm_up_in_background()
+    app.run(host="0.0.0.0", port=8080, debug=os.getenv("FLASK_DEBUG") == "1")
\ No newline at end of file
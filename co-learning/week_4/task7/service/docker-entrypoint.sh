@@ -12,5 +12,5 @@ chmod 744 /uuid
 chmod -R 755 /app
 
 
-# 启动Flask应用交互
-cd /app && python3 app.py
\ No newline at end of file
+# 以生产配置启动（gunicorn 预先 fork 的 worker，见 movectf/serve.py）；exec 使 SIGTERM 直接送达服务以便优雅退出
+cd /app && exec python3 -m movectf.serve
\ No newline at end of file
@@ -0,0 +1,19 @@
+import logging
+import os
+
+from movectf import engine
+
+# --- 配置日志 ---
+# 配置日志记录器，设置日志级别为INFO，并定义日志格式
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# --- 创建应用 ---
+# 题目的合约目录、校验规则、页面模板与 Flag 校验方式见同目录下的 challenge.toml，服务逻辑见 movectf/engine.py。
+# CHALLENGE_CONFIG 可列出多个题目的配置文件，在同一进程中托管多个题目（每个题目挂载在 /<name>/ 下）。
+# asgi_app 为 ASGI 入口（如 uvicorn app:asgi_app）：提交校验走异步路径，等待 RPC 时不占用线程；其余路由仍由 Flask 处理
+app, asgi_app = engine.create_app()
+
+if __name__ == "__main__":
+    # 仅用于本地开发调试（单进程的 Flask 开发服务器）；容器中由 python3 -m movectf.serve 以生产配置启动，
+    # 见 movectf/serve.py
+    app.run(host="0.0.0.0", port=8080, debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,6 @@
+"""
+cyclens movectf 题目服务的共享模块。
+
+只在 platform_template 中维护（pyproject.toml），题目镜像构建时以命名构建上下文传入 platform_template
+并用 pip 安装本包，题目目录中不再保留副本。
+"""
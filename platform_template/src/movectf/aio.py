@@ -0,0 +1,197 @@
+"""
+基于 asyncio 的 Sui JSON-RPC 客户端（需要安装 httpx）。
+
+供 ASGI 入口中的异步校验路径使用：等待全节点响应时不占用线程，
+单个进程可以同时持有大量在途校验。端点的健康状态、交易缓存与同步客户端（rpc.py）共享，
+同一交易的并发查询同样只发出一次 RPC。
+"""
+import asyncio
+import itertools
+import logging
+import time
+
+from . import rpc
+from .cache import cache_key, tx_cache
+from .decode import RESPONSE_DECODERS
+from .resilience import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSuiRpcClient:
+    """
+    异步 Sui JSON-RPC 客户端，需在同一个事件循环中使用。
+    """
+
+    def __init__(self, sync_client: rpc.SuiRpcClient, pool_size: int = rpc.RPC_POOL_SIZE, http2: bool = rpc.RPC_HTTP2):
+        import httpx
+
+        if http2:
+            try:
+                import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+            except ImportError:
+                logger.warning("未安装 httpx[http2]，异步 RPC 客户端回退到 HTTP/1.1。")
+                http2 = False
+        self._httpx = httpx
+        self._sync = sync_client
+        self._ids = itertools.count(1)
+        hosts = len(sync_client.endpoints)
+        limits = httpx.Limits(max_connections=pool_size * hosts, max_keepalive_connections=pool_size * hosts)
+        self._client = httpx.AsyncClient(http2=http2, limits=limits)
+        # 在途请求超过连接数时先在这里排队：httpcore 每分配一次连接都要扫描整个等待队列，
+        # 数十个请求排在连接池里时这部分开销超过了请求本身
+        self._slots = asyncio.Semaphore(pool_size * hosts)
+
+    async def call(self, method: str, params: list, timeout: float = None):
+        """
+        调用 JSON-RPC 方法并返回 result 字段。时间预算、重试与熔断策略以及异常类型
+        与 rpc.SuiRpcClient.call 相同。
+        """
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        deadline = Deadline(timeout or self._sync.timeout)
+        decode = RESPONSE_DECODERS.get(method)
+        attempt = 0
+        while True:
+            ranked = self._sync._ranked()
+            attempt_timeout = deadline.attempt_timeout(rpc.RPC_ATTEMPT_TIMEOUT)
+            try:
+                if self._sync.hedge and len(ranked) > 1 and method not in rpc._NO_HEDGE_METHODS:
+                    data = await self._post_hedged(ranked[0], ranked[1], payload, attempt_timeout, decode)
+                else:
+                    data = await self._post_with_failover(ranked, payload, attempt_timeout, decode)
+                break
+            except rpc.RpcError as e:
+                delay = self._sync._retry_delay(method, attempt, e, deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+        if "error" in data:
+            raise rpc.RpcResponseError(data["error"])
+        return data.get("result")
+
+    async def _post(self, endpoint, payload: dict, timeout: float, decode=None) -> dict:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError as e:
+            raise rpc.RpcTimeout(f"等待 RPC 连接超时（{timeout:.1f} 秒）") from e
+        start = time.monotonic()
+        try:
+            try:
+                resp = await self._client.post(endpoint.url, json=payload, timeout=timeout)
+            finally:
+                self._slots.release()
+            resp.raise_for_status()
+            data = decode(resp.content) if decode else resp.json()
+        except self._httpx.TimeoutException as e:
+            self._record(endpoint, start, ok=False)
+            raise rpc.RpcTimeout(str(e)) from e
+        except self._httpx.HTTPStatusError as e:
+            self._record(endpoint, start, ok=False, throttled=e.response.status_code == 429)
+            raise rpc.RpcError(str(e), status=e.response.status_code) from e
+        except (self._httpx.HTTPError, ValueError) as e:
+            self._record(endpoint, start, ok=False)
+            raise rpc.RpcError(str(e)) from e
+        self._record(endpoint, start, ok=True)
+        return data
+
+    def _record(self, endpoint, start: float, ok: bool, throttled: bool = False):
+        with self._sync._lock:
+            endpoint.record(time.monotonic() - start, ok=ok, throttled=throttled)
+
+    async def _post_with_failover(self, ranked: list, payload: dict, timeout: float, decode=None) -> dict:
+        # 最健康的端点失败时，转到次优端点再试一次
+        for i, endpoint in enumerate(ranked[:2]):
+            try:
+                return await self._post(endpoint, payload, timeout, decode)
+            except rpc.RpcError as e:
+                if i == len(ranked[:2]) - 1:
+                    raise
+                logger.warning(f"RPC 端点 {endpoint.url} 请求失败，切换到 {ranked[i + 1].url}: {e}")
+
+    async def _post_hedged(self, primary, secondary, payload: dict, timeout: float, decode=None) -> dict:
+        first = asyncio.ensure_future(self._post(primary, payload, timeout, decode))
+        done, _ = await asyncio.wait({first}, timeout=self._sync._hedge_delay(primary, timeout))
+        if done and first.exception() is None:
+            return first.result()
+
+        # 主请求超过对冲延迟仍未返回（或已失败），向次优端点发出第二个请求，取先成功的结果
+        with self._sync._lock:
+            self._sync._hedges += 1
+        second = asyncio.ensure_future(self._post(secondary, payload, timeout, decode))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_client = None
+
+# 同一交易（哈希 + 查询选项）的在途异步查询
+_tx_inflight = {}
+
+
+def get_async_client() -> AsyncSuiRpcClient:
+    """返回进程内共享的异步 RPC 客户端，首次调用时创建。"""
+    global _client
+    if _client is None:
+        _client = AsyncSuiRpcClient(rpc.get_client())
+    return _client
+
+
+async def get_transaction_block(tx_digest: str, options: dict, timeout: float = None):
+    """
+    sui_getTransactionBlock 的异步版本：先查交易缓存，同一交易的并发查询共享一次 RPC。
+    交易缓存的共享层（sqlite / kv 后端）在线程池中读写，后端变慢时不阻塞事件循环上的其他校验。
+    返回的字典可能被多个请求共享，调用方不应修改它。
+    """
+    result = tx_cache.get_memory(tx_digest, options)
+    if result is None:
+        if tx_cache.uses_shared():
+            result = await asyncio.get_running_loop().run_in_executor(None, tx_cache.get_shared, tx_digest, options)
+        else:
+            result = tx_cache.get_shared(tx_digest, options)
+    if result is not None:
+        return result
+
+    key = cache_key(tx_digest, options)
+    task = _tx_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_transaction_block(tx_digest, options, timeout))
+        _tx_inflight[key] = task
+        task.add_done_callback(lambda _: _tx_inflight.pop(key, None))
+    # shield：某个调用者被取消（如客户端断开）时不影响其他等待同一结果的调用者
+    return await asyncio.shield(task)
+
+
+async def _fetch_transaction_block(tx_digest: str, options: dict, timeout: float):
+    result = await get_async_client().call("sui_getTransactionBlock", [tx_digest, options], timeout=timeout)
+    if tx_cache.put(tx_digest, options, result, shared=False) and tx_cache.uses_shared():
+        # 不等待共享层写入完成，结果立即返回给等待的请求（写入失败只记录日志，见 movectf/state.py）
+        asyncio.get_running_loop().run_in_executor(None, tx_cache.put_shared, tx_digest, options, result)
+    return result
+
+
+async def close():
+    """关闭异步客户端（ASGI lifespan shutdown 时调用）。"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
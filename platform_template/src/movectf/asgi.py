@@ -0,0 +1,249 @@
+"""
+题目服务的 ASGI 入口。
+
+指定的路由（如提交校验的 POST /）由异步处理函数直接处理，等待 RPC 时不占用线程；
+其余路由交给原有的 Flask 应用，在固定大小的线程池中执行（ASGI_WSGI_THREADS）。
+需要安装 httpx 以及一个 ASGI 服务器（如 uvicorn）：
+
+    uvicorn app:asgi_app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from . import aio
+
+logger = logging.getLogger(__name__)
+
+# 异步路由允许的最大请求体（表单提交只有交易哈希等少量字段）
+MAX_FORM_BYTES = 64 * 1024
+
+# 交给 Flask 的请求允许的最大请求体（批量校验接口的 JSON 较大）
+MAX_WSGI_BODY_BYTES = 16 * 1024 * 1024
+
+# 执行 Flask 路由的线程数（部署事件流在连接期间各占用一个线程）
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+
+
+class AsgiApp:
+    """
+    把异步路由与 Flask（WSGI）应用组合成一个 ASGI 应用。
+
+    async_routes: {(方法, 路径): async handler(form: dict) -> str}，handler 返回 HTML，
+    返回 None 时该请求（连同已读取的请求体）交给 Flask 处理（如租户不存在时由 Flask 返回 404）；
+    也可以是 resolver(方法, 路径) -> handler 或 None，用于路径中带参数（如租户令牌）的路由。
+    resolver 在事件循环中调用，不能阻塞（不能读取数据库等）。
+    """
+
+    def __init__(self, wsgi_app, async_routes: dict, threads: int = ASGI_WSGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.async_routes = async_routes
+        self.threads = max(1, threads)
+        self._executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            handler = self._route(scope["method"], scope["path"])
+            if handler is not None and _is_urlencoded(scope):
+                await self._handle(handler, scope, receive, send)
+                return
+
+        if scope["type"] == "http":
+            await self._call_wsgi(scope, receive, send)
+
+    async def _call_wsgi(self, scope, receive, send, body: bytes = None):
+        """
+        在线程池中执行 Flask，响应体逐块发回（部署事件流依赖逐块发送）。body 为已读取的请求体。
+        不使用 asgiref 的 WsgiToAsgi：它默认把所有同步调用放进同一个线程串行执行，
+        在 uvicorn 的 keep-alive 连接上还会偶发 "CurrentThreadExecutor already quit" 错误。
+        """
+        if body is None:
+            body = await _read_body(receive, MAX_WSGI_BODY_BYTES)
+        if body is None:
+            await _send(send, 413, "text/plain; charset=utf-8", "请求体过大。")
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="asgi-wsgi")
+
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        disconnected = threading.Event()
+        watcher = asyncio.ensure_future(_watch_disconnect(receive, disconnected))
+        future = loop.run_in_executor(self._executor, self._run_wsgi, _environ(scope, body),
+                                      lambda message: loop.call_soon_threadsafe(messages.put_nowait, message),
+                                      disconnected)
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                await send(message)
+            await future
+        finally:
+            disconnected.set()
+            watcher.cancel()
+
+    def _run_wsgi(self, environ: dict, put, disconnected: threading.Event):
+        """在工作线程中调用 Flask，把 ASGI 消息交给 put；结束时放入 None。客户端断开后停止读取响应体。"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+            }
+
+        started = False
+        try:
+            iterable = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in iterable:
+                    if not chunk:
+                        continue
+                    if not started:
+                        put(response["start"])
+                        started = True
+                    put({"type": "http.response.body", "body": chunk, "more_body": True})
+                    if disconnected.is_set():
+                        break
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+            if not started:
+                put(response["start"])
+            put({"type": "http.response.body", "body": b""})
+        except Exception as e:
+            logger.critical(f"Flask 路由处理失败: {e}", exc_info=True)
+            if not started:
+                body = "服务器内部错误。".encode("utf-8")
+                put({"type": "http.response.start", "status": 500,
+                     "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                                 (b"content-length", str(len(body)).encode())]})
+                put({"type": "http.response.body", "body": body})
+            else:
+                put({"type": "http.response.body", "body": b""})
+        finally:
+            put(None)
+
+    def _route(self, method: str, path: str):
+        if callable(self.async_routes):
+            return self.async_routes(method, path)
+        return self.async_routes.get((method, path))
+
+    async def _handle(self, handler, scope, receive, send):
+        body = await _read_body(receive)
+        if body is None:
+            await _send(send, 413, "text/plain; charset=utf-8", "请求体过大。")
+            return
+        form = dict(parse_qsl(body.decode("utf-8", "replace"), keep_blank_values=True))
+        try:
+            html = await handler(form)
+        except Exception as e:
+            logger.critical(f"异步路由处理失败: {e}", exc_info=True)
+            await _send(send, 500, "text/plain; charset=utf-8", "服务器内部错误。")
+            return
+        if html is None:
+            await self._call_wsgi(scope, receive, send, body)
+            return
+        await _send(send, 200, "text/html; charset=utf-8", html)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aio.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _is_urlencoded(scope) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"content-type":
+            return value.split(b";")[0].strip() == b"application/x-www-form-urlencoded"
+    return False
+
+
+async def _read_body(receive, limit: int = MAX_FORM_BYTES):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _watch_disconnect(receive, disconnected: threading.Event):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            disconnected.set()
+            return
+
+
+def _environ(scope, body: bytes) -> dict:
+    """由 ASGI scope 构造 WSGI environ（PEP 3333）。"""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1")
+        value = value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        elif name != "content-length":
+            key = "HTTP_" + name.upper().replace("-", "_")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _send(send, status: int, content_type: str, text: str):
+    body = text.encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_asgi_app(wsgi_app, async_routes: dict) -> AsgiApp:
+    """创建 ASGI 应用。依赖（httpx）在首次处理请求时才导入，不影响 Flask 开发服务器。"""
+    return AsgiApp(wsgi_app, async_routes)
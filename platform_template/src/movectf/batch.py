@@ -0,0 +1,154 @@
+"""
+批量校验交易。
+
+评审在事故后需要重新核验大量已提交的交易时，不必再逐个通过网页表单提交：
+交易列表按 sui_multiGetTransactionBlocks 的上限分块，多个分块以有限并发查询，
+每笔交易再交给题目自身的校验规则（movectf/engine.py 中 Challenge.check_transaction），结果逐条返回。
+
+命令行用法（在题目的 /app 目录下运行）：
+    python3 -m movectf.batch items.jsonl [--config challenge.toml] [--concurrency 4]
+输入为 JSON 数组或每行一个 JSON 对象：{"tx_digest": ..., "package_id": ..., "github_id": ...}，
+package_id / github_id 缺省时使用当前服务的部署合约和 GitHub ID。结果以 NDJSON 输出到标准输出。
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import rpc
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 批量校验接口的访问令牌（请求头 Authorization: Bearer <token>），未设置时接口关闭
+BATCH_VERIFY_TOKEN = os.getenv("BATCH_VERIFY_TOKEN", "")
+
+# 同时进行的 multiGet 分块查询数，避免占满公共全节点的速率限制
+BATCH_CONCURRENCY = int(os.getenv("BATCH_VERIFY_CONCURRENCY", "4"))
+
+# 单次批量校验允许的最大交易数
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_VERIFY_MAX_ITEMS", "5000"))
+
+
+def is_authorized(auth_header: str) -> bool:
+    """检查请求头中的访问令牌。未配置 BATCH_VERIFY_TOKEN 时一律拒绝。"""
+    if not BATCH_VERIFY_TOKEN or not auth_header:
+        return False
+    return hmac.compare_digest(auth_header, f"Bearer {BATCH_VERIFY_TOKEN}")
+
+
+def parse_items(raw, default_package_id: str, default_github_id: str, required: bool = False) -> list:
+    """
+    规范化批量校验的输入列表，缺省字段使用当前服务的值；required 为 True 时（多租户模式没有当前实例）
+    每一项都必须给出 package_id 与 github_id。
+    输入不合法时抛出 ValueError。
+    """
+    if not isinstance(raw, list):
+        raise ValueError("items 必须是列表。")
+    if len(raw) > BATCH_MAX_ITEMS:
+        raise ValueError(f"单次最多校验 {BATCH_MAX_ITEMS} 笔交易。")
+    items = []
+    for i, entry in enumerate(raw):
+        if isinstance(entry, str):
+            entry = {"tx_digest": entry}
+        if not isinstance(entry, dict) or not isinstance(entry.get("tx_digest"), str) or not entry["tx_digest"].strip():
+            raise ValueError(f"第 {i + 1} 项缺少 tx_digest。")
+        if required and not (entry.get("package_id") and entry.get("github_id")):
+            raise ValueError(f"第 {i + 1} 项缺少 package_id 或 github_id（多租户模式下必须逐项给出）。")
+        items.append({
+            "tx_digest": entry["tx_digest"].strip(),
+            "package_id": entry.get("package_id") or default_package_id,
+            "github_id": entry.get("github_id") or default_github_id,
+        })
+    return items
+
+
+def _verify_chunk(chunk: list, check_fn, options: dict) -> list:
+    try:
+        details = rpc.multi_get_transaction_blocks([item["tx_digest"] for item in chunk], options)
+    except rpc.RpcUnavailable as e:
+        return [dict(item, success=False, message=str(e)) for item in chunk]
+    except rpc.RpcError as e:
+        logger.error(f"批量查询交易失败 ({len(chunk)} 笔): {e}")
+        return [dict(item, success=False, message="无法获取交易详情，RPC 请求失败。") for item in chunk]
+
+    results = []
+    for item in chunk:
+        tx_details = details.get(item["tx_digest"])
+        if not item["package_id"]:
+            success, message = False, "未指定 package_id，且服务器尚未部署挑战合约。"
+        elif not tx_details:
+            success, message = False, "无法获取交易详情，请检查交易哈希是否正确。"
+        else:
+            try:
+                success, message = check_fn(item["tx_digest"], tx_details, item["github_id"], item["package_id"])
+            except Exception as e:
+                logger.critical(f"批量校验交易 {item['tx_digest']} 时发生意外错误: {e}", exc_info=True)
+                success, message = False, f"校验时发生意外错误: {e}"
+        results.append(dict(item, success=success, message=message))
+    return results
+
+
+def verify_batch(items: list, check_fn, options: dict, concurrency: int = BATCH_CONCURRENCY):
+    """
+    批量校验交易，按分块完成的顺序逐条产出结果字典
+    （在输入项的基础上增加 success 与 message 字段）。
+
+    check_fn(tx_digest, tx_details, github_id, package_id) -> (bool, str) 为题目的校验规则。
+    """
+    chunk_size = rpc.MULTI_GET_MAX_DIGESTS
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-verify")
+    try:
+        futures = [pool.submit(_verify_chunk, chunk, check_fn, options) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # 客户端中途断开时不再查询剩余分块
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def to_ndjson(results):
+    """把结果迭代器转换为 NDJSON 行，用于流式响应。"""
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def _read_items(path: str) -> list:
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="批量校验提交的交易哈希。")
+    parser.add_argument("items", help="输入文件（JSON 数组或 JSON Lines），- 表示标准输入")
+    parser.add_argument("--config", default=None, help="题目配置文件（默认 CHALLENGE_CONFIG 中的第一个）")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="并发的 multiGet 分块数")
+    args = parser.parse_args(argv)
+
+    from . import engine
+
+    challenge = engine.Challenge(engine.load_config(args.config or engine.config_paths()[0], env_overrides=True))
+    challenge.load_state()
+    try:
+        items = parse_items(_read_items(args.items), challenge.tenant.package_id, challenge.tenant.github_id)
+    except (OSError, ValueError) as e:
+        print(f"读取输入失败: {e}", file=sys.stderr)
+        return 2
+
+    passed = 0
+    for result in verify_batch(items, challenge.check_transaction, challenge.transaction_options, args.concurrency):
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+        passed += result["success"]
+    print(f"共校验 {len(items)} 笔交易，通过 {passed} 笔。", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+选择性解码的基准测试。
+
+构造一个带有大量对象变更与大段交易输入的 sui_getTransactionBlock 响应
+（以及对应大小的 `sui client publish --json` 输出），分别用标准库 json 完整解析
+与 decode.py 中的选择性解码各运行若干次，输出平均耗时与峰值内存。
+
+    python3 -m movectf.bench_decode [--object-changes 2000] [--rounds 50]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from . import decode
+
+
+def _make_transaction_block(object_changes: int) -> dict:
+    package_id = "0x" + "ab" * 32
+    return {
+        "digest": "9Xkq" + "1" * 40,
+        "checkpoint": "123456789",
+        "transaction": {
+            "data": {
+                "messageVersion": "v1",
+                "transaction": {
+                    "kind": "ProgrammableTransaction",
+                    "inputs": [
+                        {"type": "pure", "valueType": "vector<u8>", "value": list(range(256))}
+                        for _ in range(object_changes // 10 + 1)
+                    ],
+                    "transactions": [
+                        {"MoveCall": {"package": package_id, "module": "challenge", "function": "get_flag",
+                                      "arguments": [{"Input": i} for i in range(8)]}}
+                        for _ in range(object_changes // 10 + 1)
+                    ],
+                },
+                "sender": "0x" + "cd" * 32,
+                "gasData": {"payment": [{"objectId": "0x" + "ef" * 32, "version": 1, "digest": "D" * 44}],
+                            "owner": "0x" + "cd" * 32, "price": "750", "budget": "100000000"},
+            },
+            "txSignatures": ["A" * 132],
+        },
+        "effects": {
+            "messageVersion": "v1",
+            "status": {"status": "success"},
+            "transactionDigest": "9Xkq" + "1" * 40,
+            "gasUsed": {"computationCost": "1000000", "storageCost": "2000000",
+                        "storageRebate": "0", "nonRefundableStorageFee": "0"},
+            "mutated": [{"owner": {"AddressOwner": "0x" + "cd" * 32},
+                         "reference": {"objectId": "0x%064x" % i, "version": i, "digest": "E" * 44}}
+                        for i in range(object_changes)],
+        },
+        "events": [{
+            "id": {"txDigest": "9Xkq" + "1" * 40, "eventSeq": "0"},
+            "packageId": package_id,
+            "transactionModule": "challenge",
+            "sender": "0x" + "cd" * 32,
+            "type": f"{package_id}::challenge::FlagEvent",
+            "parsedJson": {"github_id": "gh", "flag": "CTF{MoveCTF-Task2}", "success": True},
+            "bcs": "B" * 120,
+        }],
+        "objectChanges": [
+            {"type": "published", "packageId": package_id, "version": "1", "digest": "P" * 44,
+             "modules": ["challenge"] * 20},
+        ] + [
+            {"type": "created", "sender": "0x" + "cd" * 32, "owner": {"Shared": {"initial_shared_version": i}},
+             "objectType": f"{package_id}::challenge::Item", "objectId": "0x%064x" % i,
+             "version": str(i), "digest": "O" * 44}
+            for i in range(object_changes)
+        ],
+    }
+
+
+def _measure(fn, payload, rounds: int) -> tuple[float, int]:
+    fn(payload)  # 预热
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(payload)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    result = fn(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="比较完整 JSON 解析与选择性解码的耗时和内存。")
+    parser.add_argument("--object-changes", type=int, default=2000, help="构造的对象变更数量")
+    parser.add_argument("--rounds", type=int, default=50, help="每种解析方式的运行次数")
+    args = parser.parse_args(argv)
+
+    if decode.msgspec is None:
+        print("未安装 msgspec，选择性解码不可用（pip install msgspec）。")
+        return 1
+
+    tx_block = _make_transaction_block(args.object_changes)
+    rpc_response = json.dumps({"jsonrpc": "2.0", "id": 1, "result": tx_block}).encode()
+    publish_output = json.dumps(tx_block)
+
+    cases = [
+        (f"sui_getTransactionBlock 响应 ({len(rpc_response) / 1024:.0f} KiB)",
+         rpc_response, json.loads, decode.decode_transaction_response),
+        (f"sui client publish --json 输出 ({len(publish_output) / 1024:.0f} KiB)",
+         publish_output, json.loads, decode.loads_publish_output),
+    ]
+    for title, payload, full, selective in cases:
+        print(title)
+        full_time, full_peak = _measure(full, payload, args.rounds)
+        sel_time, sel_peak = _measure(selective, payload, args.rounds)
+        print(f"  json.loads  平均 {full_time * 1000:8.2f} ms  峰值内存 {full_peak / 1024:8.0f} KiB")
+        print(f"  选择性解码  平均 {sel_time * 1000:8.2f} ms  峰值内存 {sel_peak / 1024:8.0f} KiB")
+        print(f"  耗时降低 {full_time / sel_time:.1f}x，峰值内存降低 {full_peak / max(sel_peak, 1):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
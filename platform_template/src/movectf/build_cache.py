@@ -0,0 +1,143 @@
+"""
+Move 构建产物缓存。
+
+`sui client publish` 每次都会重新解析依赖并编译合约。这里把
+`sui move build --dump-bytecode-as-base64` 的输出（编译后的模块与依赖包 ID）
+按合约内容哈希（sources/、Move.toml、Move.lock）与 Sui CLI 版本缓存到磁盘，
+发布时直接使用缓存的字节码，命中时完全跳过编译器。
+
+镜像构建时可预先生成缓存（在 /app 目录下）：
+    python3 -m movectf.build_cache --contract move_contract
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 构建产物缓存目录
+BUILD_CACHE_DIR = os.getenv("BUILD_CACHE_DIR", ".build_cache")
+
+# 参与内容哈希的合约文件：源码目录与清单文件
+_CONTRACT_FILES = ("Move.toml", "Move.lock")
+_CONTRACT_DIRS = ("sources",)
+
+_lock = threading.Lock()
+_sui_version = None
+_stats = {"hits": 0, "misses": 0}
+
+
+def contract_digest(contract_path: str) -> str:
+    """
+    合约内容的哈希（sources/ 下的 .move 文件以及 Move.toml、Move.lock）。
+    用于判断预发布的包或构建产物是否仍对应当前的合约源码。
+    """
+    h = hashlib.sha256()
+    paths = [name for name in _CONTRACT_FILES if os.path.isfile(os.path.join(contract_path, name))]
+    for directory in _CONTRACT_DIRS:
+        for root, dirs, files in os.walk(os.path.join(contract_path, directory)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".move"):
+                    paths.append(os.path.relpath(os.path.join(root, name), contract_path))
+    for relpath in paths:
+        h.update(relpath.replace(os.sep, "/").encode() + b"\0")
+        with open(os.path.join(contract_path, relpath), "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+class BuildError(Exception):
+    """编译失败或 Sui CLI 输出无法解析。"""
+
+
+def _get_sui_version() -> str:
+    """Sui CLI 版本（编译结果依赖编译器版本），进程内只查询一次。"""
+    global _sui_version
+    if _sui_version is None:
+        try:
+            process = subprocess.run(["sui", "--version"], capture_output=True, text=True, check=True, encoding="utf-8")
+            _sui_version = process.stdout.strip()
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise BuildError(f"无法获取 Sui CLI 版本: {e}") from e
+    return _sui_version
+
+
+def cache_key(contract_path: str) -> str:
+    """合约内容哈希 + Sui CLI 版本。"""
+    return hashlib.sha256(f"{contract_digest(contract_path)}|{_get_sui_version()}".encode()).hexdigest()
+
+
+def _build(contract_path: str) -> dict:
+    command = ["sui", "move", "build", "--dump-bytecode-as-base64", "--path", contract_path]
+    logger.info(f"编译 Move 合约: {' '.join(command)}")
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, check=True, encoding="utf-8")
+    except subprocess.CalledProcessError as e:
+        raise BuildError(f"编译失败: {e.stderr or e.stdout}") from e
+    except OSError as e:
+        raise BuildError(f"无法执行 Sui CLI: {e}") from e
+    try:
+        # 构建日志输出到 stderr，stdout 的最后一行是 JSON
+        artifacts = json.loads(process.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError) as e:
+        raise BuildError(f"无法解析编译输出: {e}. 原始输出: {process.stdout}") from e
+    if not artifacts.get("modules"):
+        raise BuildError("编译输出中没有模块。")
+    return {"modules": artifacts["modules"], "dependencies": artifacts.get("dependencies", [])}
+
+
+def load_or_build(contract_path: str) -> dict:
+    """
+    返回 {"modules": [base64 字节码], "dependencies": [依赖包 ID], "key": 缓存键}。
+    缓存命中时不调用编译器；编译失败时抛出 BuildError。
+    """
+    key = cache_key(contract_path)
+    path = os.path.join(BUILD_CACHE_DIR, f"{key}.json")
+    with _lock:
+        try:
+            with open(path, encoding="utf-8") as f:
+                artifacts = json.load(f)
+            _stats["hits"] += 1
+            return dict(artifacts, key=key)
+        except (OSError, ValueError):
+            pass
+
+        _stats["misses"] += 1
+        artifacts = _build(contract_path)
+        os.makedirs(BUILD_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(artifacts, f)
+        os.replace(tmp_path, path)
+        logger.info(f"已缓存构建产物 {path}（{len(artifacts['modules'])} 个模块）。")
+        return dict(artifacts, key=key)
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats, dir=BUILD_CACHE_DIR)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="预先编译 Move 合约并写入构建产物缓存。")
+    parser.add_argument("--contract", default=os.getenv("MOVE_CONTRACT_PATH", "./move_contract"), help="合约项目目录")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        artifacts = load_or_build(args.contract)
+    except BuildError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"{artifacts['key']}: {len(artifacts['modules'])} 个模块，依赖 {', '.join(artifacts['dependencies'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+已终结交易查询结果的分层缓存。
+
+已进入 checkpoint 且执行成功的交易永远不会再变化，因此同一个交易哈希被重复提交
+或刷新时，可以直接复用之前的 sui_getTransactionBlock 结果：
+先查进程内 LRU（内存层），再查共享状态后端（共享层，见 movectf/state.py）：
+多个 worker 进程共用查询结果，使用 sqlite / kv 后端时服务重启后仍然有效。
+共享层的记录 SUI_TX_CACHE_TTL 秒后过期，状态数据库（或 kv 服务的内存）不会随已校验的交易数无限增长。
+RPC 失败、交易尚未找到或尚未终结的结果一律不缓存。
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from . import state
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 内存层最多缓存的交易条数，设为 0 关闭缓存
+TX_CACHE_SIZE = int(os.getenv("SUI_TX_CACHE_SIZE", "1024"))
+
+# 是否使用共享层（1 开启）；后端为 memory 时只使用内存层
+TX_CACHE_SHARED = os.getenv("SUI_TX_CACHE_SHARED", "1") == "1"
+
+# 共享层记录的保留时间（秒）
+TX_CACHE_TTL = float(os.getenv("SUI_TX_CACHE_TTL", "3600"))
+
+
+def cache_key(tx_digest: str, options: dict) -> str:
+    # 查询选项不同，返回的字段也不同，因此选项集合是键的一部分
+    return f"{tx_digest}|{json.dumps(options, sort_keys=True, separators=(',', ':'))}"
+
+
+def is_cacheable(result) -> bool:
+    """只有执行成功且已进入 checkpoint（已终结）的交易结果才允许缓存。"""
+    if not isinstance(result, dict) or result.get("checkpoint") is None:
+        return False
+    effects = result.get("effects") or {}
+    return effects.get("status", {}).get("status") == "success"
+
+
+class TransactionCache:
+    """
+    两级交易缓存，线程安全。
+    """
+
+    def __init__(self, max_size: int = TX_CACHE_SIZE, shared: bool = TX_CACHE_SHARED, ttl: float = TX_CACHE_TTL):
+        self.max_size = max_size
+        self.shared = shared
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._store = None  # 共享层，首次使用时打开（False 表示不使用）
+
+    def _shared_store(self):
+        if self._store is None:
+            store = state.backend() if self.shared else None
+            # 只在本进程内有效的后端与内存层重复，不使用
+            self._store = store if store is not None and store.shared else False
+        return self._store or None
+
+    def get(self, tx_digest: str, options: dict):
+        """返回缓存的交易结果，未命中返回 None。"""
+        result = self.get_memory(tx_digest, options)
+        return result if result is not None else self.get_shared(tx_digest, options)
+
+    def get_memory(self, tx_digest: str, options: dict):
+        """只查内存层，不会阻塞（异步路径在事件循环中调用）。未命中返回 None，不计入 misses。"""
+        if self.max_size <= 0:
+            return None
+        key = cache_key(tx_digest, options)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+            return result
+
+    def get_shared(self, tx_digest: str, options: dict):
+        """查共享层（可能读取数据库或 kv 服务），命中时写入内存层。未命中返回 None。"""
+        if self.max_size <= 0:
+            return None
+        key = cache_key(tx_digest, options)
+        store = self._shared_store()
+        result = store.get(f"tx:{key}") if store else None
+        with self._lock:
+            if result is not None:
+                self._insert(key, result)
+                self._stats["shared_hits"] += 1
+                return result
+            self._stats["misses"] += 1
+            return None
+
+    def uses_shared(self) -> bool:
+        """是否使用共享层。为 False 时 get_shared / put_shared 不会访问后端。"""
+        return self.max_size > 0 and self._shared_store() is not None
+
+    def put(self, tx_digest: str, options: dict, result, shared: bool = True) -> bool:
+        """
+        缓存交易结果。不满足 is_cacheable 的结果会被忽略，返回是否已缓存。
+        shared 为 False 时只写入内存层，调用方另行调用 put_shared。
+        """
+        if self.max_size <= 0 or not is_cacheable(result):
+            return False
+        key = cache_key(tx_digest, options)
+        with self._lock:
+            self._insert(key, result)
+            self._stats["stores"] += 1
+        if shared:
+            self.put_shared(tx_digest, options, result)
+        return True
+
+    def put_shared(self, tx_digest: str, options: dict, result):
+        """把已通过 put 检查的结果写入共享层。"""
+        store = self._shared_store()
+        if store:
+            store.set(f"tx:{cache_key(tx_digest, options)}", result, ttl=self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, size=len(self._entries), max_size=self.max_size,
+                        shared=self._store.describe() if self._store else None)
+
+    def _insert(self, key: str, result: dict):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+# 进程内共享的交易缓存
+tx_cache = TransactionCache()
@@ -0,0 +1,105 @@
+"""
+RPC 与 Sui CLI JSON 输出的选择性解码。
+
+校验只读取交易响应中的少数路径（effects.status、transaction.data.transaction.kind、events），
+部署只读取发布输出中的 effects.transactionDigest、effects.gasUsed 与 objectChanges。
+安装了 msgspec 时，按下面的结构体直接从原始字节解码，未声明的字段（交易输入、命令列表、
+对象变更中的大段内容等）在解析时被跳过，不会构建对应的 Python 字典；
+解码结果转换为只包含所需字段的普通字典，调用方的字典访问方式不变。
+未安装 msgspec 时回退到标准库 json 完整解析。
+
+基准测试：python3 -m movectf.bench_decode
+"""
+import json
+from typing import Any, Optional
+
+try:
+    import msgspec
+except ImportError:  # msgspec 为可选依赖
+    msgspec = None
+
+
+if msgspec is not None:
+    class _ExecutionStatus(msgspec.Struct, omit_defaults=True):
+        status: Optional[str] = None
+        error: Optional[str] = None
+
+    class _Effects(msgspec.Struct, omit_defaults=True):
+        status: Optional[_ExecutionStatus] = None
+        transactionDigest: Optional[str] = None
+        gasUsed: Optional[dict[str, Any]] = None
+
+    class _TransactionKind(msgspec.Struct, omit_defaults=True):
+        kind: Optional[str] = None
+
+    class _TransactionData(msgspec.Struct, omit_defaults=True):
+        transaction: Optional[_TransactionKind] = None
+
+    class _Transaction(msgspec.Struct, omit_defaults=True):
+        data: Optional[_TransactionData] = None
+
+    class _Event(msgspec.Struct, omit_defaults=True):
+        type: Optional[str] = None
+        parsedJson: Any = None
+
+    class _ObjectChange(msgspec.Struct, omit_defaults=True):
+        type: Optional[str] = None
+        packageId: Optional[str] = None
+        objectId: Optional[str] = None
+        objectType: Optional[str] = None
+        version: Any = None
+        digest: Optional[str] = None
+
+    class _TransactionBlock(msgspec.Struct, omit_defaults=True):
+        digest: Optional[str] = None
+        checkpoint: Any = None
+        effects: Optional[_Effects] = None
+        transaction: Optional[_Transaction] = None
+        events: Optional[list[_Event]] = None
+        objectChanges: Optional[list[_ObjectChange]] = None
+        errors: Optional[list[Any]] = None
+
+    class _TransactionBlockResponse(msgspec.Struct):
+        result: Optional[_TransactionBlock] = None
+        error: Any = None
+
+    class _MultiTransactionBlockResponse(msgspec.Struct):
+        result: Optional[list[Optional[_TransactionBlock]]] = None
+        error: Any = None
+
+    _tx_response_decoder = msgspec.json.Decoder(_TransactionBlockResponse)
+    _multi_tx_response_decoder = msgspec.json.Decoder(_MultiTransactionBlockResponse)
+    _publish_output_decoder = msgspec.json.Decoder(_TransactionBlock)
+
+
+def _envelope(response) -> dict:
+    if response.error is not None:
+        return {"error": response.error}
+    return {"result": msgspec.to_builtins(response.result)}
+
+
+def decode_transaction_response(raw: bytes) -> dict:
+    """选择性解码 sui_getTransactionBlock 的 JSON-RPC 响应。解析失败时抛出 ValueError。"""
+    return _envelope(_tx_response_decoder.decode(raw))
+
+
+def decode_multi_transaction_response(raw: bytes) -> dict:
+    """选择性解码 sui_multiGetTransactionBlocks 的 JSON-RPC 响应。解析失败时抛出 ValueError。"""
+    return _envelope(_multi_tx_response_decoder.decode(raw))
+
+
+def loads_publish_output(text: str) -> dict:
+    """
+    解析 `sui client publish --json` 的输出，只保留 digest、effects 与 objectChanges 中部署需要的字段。
+    解析失败时抛出 ValueError。
+    """
+    if msgspec is None:
+        return json.loads(text)
+    return msgspec.to_builtins(_publish_output_decoder.decode(text))
+
+
+# 支持选择性解码的 RPC 方法；未安装 msgspec 时为空，RPC 客户端使用完整解析
+RESPONSE_DECODERS = {
+    "sui_getTransactionBlock": decode_transaction_response,
+    "sui_multiGetTransactionBlocks": decode_multi_transaction_response,
+} if msgspec is not None else {}
@@ -0,0 +1,431 @@
+"""
+Move 合约的发布。
+
+各题目的 deploy_contract 共用这里的 publish_package。默认完全在进程内发布：从构建产物缓存
+（build_cache.py）取得编译好的字节码，在本地编码发布交易（transaction.py），用 CLI 密钥库中
+活跃地址的私钥签名（keystore.py），再通过连接池中的 RPC 客户端调用 sui_executeTransactionBlock
+提交，缓存命中时既不调用编译器也不启动 sui 进程。设置 DEPLOY_SIGNERS 后发布分散到密钥库中的多个地址（signers.py）。这条路径在交易提交前失败时
+（如密钥库不可用或未安装 PyNaCl），回退到 `sui client publish --json`。
+
+发布成功后等待交易进入 checkpoint，确保用户拿到 Package ID 时全节点已经可以查询到它。
+开启 Gas 对象池（gas_coins.py）时，每次进程内发布独占租用一个 Gas 对象，同一地址的多个发布可以并行；
+否则同一进程内同一地址的发布串行执行，避免预发布池的后台补充与用户触发的部署同时选中同一个 Gas 对象。
+"""
+import base64
+import contextlib
+import logging
+import os
+import subprocess
+import threading
+import time
+
+from . import build_cache, decode, gas, gas_coins, keystore, rpc, signers, transaction
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 发布方式：artifacts 在进程内用缓存的构建产物发布，cli 每次通过 `sui client publish` 编译并发布
+DEPLOY_PUBLISH_MODE = os.getenv("DEPLOY_PUBLISH_MODE", "artifacts")
+
+# 发布后等待交易进入 checkpoint 的最长时间（秒），超时后仍视为发布成功
+DEPLOY_FINALITY_TIMEOUT = float(os.getenv("DEPLOY_FINALITY_TIMEOUT", "30"))
+
+# 确认 checkpoint 时的轮询间隔（秒）
+_FINALITY_POLL_INTERVAL = 0.5
+
+# 提交发布交易时请求的响应字段
+_EXECUTE_OPTIONS = {"showEffects": True, "showObjectChanges": True}
+
+# 查询 Gas 对象时单页的数量
+_GAS_COINS_PAGE_SIZE = 50
+
+# sui_multiGetObjects 单次查询的对象数上限
+_MULTI_GET_OBJECTS_MAX = 50
+
+_SUI_COIN_TYPE = "0x2::sui::SUI"
+
+_address_locks = {}
+_address_locks_lock = threading.Lock()
+
+
+class _PrepareError(Exception):
+    """发布交易提交前的失败（编译、构造或签名），可以安全地回退到 CLI 发布。"""
+
+
+def wait_for_checkpoint(tx_digest: str, timeout: float = DEPLOY_FINALITY_TIMEOUT) -> bool:
+    """轮询全节点直到交易进入 checkpoint。确认成功返回 True，超时或 RPC 不可用时返回 False。"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = rpc.get_client().call("sui_getTransactionBlock", [tx_digest, {}],
+                                           timeout=max(0.1, min(5.0, deadline - time.monotonic())))
+            if result and result.get("checkpoint"):
+                return True
+        except rpc.RpcResponseError:
+            pass  # 全节点尚未索引到该交易
+        except rpc.RpcError as e:
+            logger.warning(f"确认交易 {tx_digest} 是否进入 checkpoint 时 RPC 失败: {e}")
+            return False
+        if time.monotonic() + _FINALITY_POLL_INTERVAL > deadline:
+            return False
+        time.sleep(_FINALITY_POLL_INTERVAL)
+
+
+def _get_signer_set() -> signers.SignerSet:
+    """发布使用的签名地址集合（默认只有 CLI 的活跃地址），进程内只加载一次。"""
+    try:
+        return signers.get_signer_set()
+    except keystore.KeystoreError as e:
+        raise _PrepareError(str(e)) from e
+
+
+def _address_lock(address: str) -> threading.Lock:
+    """未开启 Gas 对象池时，同一地址的发布（包括 CLI 发布）串行执行。"""
+    with _address_locks_lock:
+        return _address_locks.setdefault(address, threading.Lock())
+
+
+def _cli_address() -> str:
+    try:
+        return keystore.active_address()
+    except keystore.KeystoreError:
+        return ""
+
+
+def _parse_publish_result(result: dict, client: rpc.SuiRpcClient = None) -> tuple:
+    """
+    从发布交易的结果中取出 (transaction_hash, packages)，packages 为按发布顺序排列的
+    [{"package_id", "created_objects"}]。只发布了一个包时新建的对象（合约 init 创建的对象、UpgradeCap）都归它；
+    一个交易发布多个包时按 _assign_created_objects 归属。
+    """
+    # 从 JSON 结果中提取 transactionDigest
+    transaction_hash = result.get("effects", {}).get("transactionDigest")
+
+    # 从 objectChanges 中找到 published 类型的对象，获取 packageId
+    package_ids = [obj_change.get("packageId") for obj_change in result.get("objectChanges") or []
+                   if obj_change.get("type") == "published"]
+
+    # 合约 init 创建的对象（如共享的题目对象、UpgradeCap）
+    created_objects = [
+        {"object_id": obj_change.get("objectId"), "object_type": obj_change.get("objectType")}
+        for obj_change in result.get("objectChanges") or []
+        if obj_change.get("type") == "created"
+    ]
+    if len(package_ids) <= 1:
+        return transaction_hash, [{"package_id": package_id, "created_objects": created_objects}
+                                  for package_id in package_ids]
+    owners = _assign_created_objects(created_objects, package_ids, client or rpc.get_client())
+    return transaction_hash, [
+        {"package_id": package_id,
+         "created_objects": [obj for obj in created_objects if owners.get(obj["object_id"]) == package_id]}
+        for package_id in package_ids
+    ]
+
+
+def _assign_created_objects(created_objects: list, package_ids: list, client: rpc.SuiRpcClient) -> dict:
+    """
+    返回 {object_id: package_id}。类型中带有 Package ID 的对象归对应的包；其余对象（UpgradeCap）
+    通过 sui_multiGetObjects 读取 package 字段归属，查询失败的对象不归属任何包。
+    """
+    owners, unresolved = {}, []
+    for obj in created_objects:
+        package_id = next((package_id for package_id in package_ids if package_id in (obj["object_type"] or "")), None)
+        if package_id:
+            owners[obj["object_id"]] = package_id
+        else:
+            unresolved.append(obj["object_id"])
+    for start in range(0, len(unresolved), _MULTI_GET_OBJECTS_MAX):
+        chunk = unresolved[start:start + _MULTI_GET_OBJECTS_MAX]
+        try:
+            objects = client.call("sui_multiGetObjects", [chunk, {"showContent": True}]) or []
+        except rpc.RpcError as e:
+            logger.warning(f"查询发布交易创建的对象失败，{len(chunk)} 个对象无法归属到包: {e}")
+            continue
+        for obj in objects:
+            data = (obj or {}).get("data") or {}
+            package_id = ((data.get("content") or {}).get("fields") or {}).get("package")
+            if package_id in package_ids:
+                owners[data["objectId"]] = package_id
+    return owners
+
+
+def _published(packages: list, transaction_hash: str, report, gas_used: dict, contract_path: str,
+               budget: int, estimated: bool = False) -> dict:
+    logger.info(f"合约发布成功。包 ID: {', '.join(package['package_id'] for package in packages)}, "
+                f"交易哈希: {transaction_hash}")
+    report("submitted", transaction_hash=transaction_hash)
+    if gas_used:
+        gas.record(build_cache.contract_digest(contract_path), transaction_hash, gas_used, budget, estimated,
+                   packages=len(packages))
+    return {
+        "success": True,
+        "transaction_hash": transaction_hash,
+        "packages": [dict(package, success=True, transaction_hash=transaction_hash) for package in packages],
+        "gas_used": dict(gas.parse_gas_used(gas_used), budget=budget) if gas_used else None,
+    }
+
+
+def _select_gas(client: rpc.SuiRpcClient, owner: str, gas_budget: int) -> list:
+    """选出余额合计不低于 Gas 预算的 SUI 对象（优先使用余额大的），返回对象引用列表。"""
+    try:
+        page = client.call("suix_getCoins", [owner, _SUI_COIN_TYPE, None, _GAS_COINS_PAGE_SIZE])
+    except rpc.RpcError as e:
+        raise _PrepareError(f"查询 Gas 对象失败: {e}") from e
+    payment, total = [], 0
+    for coin in sorted(page.get("data") or [], key=lambda coin: int(coin["balance"]), reverse=True):
+        payment.append({"objectId": coin["coinObjectId"], "version": int(coin["version"]), "digest": coin["digest"]})
+        total += int(coin["balance"])
+        if total >= gas_budget:
+            return payment
+    raise _PrepareError(f"地址 {owner} 的 SUI 余额 {total} 低于 Gas 预算 {gas_budget}。")
+
+
+@contextlib.contextmanager
+def _gas_payment(client: rpc.SuiRpcClient, signer: keystore.Ed25519Signer, gas_budget: int):
+    """
+    发布交易的 Gas 支付，产出 gas_coins.Lease。开启 Gas 对象池时独占租用一个对象；
+    否则持有该地址的发布锁，按余额选择对象。
+    """
+    pool = gas_coins.get_pool(signer)
+    if pool.enabled:
+        with pool.lease(gas_budget) as lease:
+            yield lease
+        return
+    with _address_lock(signer.address):
+        yield gas_coins.Lease(_select_gas(client, signer.address, gas_budget))
+
+
+def _publish_from_artifacts(contract_path: str, gas_budget: str, report, instance: str = None,
+                            copies: int = 1) -> dict:
+    """
+    在进程内使用缓存的构建产物发布 copies 个包（同一个交易，Gas 预算上限按包数累加）。
+    交易提交前失败时抛出 _PrepareError；提交后的失败直接返回失败结果，不再回退（交易可能已经上链）。
+    """
+    report("building")
+    try:
+        artifacts = build_cache.load_or_build(contract_path)
+    except build_cache.BuildError as e:
+        raise _PrepareError(str(e)) from e
+
+    signer_set = _get_signer_set()
+    client = rpc.get_client()
+    budget = int(gas_budget) * copies
+    try:
+        gas_price = int(client.call("suix_getReferenceGasPrice", []))
+    except rpc.RpcError as e:
+        raise _PrepareError(f"查询参考 Gas 价格失败: {e}") from e
+
+    try:
+        with signer_set.lease(instance, budget) as signer, _gas_payment(client, signer, budget) as lease:
+            return _submit(client, signer_set, signer, artifacts, lease, gas_price, budget, contract_path, report,
+                           copies)
+    except signers.SignerUnavailable as e:
+        logger.error(f"没有可用的发布地址: {e}")
+        return {
+            "success": False,
+            "error": f"没有可用的发布地址: {e}",
+            "details": "同时进行的部署过多或所有部署地址余额不足，请稍后重试或联系管理员充值。"
+        }
+    except gas_coins.GasCoinUnavailable as e:
+        # Gas 对象都被其他发布占用时不回退到 CLI：CLI 可能选中正在使用的对象
+        logger.error(f"没有可用的 Gas 对象: {e}")
+        return {
+            "success": False,
+            "error": f"没有可用的 Gas 对象: {e}",
+            "details": "同时进行的部署过多或部署地址余额不足，请稍后重试。"
+        }
+
+
+def _submit(client: rpc.SuiRpcClient, signer_set: signers.SignerSet, signer: keystore.Ed25519Signer,
+            artifacts: dict, lease: gas_coins.Lease, gas_price: int, budget: int, contract_path: str, report,
+            copies: int = 1) -> dict:
+    """构造、预执行、签名并提交发布交易，Gas 由 lease 支付。"""
+    def build(budget: int) -> bytes:
+        return transaction.publish_transaction(signer.address, artifacts["modules"], artifacts["dependencies"],
+                                               lease.payment, gas_price, budget, copies)
+
+    tx_bytes = build(budget)
+    estimated = False
+    if gas.DEPLOY_GAS_DRY_RUN:
+        # 预执行：按实测消耗确定预算；预执行失败的交易不提交，不消耗 Gas
+        try:
+            dry_run = client.call("sui_dryRunTransactionBlock", [base64.b64encode(tx_bytes).decode()])
+        except rpc.RpcError as e:
+            logger.warning(f"预执行发布交易失败，使用配置的 Gas 预算 {budget}: {e}")
+        else:
+            effects = dry_run.get("effects") or {}
+            status = effects.get("status", {})
+            if status.get("status") != "success":
+                logger.error(f"发布交易预执行失败: {status.get('error')}")
+                return {
+                    "success": False,
+                    "error": f"发布交易预执行失败: {status.get('error')}",
+                    "details": "交易没有提交，未消耗 Gas。这可能是由于合约错误、钱包余额不足或 Gas 预算上限过低导致。"
+                }
+            budget = gas.estimate_budget(effects["gasUsed"], gas_price, budget)
+            estimated = True
+            tx_bytes = build(budget)
+    signature = signer.sign_transaction(tx_bytes)
+    tx_digest = transaction.transaction_digest(tx_bytes)
+
+    try:
+        result = client.call("sui_executeTransactionBlock",
+                             [base64.b64encode(tx_bytes).decode(), [signature], _EXECUTE_OPTIONS,
+                              "WaitForLocalExecution"])
+    except rpc.RpcError as e:
+        lease.lost()
+        logger.error(f"提交发布交易 {tx_digest} 失败: {e}")
+        return {
+            "success": False,
+            "error": f"提交发布交易失败: {e}",
+            "details": "全节点未能执行发布交易，请检查网络连接后重试。"
+        }
+
+    lease.spent(result.get("effects") or {})
+    if result.get("effects", {}).get("gasUsed"):
+        signer_set.charge(signer.address, gas.parse_gas_used(result["effects"]["gasUsed"])["net"])
+    status = result.get("effects", {}).get("status", {})
+    transaction_hash, packages = _parse_publish_result(result, client)
+    if status.get("status") != "success" or len(packages) != copies or not transaction_hash:
+        logger.error(f"发布交易执行失败 ({transaction_hash}): {status.get('error')}")
+        return {
+            "success": False,
+            "error": f"发布交易执行失败: {status.get('error') or '结果中没有发布的包'}",
+            "details": "这可能是由于钱包余额不足或 Gas 预算过低导致。"
+        }
+    logger.info(f"已使用缓存的构建产物 {artifacts['key'][:12]} 发布（地址 {signer.address}），未重新编译。")
+    published = _published(packages, transaction_hash, report, result["effects"].get("gasUsed"),
+                           contract_path, budget, estimated)
+    published["signer"] = signer.address
+    return published
+
+
+def _publish_with_cli(contract_path: str, gas_budget: str, report) -> dict:
+    command = [
+        "sui", "client", "publish",
+        "--gas-budget", gas_budget,
+        "--json", # 以 JSON 格式输出结果
+        contract_path # 合约项目路径
+    ]
+    try:
+        logger.info(f"执行 Sui CLI 命令: {' '.join(command)}")
+        # 使用 subprocess.run 运行命令并捕获标准输出和错误
+        # `check=True` 会在命令返回非零退出码时抛出 CalledProcessError
+        report("building")
+        process = subprocess.run(command, capture_output=True, text=True, check=True, encoding='utf-8')
+        output = process.stdout
+        stderr_output = process.stderr
+
+        if stderr_output:
+            logger.warning(f"Sui CLI 命令产生了标准错误输出 (可能包含警告):\n{stderr_output}")
+
+        # 解析 JSON 输出（只保留部署需要的字段，见 decode.py）
+        try:
+            result = decode.loads_publish_output(output)
+        except ValueError as e:
+            logger.error(f"解析 Sui CLI 输出 JSON 失败: {e}. 原始输出: {output}")
+            return {
+                "success": False,
+                "error": f"解析 Sui CLI 输出 JSON 失败: {e}",
+                "output": output,
+                "details": "Sui CLI 返回了非标准 JSON 格式或输出不完整。"
+            }
+
+        transaction_hash, packages = _parse_publish_result(result)
+        if packages and transaction_hash:
+            return _published(packages, transaction_hash, report, result["effects"].get("gasUsed"),
+                              contract_path, int(gas_budget))
+        else:
+            logger.error(f"无法从 Sui CLI 输出中解析 package_id 或 transaction_hash ({transaction_hash}). 完整输出: {output}")
+            return {
+                "success": False,
+                "error": "无法从 Sui CLI 输出中解析 package_id 或 transaction_hash。",
+                "output": output,
+                "details": "Sui CLI 输出格式不符合预期，请检查 Sui 版本或网络响应。"
+            }
+
+    except subprocess.CalledProcessError as e:
+        # 捕获 CLI 命令执行失败的错误
+        logger.error(f"Sui CLI 命令执行失败，退出码: {e.returncode}")
+        logger.error(f"Stdout: {e.stdout}")
+        logger.error(f"Stderr: {e.stderr}")
+        return {
+            "success": False,
+            "error": f"Sui CLI 命令执行失败: {e.stderr or e.stdout}",
+            "command": ' '.join(command),
+            "details": "这可能是由于 Sui CLI 配置问题、钱包余额不足或合约编译错误导致。"
+        }
+    except FileNotFoundError:
+        logger.error("Sui CLI 命令 'sui' 未找到。请确保 'sui' 已安装并配置在 PATH 中。")
+        return {
+            "success": False,
+            "error": "Sui CLI 命令 'sui' 未找到。",
+            "details": "请确保 Sui CLI 已安装并配置在系统 PATH 中。尝试在终端运行 'sui client --version' 检查。"
+        }
+
+
+def publish_packages(contract_path: str, gas_budget: str, count: int = 1, on_phase=None, instance: str = None) -> dict:
+    """
+    在一个交易中发布 count 个相同的包（最多 transaction.MAX_PUBLISH_PER_TRANSACTION 个），
+    签名、提交与等待 checkpoint 的开销由这些包分摊。成功时返回
+    {"success": True, "transaction_hash": ..., "packages": [...], "gas_used": {...}, "signer": ...}，
+    packages 中每一项与 publish_package 的成功结果格式相同；失败时与 publish_package 相同。
+    回退到 CLI 发布时只发布一个包。
+    """
+    report = on_phase or (lambda phase, **fields: None)
+    count = max(1, min(count, transaction.MAX_PUBLISH_PER_TRANSACTION))
+
+    # 检查 Move 合约目录是否存在
+    if not os.path.isdir(contract_path):
+        logger.error(f"Move 合约目录不存在: {contract_path}")
+        return {
+            "success": False,
+            "error": f"服务器上找不到 Move 合约目录: {contract_path}",
+            "details": "请联系管理员确保合约文件已正确部署。"
+        }
+
+    try:
+        result = None
+        if DEPLOY_PUBLISH_MODE == "artifacts":
+            try:
+                result = _publish_from_artifacts(contract_path, gas_budget, report, instance, count)
+            except _PrepareError as e:
+                logger.warning(f"无法使用构建产物缓存发布，回退到 Sui CLI: {e}")
+        if result is None:
+            with _address_lock(_cli_address()):
+                result = _publish_with_cli(contract_path, gas_budget, report)
+        if result["success"]:
+            # 等待 checkpoint 时已经归还了 Gas 对象（或释放了发布锁），不阻塞其他发布
+            if not wait_for_checkpoint(result["transaction_hash"]):
+                logger.warning(f"未能在 {DEPLOY_FINALITY_TIMEOUT:.0f} 秒内确认发布交易 "
+                               f"{result['transaction_hash']} 进入 checkpoint。")
+            published_at = time.time()
+            for package in result["packages"]:
+                package["published_at"] = published_at
+        return result
+    except Exception as e:
+        # 捕获所有其他未知错误，并打印堆栈信息
+        logger.critical(f"部署合约时发生未知错误: {e}", exc_info=True)
+        return {
+            "success": False,
+            "error": f"部署合约时发生未知错误: {e}",
+            "details": "请检查服务器日志获取更多信息。"
+        }
+
+
+def publish_package(contract_path: str, gas_budget: str, on_phase=None, instance: str = None) -> dict:
+    """
+    发布合约。成功时返回
+    {"success": True, "package_id": ..., "transaction_hash": ..., "published_at": ..., "created_objects": [...],
+     "gas_used": {...}, "signer": ...}，
+    失败时返回 {"success": False, "error": ..., "details": ...}（可能附带 output / command）。
+
+    on_phase(phase, **fields) 用于汇报进度（见 jobs.py）：开始编译发布时为 building，
+    交易执行后为 submitted（附带 transaction_hash），之后等待交易进入 checkpoint 再返回。
+    instance 为题目实例的标识（如用户的 GitHub ID），同一实例的进程内发布总是使用同一个地址，
+    结果中的 signer 为该地址（CLI 发布时为 None）。
+    """
+    result = publish_packages(contract_path, gas_budget, 1, on_phase, instance)
+    if not result["success"]:
+        return result
+    return dict(result["packages"][0], gas_used=result["gas_used"], signer=result.get("signer"))
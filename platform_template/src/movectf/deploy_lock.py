@@ -0,0 +1,59 @@
+"""
+部署的互斥。
+
+DeployLock.run(key, fn) 保证同一个 key 的部署不会同时执行：
+进程内的并发调用通过 SingleFlight 合并，等待者得到执行者的结果；
+设置 DEPLOY_LOCK_PATH 后，同一台机器上的多个 worker 进程通过每个 key 一个的锁文件
+（<DEPLOY_LOCK_PATH>.<key 的哈希>）串行执行。不同 key（不同题目、不同租户）的部署互不等待，
+同一发布地址的 Gas 对象争用由 movectf/deploy.py 的地址锁与 Gas 对象池（movectf/gas_coins.py）处理。
+
+DeployLock 本身不记录结果。幂等由 fn 负责：持有锁后先读取持久化的部署状态（movectf/deployment_store.py），
+已有记录时直接返回，其他进程刚完成的部署因此不会被重复发布。
+"""
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 跨进程部署锁文件的路径前缀（每个部署 key 一个锁文件），留空只在进程内互斥
+DEPLOY_LOCK_PATH = os.getenv("DEPLOY_LOCK_PATH", "/tmp/movectf-deploy.lock")
+
+
+class DeployLock:
+    """fn() 返回 deploy_contract 格式的结果字典；run 返回该结果（合并的并发调用得到同一个结果）。"""
+
+    def __init__(self, lock_path: str = DEPLOY_LOCK_PATH):
+        self.lock_path = lock_path
+        self._flight = SingleFlight()
+
+    def run(self, key: str, fn) -> dict:
+        return self._flight.do(key, self._run, key, fn)
+
+    def stats(self) -> dict:
+        return dict(self._flight.stats(), lock_path=self.lock_path or None)
+
+    def _run(self, key: str, fn) -> dict:
+        with self._exclusive(key):
+            return fn()
+
+    @contextlib.contextmanager
+    def _exclusive(self, key: str):
+        """
+        跨进程用该 key 的锁文件串行执行。进程内同一 key 的调用已由 SingleFlight 合并为一个，不需要线程锁。
+        """
+        if not self.lock_path:
+            yield
+            return
+        digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+        with open(f"{self.lock_path}.{digest}", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
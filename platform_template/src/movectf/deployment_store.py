@@ -0,0 +1,55 @@
+"""
+持久化的部署状态。
+
+部署成功后把 Package ID、交易哈希与发布时创建的对象写入共享状态后端（见 movectf/state.py，默认 SQLite），
+服务启动时读回，重启或崩溃后不需要重新发布合约；多个 worker 进程读写同一份记录，
+一个 worker 完成的部署其他 worker 最迟 STATE_MISS_TTL 秒后可见。记录按部署键（合约内容哈希）区分，
+合约源码变化后旧记录不会被使用。
+"""
+import logging
+import time
+
+from . import state
+
+logger = logging.getLogger(__name__)
+
+
+class DeploymentStore:
+    """部署记录的读写。部署记录写入后不再变化，读取结果缓存在进程内（state.ReadCache）。"""
+
+    def __init__(self, backend=None):
+        self._records = state.ReadCache(backend or state.backend())
+
+    def describe(self) -> str:
+        return self._records.backend.describe()
+
+    def load(self, key: str, fresh: bool = False):
+        """
+        返回与 deploy_contract 相同格式的成功结果（附带 created_objects 与 "from_state": True），
+        没有记录或读取失败时返回 None。fresh 为 True 时不使用未命中的缓存。
+        """
+        record = self._records.get(f"deployment:{key}", fresh=fresh)
+        if record is None:
+            return None
+        return {
+            "success": True,
+            "package_id": record["package_id"],
+            "transaction_hash": record["transaction_hash"],
+            "published_at": record.get("published_at"),
+            "created_objects": record.get("created_objects") or [],
+            "from_state": True,
+        }
+
+    def save(self, key: str, result: dict):
+        """记录一次成功的部署（覆盖同一部署键的旧记录）。"""
+        self._records.set(f"deployment:{key}", {
+            "package_id": result["package_id"],
+            "transaction_hash": result["transaction_hash"],
+            "published_at": result.get("published_at"),
+            "created_objects": result.get("created_objects") or [],
+            "recorded_at": time.time(),
+        })
+        logger.info(f"部署状态已保存到 {self.describe()}（Package ID: {result['package_id']}）。")
+
+    def stats(self) -> dict:
+        return self._records.stats()
@@ -0,0 +1,725 @@
+"""
+题目服务引擎。
+
+各题目的服务逻辑（部署合约、校验提交、部署任务、批量校验与统计）都在这里实现，题目只提供一个声明式的
+challenge.toml（合约目录、交易校验规则、页面模板与 Flag 校验方式），src/app.py 只负责加载配置：
+
+    [challenge]
+    name = "week_2"                         # 题目名，同时托管多个题目时作为 URL 前缀（/week_2/）
+    contract = "move_contract"              # Move 合约目录（相对于本配置文件）
+    verify = "move_contract/verify.toml"    # 交易校验规则（见 movectf/spec.py），缺省为合约目录下的 verify.toml
+    templates = "templates"                 # 页面模板目录，其中的 index.html 为题目页面
+    move_flag = "CTF{MoveCTF-Task2}"        # 合约内部的 Flag，校验规则中以 $move_flag 引用
+    check_contract_flag = true              # 是否要求提交表单中的 contract_flag_input 与 move_flag 一致
+    success_message = "恭喜！所有校验通过！"   # 全部校验通过时的提示
+    root_flag = "/flag"                     # 挑战成功后展示的根 Flag 文件
+
+CHALLENGE_CONFIG 为逗号分隔的配置文件列表。只有一个题目时挂载在 /，与原来的单题目服务完全一致，
+并且仍可用 MOVE_CONTRACT_PATH、VERIFY_SPEC_PATH、MOVE_CONTRACT_FLAG、ROOT_FLAG_PATH、DEPLOYED_PACKAGE_ID
+覆盖配置；多个题目时每个题目挂载在 /<name>/ 下，共享同一进程中的 RPC 连接池、交易缓存、构建产物缓存、
+发布地址与 Gas 对象池，每个题目额外占用的只有自己的配置、校验规则与部署状态。
+
+MULTI_TENANT=1 时每个题目在一个进程中为多个选手服务：选手的题目实例挂载在 /t/<令牌>/ 下，
+GitHub ID、根 Flag 与部署的合约记录在租户表中（见 movectf/tenants.py），由平台通过 /api/tenants 创建。
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context, url_for
+
+from . import aio, asgi, batch, build_cache, deploy, deploy_lock, deployment_store, gas, gas_coins, jobs, \
+    package_pool, rpc, signers, spec, state, tenants
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 题目配置文件，逗号分隔多个时在同一进程中托管多个题目
+CHALLENGE_CONFIG = os.getenv("CHALLENGE_CONFIG", "challenge.toml")
+
+# UUID 文件（通常包含 GitHub ID）的路径，用于验证用户的身份。优先从环境变量 UUID_FILE_PATH 获取
+UUID_FILE_PATH = os.getenv("UUID_FILE_PATH", "/uuid")
+
+# Sui CLI 的 Gas 预算，优先从环境变量 SUI_GAS_BUDGET 获取
+SUI_GAS_BUDGET = os.getenv("SUI_GAS_BUDGET", "100000000")
+
+# 只托管一个题目时可覆盖配置项的环境变量
+_ENV_OVERRIDES = {
+    "contract_path": "MOVE_CONTRACT_PATH",
+    "verify_path": "VERIFY_SPEC_PATH",
+    "move_flag": "MOVE_CONTRACT_FLAG",
+    "root_flag_path": "ROOT_FLAG_PATH",
+    "deployed_package_id": "DEPLOYED_PACKAGE_ID",
+}
+
+_NOT_DEPLOYED = "未部署合约"
+
+
+class ChallengeConfig:
+    """解析后的 challenge.toml，路径均已解析为相对于配置文件所在目录。"""
+
+    __slots__ = ("name", "contract_path", "verify_path", "template_folder", "move_flag", "check_contract_flag",
+                 "success_message", "root_flag_path", "deployed_package_id", "source")
+
+    def __init__(self, name: str, contract_path: str, verify_path: str, template_folder: str, move_flag: str,
+                 check_contract_flag: bool, success_message: str, root_flag_path: str,
+                 deployed_package_id: str = None, source: str = ""):
+        self.name = name
+        self.contract_path = contract_path
+        self.verify_path = verify_path
+        self.template_folder = template_folder
+        self.move_flag = move_flag
+        self.check_contract_flag = check_contract_flag
+        self.success_message = success_message
+        self.root_flag_path = root_flag_path
+        self.deployed_package_id = deployed_package_id
+        self.source = source
+
+
+def load_config(path: str, env_overrides: bool = False) -> ChallengeConfig:
+    """
+    读取 challenge.toml。文件缺失或缺少必填项时直接抛出异常，使服务启动失败。
+    env_overrides 为 True 时（只托管一个题目）按 _ENV_OVERRIDES 用环境变量覆盖配置项。
+    """
+    with open(path, "rb") as f:
+        raw = tomllib.load(f).get("challenge", {})
+    if not raw.get("name"):
+        raise ValueError(f"{path}: challenge.name 不能为空。")
+
+    base = os.path.dirname(os.path.abspath(path))
+    contract_path = os.path.join(base, raw.get("contract", "move_contract"))
+    verify_path = os.path.join(base, raw["verify"]) if raw.get("verify") else None
+    values = {
+        "contract_path": contract_path,
+        "verify_path": verify_path,
+        "move_flag": raw.get("move_flag", ""),
+        "root_flag_path": raw.get("root_flag", "/flag"),
+        "deployed_package_id": None,
+    }
+    if env_overrides:
+        for key, env in _ENV_OVERRIDES.items():
+            if os.getenv(env):
+                values[key] = os.getenv(env)
+
+    return ChallengeConfig(
+        name=raw["name"],
+        contract_path=values["contract_path"],
+        verify_path=values["verify_path"] or os.path.join(values["contract_path"], "verify.toml"),
+        template_folder=os.path.join(base, raw.get("templates", "templates")),
+        move_flag=values["move_flag"],
+        check_contract_flag=bool(raw.get("check_contract_flag", False)),
+        success_message=raw.get("success_message", "恭喜！所有校验通过！"),
+        root_flag_path=values["root_flag_path"],
+        deployed_package_id=values["deployed_package_id"],
+        source=path,
+    )
+
+
+def _read_file(path: str, env: str, default: str, error_value: str, label: str) -> str:
+    """
+    读取根 Flag / GitHub ID 等启动时加载的静态数据。
+    文件不存在时尝试从环境变量 env 获取，读取失败时返回 error_value。
+    """
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                value = f.read().strip()
+            logger.info(f"成功从 {path} 加载{label}。")
+            return value
+        logger.warning(f"{label} 文件未找到于 {path}。尝试从环境变量 {env} 获取。")
+        return os.getenv(env, default)
+    except Exception as e:
+        logger.error(f"读取 {label} 文件 {path} 失败: {e}。使用占位符。", exc_info=True)
+        return error_value
+
+
+class Challenge:
+    """
+    一个题目的服务：配置、校验规则、部署状态与 Flask 应用（self.app）。
+    mount 为挂载的 URL 前缀（单题目时为空字符串）。
+
+    单租户模式下题目只有一个实例（self.tenant，由 /uuid 与 /flag 确定）；多租户模式（MULTI_TENANT=1）下
+    每个选手的实例挂载在 /t/<令牌>/ 下，由租户表（movectf/tenants.py）提供 GitHub ID、根 Flag 与部署的合约。
+    """
+
+    def __init__(self, config: ChallengeConfig, mount: str = "", pool_path: str = package_pool.PACKAGE_POOL_PATH,
+                 multi_tenant: bool = tenants.MULTI_TENANT):
+        self.config = config
+        self.name = config.name
+        self.mount = mount
+        self.multi_tenant = multi_tenant
+
+        # 交易校验规则，启动时编译为匹配器；获取交易详情时只请求校验实际会读取的字段
+        self.verify_spec = spec.load_spec(config.verify_path)
+        self.transaction_options = self.verify_spec.transaction_options
+
+        # 预发布合约池（PACKAGE_POOL_SIZE 等配置见 movectf/package_pool.py），开启后“开始挑战”直接取用已发布的包
+        self.package_pool = package_pool.PackagePool(
+            lambda count: deploy.publish_packages(config.contract_path, SUI_GAS_BUDGET, count),
+            build_cache.contract_digest(config.contract_path),
+            path=pool_path,
+        )
+        # 本题目的部署键：同一份合约源码只部署一次（用于部署互斥与持久化的部署状态），租户的部署键另带令牌
+        self.deploy_key = f"deploy:{self.package_pool.contract_hash}"
+        # 持久化的部署状态，保存在多个 worker 进程共享的状态后端中（STATE_BACKEND 见 movectf/state.py）
+        self.deployment_store = deployment_store.DeploymentStore()
+        # 部署互斥：并发的部署请求（包括同一台机器上的其他 worker 进程）等待进行中的部署并复用其结果
+        self.deploy_lock = deploy_lock.DeployLock()
+        # 后台部署任务：/start_challenge 只创建任务，进度通过 /deploy_jobs/<job_id> 及其 SSE 流查询；
+        # 任务的作用域为租户令牌，不同租户的部署并行执行；任务进度写入共享状态，其他 worker 进程也能查询
+        self.deploy_jobs = jobs.DeployJobs(lambda report, token: self.deploy_contract(self._tenant(token), on_phase=report),
+                                           store=state.backend())
+        # 多租户模式的租户表
+        self.tenants = tenants.TenantStore() if multi_tenant else None
+
+        # 单租户模式的题目实例：已部署合约的信息由 deployment_store 持久化，重启后在 load_state 中恢复
+        self.tenant = tenants.Tenant("", self.name, "0x0_PLACEHOLDER", "flag{INITIAL_FLAG_PLACEHOLDER}",
+                                     package_id=config.deployed_package_id or None)
+
+        self.app = self._create_app()
+
+    def load_state(self):
+        """
+        加载根 Flag 与 GitHub ID，并从持久化的部署状态中恢复已部署的合约（预置了 DEPLOYED_PACKAGE_ID 时以其为准）。
+        多租户模式下根 Flag 作为创建租户时未指定 Flag 的缺省值。
+        """
+        self.tenant.root_flag = _read_file(self.config.root_flag_path, "CTF_ROOT_FLAG", "flag{ENV_FLAG_NOT_SET}",
+                                           "flag{ERROR_READING_FLAG}", "根 Flag")
+        if self.multi_tenant:
+            return
+        self.tenant.github_id = _read_file(UUID_FILE_PATH, "GITHUB_ID", "0x0_DEFAULT_GH_ID", "error_reading_uuid",
+                                           "GitHub ID")
+        if self.tenant.deployment is None:
+            self._restore_deployment()
+
+    def _restore_deployment(self):
+        """单租户模式下尚未部署时，从共享的部署状态中读取已部署的合约（重启前或由其他 worker 进程部署）。"""
+        record = self.deployment_store.load(self.deploy_key)
+        if record and self.tenant.publish(tenants.Deployment(record["package_id"], record["transaction_hash"])):
+            logger.info(f"[{self.name}] 已从 {self.deployment_store.describe()} 恢复部署的合约。包 ID: {record['package_id']}")
+
+    def start(self):
+        """加载静态数据与部署状态，并启动预发布合约池的后台补充。"""
+        logger.info(f"[{self.name}] 题目初始化：加载静态数据...")
+        self.load_state()
+        self.package_pool.start()
+
+    def _tenant(self, token: str = None):
+        """
+        按令牌查找题目实例：单租户模式总是返回 self.tenant（尚未部署时先查看其他 worker 进程是否已完成部署，
+        未命中的结果缓存 STATE_MISS_TTL 秒），多租户模式下令牌不存在时返回 None。
+        """
+        if not self.multi_tenant:
+            if self.tenant.deployment is None:
+                self._restore_deployment()
+            return self.tenant
+        return self.tenants.get(self.name, token) if token else None
+
+    async def _tenant_async(self, token: str = None):
+        """
+        _tenant 的异步版本。可能读取租户表或共享状态时在线程池中执行，状态后端变慢时不阻塞事件循环；
+        单租户模式下已部署时直接返回。
+        """
+        if not self.multi_tenant and self.tenant.deployment is not None:
+            return self.tenant
+        return await asyncio.get_running_loop().run_in_executor(None, self._tenant, token)
+
+    def _base_url(self, tenant: tenants.Tenant) -> str:
+        """题目页面的 URL 前缀，传给模板作为 base_url。"""
+        return f"{self.mount}/t/{tenant.token}" if tenant.token else self.mount
+
+    # --- 校验 ---
+
+    def check_transaction(self, tx_digest: str, tx_details: dict, user_github_id: str,
+                          expected_package_id: str) -> tuple[bool, str]:
+        """
+        按题目的校验规则（verify.toml）校验已获取到的交易详情。
+        单笔提交（check_submission）与批量校验（/api/batch_verify）共用此规则。
+        """
+        context = {"github_id": user_github_id, "move_flag": self.config.move_flag}
+        return self.verify_spec.check(tx_digest, tx_details, expected_package_id, context)
+
+    def check_submission(self, tx_digest: str, user_github_id: str, expected_package_id: str) -> tuple[bool, str]:
+        """
+        检查用户提交的交易是否有效，并是否满足挑战要求。
+        返回 (是否通过, 详细的校验结果或错误消息)。
+        """
+        if not expected_package_id:
+            return False, "服务器尚未部署挑战合约，无法校验。请先点击“开始挑战”部署合约。"
+
+        try:
+            tx_details = _get_transaction_details(tx_digest, self.transaction_options)
+        except rpc.RpcUnavailable as e:
+            return False, str(e)
+        if not tx_details:
+            return False, "无法获取交易详情，请检查交易哈希是否正确或网络连接。"
+
+        return self.check_transaction(tx_digest, tx_details, user_github_id, expected_package_id)
+
+    async def check_submission_async(self, tx_digest: str, user_github_id: str,
+                                     expected_package_id: str) -> tuple[bool, str]:
+        """
+        check_submission 的异步版本：等待 RPC 时不占用线程，校验规则相同。
+        """
+        if not expected_package_id:
+            return False, "服务器尚未部署挑战合约，无法校验。请先点击“开始挑战”部署合约。"
+
+        try:
+            tx_details = await _get_transaction_details_async(tx_digest, self.transaction_options)
+        except rpc.RpcUnavailable as e:
+            return False, str(e)
+        if not tx_details:
+            return False, "无法获取交易详情，请检查交易哈希是否正确或网络连接。"
+
+        return self.check_transaction(tx_digest, tx_details, user_github_id, expected_package_id)
+
+    # --- 部署 ---
+
+    def deploy_contract(self, tenant: tenants.Tenant, on_phase=None) -> dict:
+        """
+        为题目实例部署 Move 合约。
+        优先从预发布合约池中取出一个已发布的包（毫秒级返回）；池未开启或为空时，
+        通过 movectf/deploy.py 发布合约，获取 package_id 和 transaction_hash。
+        部署经 deploy_lock 互斥执行，持有锁后先读取持久化的部署状态，已部署（包括由其他 worker 进程部署）
+        时直接返回已有结果；新的部署结果写入 deployment_store（多租户模式下同时写入租户表）。
+        on_phase 用于向部署任务汇报进度（见 movectf/jobs.py）；同步发布以用户的 GitHub ID 作为实例键，
+        配置了多个发布地址时同一用户的题目实例总是由同一个地址发布。
+        """
+        key = f"{self.deploy_key}:{tenant.token}" if tenant.token else self.deploy_key
+
+        def deploy_once() -> dict:
+            # 持有部署锁时读取最新的部署状态，其他 worker 进程刚完成的部署不会被重复发布
+            result = self.deployment_store.load(key, fresh=True)
+            if result is None:
+                result = self.package_pool.acquire() or deploy.publish_package(
+                    self.config.contract_path, SUI_GAS_BUDGET, on_phase, instance=tenant.github_id)
+                if result["success"]:
+                    self.deployment_store.save(key, result)
+            return result
+
+        result = self.deploy_lock.run(key, deploy_once)
+
+        if result["success"]:
+            # 部署结果整体替换（compare-and-set），并发读取的请求看到的总是成对的 Package ID 与交易哈希
+            deployment = tenants.Deployment(result["package_id"], result["transaction_hash"])
+            if tenant.token:
+                self.tenants.set_deployment(tenant, deployment)
+            else:
+                tenant.publish(deployment)
+            logger.info(f"[{self.name}] 合约部署成功。GitHub ID: {tenant.github_id}, 包 ID: {deployment.package_id}, "
+                        f"交易哈希: {deployment.transaction_hash}")
+        return result
+
+    # --- 页面 ---
+
+    def _submission_error(self, tx_digest: str, deployment: tenants.Deployment) -> str:
+        """
+        校验交易前的检查（deployment 为请求开始时读取的部署快照）。返回错误消息，可以继续校验时返回空字符串。
+        """
+        if not tx_digest:
+            logger.warning("提交失败：交易哈希为空。")
+            return "错误：交易哈希不能为空！"
+        if deployment is None:
+            # 如果合约尚未部署，则无法验证交易
+            logger.error("尝试在没有部署合约 ID 的情况下检查交易。")
+            return "错误：服务器尚未部署挑战合约，无法验证交易。请先点击“开始挑战”按钮部署合约。"
+        return ""
+
+    def _submission_result(self, tx_digest: str, form, tenant: tenants.Tenant, is_tx_valid: bool,
+                           validation_message: str) -> tuple[str, str]:
+        """
+        根据交易校验结果（以及 check_contract_flag 时用户提交的合约 Flag），生成页面上的结果消息和 Flag 消息。
+        """
+        is_contract_flag_match = True
+        if self.config.check_contract_flag:
+            is_contract_flag_match = form.get("contract_flag_input", "").strip() == self.config.move_flag
+
+        if is_tx_valid and is_contract_flag_match:
+            result_message = self.config.success_message
+            flag_message = f"你的 Flag 是：<span class='text-green-500 font-bold'>{tenant.root_flag}</span> 请移步平台提交。"
+            logger.info(f"[{self.name}] 挑战成功完成，GitHub ID: {tenant.github_id}, 交易哈希: {tx_digest}")
+            return result_message, flag_message
+
+        messages = []
+        if not is_tx_valid:
+            messages.append(validation_message)  # 使用 check_submission 返回的详细消息
+        if not is_contract_flag_match:
+            messages.append("合约返回的 Flag 不正确。")
+
+        result_message = " ".join(messages)
+        logger.warning(f"[{self.name}] 挑战失败，GitHub ID: {tenant.github_id}, 交易哈希: {tx_digest}。原因: {result_message}")
+        return result_message, ""
+
+    def _render_index(self, tenant: tenants.Tenant, deployment: tenants.Deployment, result_message: str = "",
+                      flag_message: str = ""):
+        """
+        渲染题目页面（deployment 为请求开始时读取的部署快照）。需要在 Flask 应用上下文中调用。
+        """
+        return render_template(
+            "index.html",
+            base_url=self._base_url(tenant),
+            github_id=tenant.github_id,
+            result_message=result_message,
+            flag_message=flag_message,
+            deployed_package_id=deployment.package_id if deployment else _NOT_DEPLOYED,
+            deployed_tx_hash=(deployment.transaction_hash if deployment else None) or "无",
+        )
+
+    def index(self, tenant: tenants.Tenant):
+        """
+        题目页面：处理页面显示和交易提交。
+        """
+        result_message = ""
+        flag_message = ""
+        # 整个请求使用同一份部署快照，校验与页面展示的 Package ID 一致，也不需要加锁
+        deployment = tenant.deployment
+
+        if request.method == "POST":
+            tx_digest = request.form.get("tx_digest", "").strip()
+            result_message = self._submission_error(tx_digest, deployment)
+            if not result_message:
+                is_tx_valid, validation_message = self.check_submission(tx_digest, tenant.github_id,
+                                                                        deployment.package_id)
+                result_message, flag_message = self._submission_result(tx_digest, request.form, tenant, is_tx_valid,
+                                                                       validation_message)
+
+        return self._render_index(tenant, deployment, result_message, flag_message)
+
+    async def index_async(self, form: dict, token: str = None):
+        """
+        题目页面提交的异步版本，由 ASGI 入口（asgi_app）调用。
+        等待 RPC 期间不占用线程，单个进程可以同时处理大量在途校验。租户不存在时返回 None（交给 Flask 返回 404）。
+        """
+        tenant = await self._tenant_async(token)
+        if tenant is None:
+            return None
+        flag_message = ""
+        deployment = tenant.deployment
+
+        tx_digest = form.get("tx_digest", "").strip()
+        result_message = self._submission_error(tx_digest, deployment)
+        if not result_message:
+            is_tx_valid, validation_message = await self.check_submission_async(
+                tx_digest, tenant.github_id, deployment.package_id
+            )
+            result_message, flag_message = self._submission_result(tx_digest, form, tenant, is_tx_valid,
+                                                                    validation_message)
+
+        with self.app.app_context():
+            return self._render_index(tenant, deployment, result_message, flag_message)
+
+    def async_route(self, method: str, path: str):
+        """
+        ASGI 入口的路由：返回处理该路径提交的 handler(form)，不是题目页面的提交时返回 None。
+        在事件循环中调用，只匹配路径；租户在 handler 中（线程池里）查找。
+        """
+        if method != "POST" or not path.startswith(f"{self.mount}/"):
+            return None
+        path = path[len(self.mount):]
+        if not self.multi_tenant:
+            return self.index_async if path == "/" else None
+        parts = path.split("/")
+        if len(parts) != 4 or parts[1] != "t" or parts[3]:
+            return None
+        return functools.partial(self.index_async, token=parts[2])
+
+    def start_challenge(self, tenant: tenants.Tenant):
+        """
+        处理用户点击“开始挑战”的请求。
+        此路由只创建后台部署任务并立即返回任务 ID，部署进度通过 deploy_jobs/<job_id> 或其 SSE 流获取。
+        """
+        logger.info(f"[{self.name}] 收到开始挑战请求，GitHub ID: {tenant.github_id}。")
+
+        # 部署策略：如果已经部署过，默认不再重复部署
+        deployment = tenant.deployment
+        if deployment is not None:
+            logger.info(f"[{self.name}] 合约已部署 (Package ID: {deployment.package_id})，不再重复部署。")
+            return jsonify({
+                "status": "success",
+                "message": "合约已部署！请使用现有合约进行挑战。",
+                "package_id": deployment.package_id,
+                "transaction_hash": deployment.transaction_hash or "（请查看上次部署的日志获取交易哈希）"
+            })
+
+        # 已有进行中的部署任务时返回该任务，避免重复点击触发多次发布；
+        # 相同幂等键（请求头 Idempotency-Key）的重试请求返回同一个任务
+        job, created = self.deploy_jobs.submit(request.headers.get("Idempotency-Key"), scope=tenant.token or None)
+        job_id = job["job_id"]
+        url_args = {"token": tenant.token} if tenant.token else {}
+        return jsonify({
+            "status": "accepted",
+            "message": "部署任务已创建。" if created else "已有正在进行的部署任务。",
+            "job_id": job_id,
+            "phase": job["phase"],
+            "status_url": url_for("deploy_job_status", job_id=job_id, **url_args),
+            "events_url": url_for("deploy_job_events", job_id=job_id, **url_args),
+        }), 202
+
+    def deploy_job_status(self, tenant: tenants.Tenant, job_id):
+        """
+        查询部署任务的当前阶段（queued / building / submitted / finalized / failed）。
+        结束后包含 package_id 与 transaction_hash，或 error 与 details。
+        """
+        snapshot = self.deploy_jobs.get(job_id, scope=tenant.token or None)
+        if snapshot is None:
+            return jsonify({"status": "error", "message": "部署任务不存在或已过期。"}), 404
+        return jsonify(snapshot)
+
+    def deploy_job_events(self, tenant: tenants.Tenant, job_id):
+        """
+        以 server-sent events 推送部署任务的阶段变化，任务结束后关闭流。
+        """
+        if self.deploy_jobs.get(job_id, scope=tenant.token or None) is None:
+            return jsonify({"status": "error", "message": "部署任务不存在或已过期。"}), 404
+        return Response(
+            stream_with_context(self.deploy_jobs.events(job_id)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # 禁止代理缓冲事件流
+        )
+
+    def batch_verify(self):
+        """
+        批量校验交易，供评审重新核验大量已提交的交易。
+        请求体: {"items": [{"tx_digest": ..., "package_id": ..., "github_id": ...}, ...]}，
+        package_id / github_id 缺省时使用当前部署的合约和 GitHub ID（多租户模式下必须逐项给出）。
+        以 NDJSON 流式逐条返回每笔交易的校验结果。需要请求头 Authorization: Bearer <BATCH_VERIFY_TOKEN>。
+        """
+        if not batch.is_authorized(request.headers.get("Authorization", "")):
+            return jsonify({"status": "error", "message": "未授权的批量校验请求。"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        # 多租户模式下没有当前实例，没有缺省的 package_id 与 github_id
+        tenant = self._tenant()
+        deployment = tenant.deployment if tenant is not None else None
+        try:
+            items = batch.parse_items(payload.get("items"), deployment.package_id if deployment else None,
+                                      tenant.github_id if tenant is not None else None, required=tenant is None)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        logger.info(f"[{self.name}] 收到批量校验请求，共 {len(items)} 笔交易。")
+        results = batch.verify_batch(items, self.check_transaction, self.transaction_options)
+        return Response(stream_with_context(batch.to_ndjson(results)), mimetype="application/x-ndjson")
+
+    def create_tenant(self):
+        """
+        多租户模式：为选手创建题目实例。请求体: {"github_id": ..., "flag": ...}，flag 缺省时使用题目的根 Flag。
+        同一 GitHub ID 重复创建时返回已有的实例。需要请求头 Authorization: Bearer <TENANT_ADMIN_TOKEN>。
+        """
+        if not tenants.is_authorized(request.headers.get("Authorization", "")):
+            return jsonify({"status": "error", "message": "未授权的租户管理请求。"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        github_id = payload.get("github_id")
+        if not isinstance(github_id, str) or not github_id.strip():
+            return jsonify({"status": "error", "message": "缺少 github_id。"}), 400
+
+        tenant, created = self.tenants.create(self.name, github_id.strip(), payload.get("flag") or self.tenant.root_flag)
+        return jsonify({
+            "status": "success",
+            "token": tenant.token,
+            "github_id": tenant.github_id,
+            "url": url_for("index", token=tenant.token),
+            "package_id": tenant.package_id,
+        }), 201 if created else 200
+
+    def list_tenants(self):
+        """多租户模式：列出题目实例（不含根 Flag）。需要请求头 Authorization: Bearer <TENANT_ADMIN_TOKEN>。"""
+        if not tenants.is_authorized(request.headers.get("Authorization", "")):
+            return jsonify({"status": "error", "message": "未授权的租户管理请求。"}), 403
+        items = [dict(tenant.to_dict(), root_flag=None) for tenant in self.tenants.list(self.name)]
+        return jsonify({"status": "success", "count": len(items), "tenants": items})
+
+    def delete_tenant(self, token):
+        """多租户模式：删除题目实例。需要请求头 Authorization: Bearer <TENANT_ADMIN_TOKEN>。"""
+        if not tenants.is_authorized(request.headers.get("Authorization", "")):
+            return jsonify({"status": "error", "message": "未授权的租户管理请求。"}), 403
+        if not self.tenants.delete(self.name, token):
+            return jsonify({"status": "error", "message": "题目实例不存在。"}), 404
+        return jsonify({"status": "success"})
+
+    def stats(self):
+        """
+        返回服务端运行统计（如交易缓存命中率、合并的并发查询数、预发布合约池、构建产物缓存、部署状态的读缓存、发布的 Gas 消耗、Gas 对象池、发布地址与租户表），便于观察 RPC 负载。
+        """
+        stats = dict(rpc.stats(), package_pool=self.package_pool.stats(), build_cache=build_cache.stats(),
+                     deploy_lock=self.deploy_lock.stats(), deployment_state=self.deployment_store.stats(), gas=gas.stats(),
+                     gas_coins=gas_coins.stats(), signers=signers.stats())
+        if self.multi_tenant:
+            stats["tenants"] = self.tenants.stats()
+        return jsonify(stats)
+
+    def _with_tenant(self, view):
+        """把题目实例的路由包装为 view(tenant, ...)：多租户模式下从 URL 中的令牌查找租户，不存在时返回 404。"""
+        @functools.wraps(view)
+        def wrapper(token=None, **kwargs):
+            tenant = self._tenant(token)
+            if tenant is None:
+                return jsonify({"status": "error", "message": "题目实例不存在或已被删除。"}), 404
+            return view(tenant, **kwargs)
+        return wrapper
+
+    def _create_app(self) -> Flask:
+        app = Flask(f"movectf.challenge.{self.name}", root_path=os.path.dirname(os.path.abspath(self.config.source)),
+                    template_folder=self.config.template_folder)
+        prefix = "/t/<token>" if self.multi_tenant else ""
+        app.add_url_rule(f"{prefix}/", "index", self._with_tenant(self.index), methods=["GET", "POST"])
+        app.add_url_rule(f"{prefix}/start_challenge", "start_challenge", self._with_tenant(self.start_challenge),
+                         methods=["POST"])
+        app.add_url_rule(f"{prefix}/deploy_jobs/<job_id>", "deploy_job_status",
+                         self._with_tenant(self.deploy_job_status), methods=["GET"])
+        app.add_url_rule(f"{prefix}/deploy_jobs/<job_id>/events", "deploy_job_events",
+                         self._with_tenant(self.deploy_job_events), methods=["GET"])
+        app.add_url_rule("/api/batch_verify", "batch_verify", self.batch_verify, methods=["POST"])
+        app.add_url_rule("/stats", "stats", self.stats, methods=["GET"])
+        if self.multi_tenant:
+            app.add_url_rule("/api/tenants", "create_tenant", self.create_tenant, methods=["POST"])
+            app.add_url_rule("/api/tenants", "list_tenants", self.list_tenants, methods=["GET"])
+            app.add_url_rule("/api/tenants/<token>", "delete_tenant", self.delete_tenant, methods=["DELETE"])
+        return app
+
+
+def _get_transaction_details(tx_digest: str, options: dict) -> dict or None:
+    """
+    通过共享的 RPC 客户端（keep-alive 连接池）获取指定交易哈希的详细信息。
+    返回交易结果字典或 None (如果请求失败)；RPC 已熔断时抛出 rpc.RpcUnavailable。
+    """
+    try:
+        return rpc.get_transaction_block(tx_digest, options)
+    except rpc.RpcUnavailable:
+        logger.warning(f"RPC 已熔断，未查询交易 {tx_digest}。")
+        raise
+    except rpc.RpcTimeout:
+        logger.error(f"RPC 请求超时：sui_getTransactionBlock for {tx_digest}。端点: {', '.join(rpc.RPC_ENDPOINTS)}")
+        return None
+    except rpc.RpcResponseError as e:
+        logger.error(f"RPC 错误：sui_getTransactionBlock for {tx_digest}: {e.error}")
+        return None
+    except rpc.RpcError as e:
+        logger.error(f"RPC 请求失败：sui_getTransactionBlock for {tx_digest}: {e}")
+        return None
+    except Exception as e:
+        logger.critical(f"获取交易详情时发生意外错误：{tx_digest}: {e}", exc_info=True)
+        return None
+
+
+async def _get_transaction_details_async(tx_digest: str, options: dict) -> dict or None:
+    """
+    _get_transaction_details 的异步版本，通过 asyncio RPC 客户端获取交易详情。
+    """
+    try:
+        return await aio.get_transaction_block(tx_digest, options)
+    except rpc.RpcUnavailable:
+        logger.warning(f"RPC 已熔断，未查询交易 {tx_digest}。")
+        raise
+    except rpc.RpcTimeout:
+        logger.error(f"RPC 请求超时：sui_getTransactionBlock for {tx_digest}。端点: {', '.join(rpc.RPC_ENDPOINTS)}")
+        return None
+    except rpc.RpcResponseError as e:
+        logger.error(f"RPC 错误：sui_getTransactionBlock for {tx_digest}: {e.error}")
+        return None
+    except rpc.RpcError as e:
+        logger.error(f"RPC 请求失败：sui_getTransactionBlock for {tx_digest}: {e}")
+        return None
+    except Exception as e:
+        logger.critical(f"获取交易详情时发生意外错误：{tx_digest}: {e}", exc_info=True)
+        return None
+
+
+def config_paths(spec_value: str = CHALLENGE_CONFIG) -> list:
+    """按 CHALLENGE_CONFIG 的格式（逗号分隔）拆分配置文件列表。"""
+    return [path.strip() for path in spec_value.split(",") if path.strip()]
+
+
+def load_challenges(paths: list = None) -> list:
+    """
+    加载题目。只有一个题目时挂载在 /，并允许环境变量覆盖配置；多个题目时挂载在 /<name>/ 下，
+    开启了文件模式的预发布合约池时每个题目使用各自的池文件（<PACKAGE_POOL_PATH>.<name>）。
+    """
+    paths = paths if paths is not None else config_paths()
+    if not paths:
+        raise ValueError("CHALLENGE_CONFIG 中没有题目配置文件。")
+    if len(paths) == 1:
+        return [Challenge(load_config(paths[0], env_overrides=True))]
+
+    challenges = []
+    for path in paths:
+        config = load_config(path)
+        if any(challenge.name == config.name for challenge in challenges):
+            raise ValueError(f"{path}: 题目名 {config.name} 重复。")
+        pool_path = package_pool.PACKAGE_POOL_PATH and f"{package_pool.PACKAGE_POOL_PATH}.{config.name}"
+        challenges.append(Challenge(config, mount=f"/{config.name}", pool_path=pool_path))
+    return challenges
+
+
+# 本进程创建的题目，由 start / stop 统一启动与退出
+_challenges = []
+
+# 为 True 时 create_app 不启动后台线程与连接，由 start() 在 worker 进程中启动（见 movectf/serve.py 的预加载）
+_defer_start = False
+
+
+def defer_start():
+    """预加载应用前调用：之后的 create_app 只加载配置与校验规则，不启动后台线程、不建立连接。"""
+    global _defer_start
+    _defer_start = True
+
+
+def start():
+    """启动本进程全部题目的后台任务（部署状态恢复、预发布合约池）并预热 RPC 连接。每个 worker 进程调用一次。"""
+    for challenge in _challenges:
+        challenge.start()
+    rpc.warm_up_in_background()
+
+
+def stop(timeout: float):
+    """优雅退出：在 timeout 秒内等待各题目进行中的部署任务结束。"""
+    deadline = time.monotonic() + timeout
+    for challenge in _challenges:
+        if not challenge.deploy_jobs.drain(max(0.0, deadline - time.monotonic())):
+            logger.warning(f"[{challenge.name}] 退出时仍有未完成的部署任务。")
+
+
+def create_app(paths: list = None) -> tuple:
+    """
+    创建托管 CHALLENGE_CONFIG 中全部题目的应用，返回 (Flask 应用, ASGI 应用)。
+    多个题目时根路径 / 列出各题目的挂载位置。
+    """
+    challenges = load_challenges(paths)
+    _challenges.extend(challenges)
+    if not _defer_start:
+        start()
+
+    if len(challenges) == 1:
+        challenge = challenges[0]
+        # ASGI 入口：提交校验走异步路径，等待 RPC 时不占用线程；其余路由仍由 Flask 处理
+        return challenge.app, asgi.create_asgi_app(challenge.app, challenge.async_route)
+
+    from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+    app = Flask(__name__)
+
+    @app.route("/", methods=["GET"])
+    def challenge_index():
+        """列出本进程托管的题目及其挂载位置。"""
+        return jsonify({"challenges": [{"name": challenge.name, "url": f"{challenge.mount}/"}
+                                       for challenge in challenges]})
+
+    app.wsgi_app = DispatcherMiddleware(app.wsgi_app, {challenge.mount: challenge.app for challenge in challenges})
+
+    def async_route(method: str, path: str):
+        for challenge in challenges:
+            handler = challenge.async_route(method, path)
+            if handler is not None:
+                return handler
+        return None
+
+    logger.info(f"同一进程托管 {len(challenges)} 个题目: {', '.join(challenge.name for challenge in challenges)}")
+    return app, asgi.create_asgi_app(app, async_route)
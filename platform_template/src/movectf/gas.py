@@ -0,0 +1,169 @@
+"""
+发布交易的 Gas 预算估算与 Gas 消耗记录。
+
+固定的 SUI_GAS_BUDGET 只作为上限：开启 DEPLOY_GAS_DRY_RUN 后，进程内发布先用
+sui_dryRunTransactionBlock 预执行，按实测的计算费 + 存储费乘以 DEPLOY_GAS_MARGIN 确定预算；
+预执行失败的交易不会被提交，也就不消耗 Gas。
+
+每次成功发布的 gasUsed（计算费、存储费、存储退款、不可退还的存储费）追加写入
+DEPLOY_GAS_LOG（JSON Lines），按合约内容哈希区分，用于规划水龙头充值与发现发布成本的回归：
+
+    python3 -m movectf.gas --log gas_usage.jsonl --deploys 1000
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 是否在发布前预执行交易以估算 Gas 预算（仅进程内发布；CLI 发布始终使用 SUI_GAS_BUDGET）
+DEPLOY_GAS_DRY_RUN = os.getenv("DEPLOY_GAS_DRY_RUN", "1") == "1"
+
+# 在预执行实测的 Gas 消耗上增加的余量倍数
+DEPLOY_GAS_MARGIN = float(os.getenv("DEPLOY_GAS_MARGIN", "1.2"))
+
+# Gas 消耗记录文件（JSON Lines），留空不记录
+DEPLOY_GAS_LOG = os.getenv("DEPLOY_GAS_LOG", "gas_usage.jsonl")
+
+# 全节点接受的最小 Gas 预算为参考 Gas 价格的多少倍
+_MIN_BUDGET_UNITS = 1000
+
+# 发布成本比此前的中位数高出多少（比例）时报告为回归
+_REGRESSION_THRESHOLD = 0.1
+
+_MIST_PER_SUI = 1_000_000_000
+
+_lock = threading.Lock()
+_stats = {"deploys": 0, "total_net": 0, "last": None}
+
+
+def parse_gas_used(gas_used: dict) -> dict:
+    """把 effects.gasUsed（数值为字符串）转换为整数，并计算净消耗 net = 计算费 + 存储费 - 存储退款。"""
+    computation = int(gas_used.get("computationCost", 0))
+    storage = int(gas_used.get("storageCost", 0))
+    rebate = int(gas_used.get("storageRebate", 0))
+    return {
+        "computation": computation,
+        "storage": storage,
+        "rebate": rebate,
+        "non_refundable": int(gas_used.get("nonRefundableStorageFee", 0)),
+        "net": computation + storage - rebate,
+    }
+
+
+def estimate_budget(gas_used: dict, gas_price: int, cap: int, margin: float = DEPLOY_GAS_MARGIN) -> int:
+    """
+    由预执行的 gasUsed 估算预算。预算需要覆盖计算费与存储费（存储退款在执行后才返还），
+    不低于全节点的最小预算，也不超过配置的上限。
+    """
+    used = parse_gas_used(gas_used)
+    budget = int((used["computation"] + used["storage"]) * margin)
+    return min(cap, max(budget, gas_price * _MIN_BUDGET_UNITS))
+
+
+def record(contract_hash: str, transaction_hash: str, gas_used: dict, budget: int = None, estimated: bool = False,
+           packages: int = 1):
+    """
+    记录一次成功发布的 Gas 消耗。一个交易发布了多个包时按包数平摊，
+    记录中的各项费用都是单个包的消耗，与逐个发布的记录可以直接比较。
+    """
+    used = {key: value // packages for key, value in parse_gas_used(gas_used).items()}
+    entry = dict(used, at=time.time(), contract_hash=contract_hash,
+                 transaction_hash=transaction_hash, budget=budget, estimated=estimated, packages=packages)
+    with _lock:
+        _stats["deploys"] += packages
+        _stats["total_net"] += entry["net"] * packages
+        _stats["last"] = entry
+        if not DEPLOY_GAS_LOG:
+            return
+        try:
+            with open(DEPLOY_GAS_LOG, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.error(f"写入 Gas 消耗记录 {DEPLOY_GAS_LOG} 失败: {e}")
+    logger.info(f"发布交易 {transaction_hash} 的 Gas 消耗（{packages} 个包，平摊到每个包）: 计算 {entry['computation']}，"
+                f"存储 {entry['storage']}，退款 {entry['rebate']}，净消耗 {entry['net']} MIST（预算 {budget}）。")
+
+
+def stats() -> dict:
+    with _lock:
+        deploys = _stats["deploys"]
+        return {
+            "deploys": deploys,
+            "mean_net": _stats["total_net"] // deploys if deploys else None,
+            "last": _stats["last"],
+            "dry_run": DEPLOY_GAS_DRY_RUN,
+            "log": DEPLOY_GAS_LOG or None,
+        }
+
+
+def _percentile(values: list, q: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(entries: list, deploys: int = 0) -> dict:
+    """
+    按合约内容哈希汇总 Gas 记录：次数、净消耗的平均值 / p95 / 最大值、最近一次，
+    最近一次比此前中位数高出阈值时标记 regression；deploys 给出时估算相应次数部署所需的 SUI。
+    """
+    by_contract = {}
+    for entry in sorted(entries, key=lambda entry: entry["at"]):
+        by_contract.setdefault(entry["contract_hash"], []).append(entry)
+
+    summary = {}
+    for contract_hash, items in by_contract.items():
+        nets = [item["net"] for item in items]
+        # 执行前需要的余额（计算费 + 存储费），决定单次发布至少要准备多少 SUI
+        upfront = [item["computation"] + item["storage"] for item in items]
+        earlier = nets[:-1]
+        baseline = statistics.median(earlier) if earlier else None
+        info = {
+            "count": len(items),
+            "mean_net": int(statistics.mean(nets)),
+            "p95_net": _percentile(nets, 0.95),
+            "max_net": max(nets),
+            "p95_upfront": _percentile(upfront, 0.95),
+            "last_net": nets[-1],
+            "last_at": items[-1]["at"],
+            "regression": baseline is not None and nets[-1] > baseline * (1 + _REGRESSION_THRESHOLD),
+        }
+        if deploys:
+            info["funding_sui"] = round((info["p95_net"] * deploys + info["p95_upfront"]) / _MIST_PER_SUI, 3)
+        summary[contract_hash] = info
+    return summary
+
+
+def load_log(path: str) -> list:
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="汇总发布交易的 Gas 消耗记录。")
+    parser.add_argument("--log", default=DEPLOY_GAS_LOG or "gas_usage.jsonl", help="Gas 消耗记录文件")
+    parser.add_argument("--deploys", type=int, default=0, help="估算这么多次部署所需的 SUI")
+    args = parser.parse_args(argv)
+    try:
+        entries = load_log(args.log)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.log}: {e}", file=sys.stderr)
+        return 1
+    summary = summarize(entries, args.deploys)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if any(info["regression"] for info in summary.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
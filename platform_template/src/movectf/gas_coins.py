@@ -0,0 +1,410 @@
+"""
+部署地址的 Gas 对象池。
+
+所有发布都从同一个地址发出。多个发布同时进行时如果选中同一个 Gas 对象，后提交的交易会因对象版本
+冲突而失败，甚至使该对象在本 epoch 内被锁定。开启后（GAS_COIN_POOL_SIZE > 0），后台线程把部署地址的
+余额拆分为 GAS_COIN_POOL_SIZE 个约 GAS_COIN_BALANCE 的 SUI 对象，每次发布独占租用其中一个，
+交易执行后按 effects.gasObject 更新该对象的版本与余额再归还；余额过低的零碎对象由后台线程合并回
+余额最大的对象。发布因此不必再串行执行，吞吐随并发增长。
+
+设置 GAS_COIN_POOL_PATH 后对象与租用记录保存在 JSON 文件中（文件锁保护），同一台机器上的多个
+worker 进程共享同一组 Gas 对象，同一时间只有一个进程执行拆分与合并。
+"""
+import base64
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from . import gas, rpc, transaction
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 池中保持的 Gas 对象数量（即可以同时进行的发布数），0 表示关闭（发布在进程内串行执行）
+GAS_COIN_POOL_SIZE = int(os.getenv("GAS_COIN_POOL_SIZE", "0"))
+
+# 拆分出的每个 Gas 对象的余额（MIST），应不低于 SUI_GAS_BUDGET
+GAS_COIN_BALANCE = int(os.getenv("GAS_COIN_BALANCE", "500000000"))
+
+# 对象与租用记录的文件路径，留空只保存在进程内存中
+GAS_COIN_POOL_PATH = os.getenv("GAS_COIN_POOL_PATH", "")
+
+# 等待空闲 Gas 对象的最长时间（秒）
+GAS_COIN_LEASE_TIMEOUT = float(os.getenv("GAS_COIN_LEASE_TIMEOUT", "30"))
+
+# 租用超过此时长（秒）视为持有者已退出，对象可以被重新租用
+GAS_COIN_LEASE_TTL = float(os.getenv("GAS_COIN_LEASE_TTL", "300"))
+
+# 后台检查拆分与合并的间隔（秒）
+GAS_COIN_MAINTAIN_INTERVAL = float(os.getenv("GAS_COIN_MAINTAIN_INTERVAL", "60"))
+
+# 余额低于 GAS_COIN_BALANCE 的几分之一时视为零碎对象
+_DUST_FRACTION = 4
+
+# 拆分 / 合并交易的 Gas 预算（MIST）
+_MAINTAIN_BUDGET = 50_000_000
+
+# 单个拆分 / 合并交易处理的对象数上限
+_MAX_OBJECTS_PER_TX = 100
+
+# 等待空闲对象时的轮询间隔（秒）
+_LEASE_POLL_INTERVAL = 0.2
+
+_COINS_PAGE_SIZE = 50
+
+_SUI_COIN_TYPE = "0x2::sui::SUI"
+
+
+class GasCoinUnavailable(Exception):
+    """在 GAS_COIN_LEASE_TIMEOUT 内没有余额足够的空闲 Gas 对象。"""
+
+
+def _ref(coin: dict) -> dict:
+    return {"objectId": coin["objectId"], "version": coin["version"], "digest": coin["digest"]}
+
+
+class Lease:
+    """
+    一次 Gas 支付。payment 为交易的 Gas 对象引用列表；租用的对象执行交易后调用 spent(effects)，
+    提交结果未知时调用 lost()，都不调用表示对象没有被使用（如预执行失败）。
+    """
+
+    def __init__(self, payment: list, coin: dict = None):
+        self.payment = payment
+        self.coin = coin
+        self.after = coin
+
+    def spent(self, effects: dict):
+        """按交易 effects 中的 gasObject 与 gasUsed 更新对象的版本、摘要与余额。"""
+        if self.coin is None:
+            return
+        reference = (effects.get("gasObject") or {}).get("reference")
+        gas_used = effects.get("gasUsed")
+        if not reference or not gas_used:
+            self.lost()
+            return
+        self.after = {
+            "objectId": self.coin["objectId"],
+            "version": int(reference["version"]),
+            "digest": reference["digest"],
+            "balance": self.coin["balance"] - gas.parse_gas_used(gas_used)["net"],
+        }
+
+    def lost(self):
+        """对象的最新版本未知，归还后从池中移除并在下次租用前重新查询。"""
+        self.after = None
+
+
+class GasCoinPool:
+    """单个部署地址的 Gas 对象池。signer 为 keystore.Ed25519Signer。"""
+
+    def __init__(self, signer, size: int = GAS_COIN_POOL_SIZE, coin_balance: int = GAS_COIN_BALANCE,
+                 path: str = GAS_COIN_POOL_PATH):
+        self.signer = signer
+        self.size = size
+        self.coin_balance = coin_balance
+        self.path = path
+        self._state = {"coins": {}, "leases": {}, "dirty": True}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._leased = 0
+        self._waits = 0
+        self._lost = 0
+        self._split = 0
+        self._merged = 0
+        self._failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self):
+        """启动后台拆分 / 合并线程。未开启池时不做任何事。"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._maintain_loop, name="gas-coins", daemon=True)
+        self._thread.start()
+        logger.info(f"Gas 对象池已启动，地址: {self.signer.address}，目标数量: {self.size}，"
+                    f"单个余额: {self.coin_balance}，存储: {self.path or '内存'}")
+
+    @contextlib.contextmanager
+    def lease(self, min_balance: int, timeout: float = GAS_COIN_LEASE_TIMEOUT):
+        """独占租用一个余额不低于 min_balance 的 Gas 对象，产出 Lease，退出时归还。"""
+        coin = self._acquire(min_balance, timeout)
+        lease = Lease([_ref(coin)], coin)
+        try:
+            yield lease
+        finally:
+            if lease.after is None:
+                self._lost += 1
+            self._release([coin["objectId"]], lease.after)
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self._locked() as state:
+            coins = list(state["coins"].values())
+            leased = len(self._active_leases(state))
+        return {
+            "enabled": True,
+            "address": self.signer.address,
+            "target": self.size,
+            "coins": len(coins),
+            "leased": leased,
+            "balance": sum(coin["balance"] for coin in coins),
+            "leases": self._leased,
+            "waits": self._waits,
+            "lost": self._lost,
+            "split": self._split,
+            "merged": self._merged,
+            "failures": self._failures,
+        }
+
+    def _acquire(self, min_balance: int, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        waited = False
+        fetched = None
+        while True:
+            try:
+                with self._locked() as state:
+                    if fetched is not None:
+                        self._merge(state, *fetched)
+                        fetched = None
+                    changes = state.get("changes", 0) if state["dirty"] else None
+                    coin = self._take(state, min_balance) if changes is None else None
+                if coin is not None:
+                    return coin
+                if changes is not None:
+                    # 记录已失效：在锁外查询全节点，下一轮回到锁内合并后重新检查
+                    fetched = (self._fetch(), changes)
+                    continue
+            except rpc.RpcError as e:
+                raise GasCoinUnavailable(f"查询 Gas 对象失败: {e}") from e
+
+            self._wake.set()  # 通知后台线程检查是否需要拆分
+            if not waited:
+                waited = True
+                self._waits += 1
+            if time.monotonic() + _LEASE_POLL_INTERVAL > deadline:
+                raise GasCoinUnavailable(
+                    f"{timeout:.0f} 秒内没有余额不低于 {min_balance} 的空闲 Gas 对象（地址 {self.signer.address}）。")
+            time.sleep(_LEASE_POLL_INTERVAL)
+
+    def _take(self, state: dict, min_balance: int):
+        """租用一个余额不低于 min_balance 的空闲对象（调用方持有锁），没有时返回 None。"""
+        leased = self._active_leases(state)
+        # 优先使用余额刚好足够的对象，余额最大的对象留给拆分
+        candidates = [coin for object_id, coin in state["coins"].items()
+                      if object_id not in leased and coin["balance"] >= min_balance]
+        if not candidates:
+            return None
+        coin = min(candidates, key=lambda coin: coin["balance"])
+        state["leases"][coin["objectId"]] = {"pid": os.getpid(), "at": time.time()}
+        self._leased += 1
+        return dict(coin)
+
+    def _release(self, object_ids: list, after: dict = None):
+        with self._locked() as state:
+            for object_id in object_ids:
+                state["leases"].pop(object_id, None)
+            if after is not None:
+                state["coins"][after["objectId"]] = after
+                return
+            for object_id in object_ids:
+                state["coins"].pop(object_id, None)
+            state["dirty"] = True
+            state["changes"] = state.get("changes", 0) + 1
+
+    def _active_leases(self, state: dict) -> dict:
+        now = time.time()
+        return {object_id: lease for object_id, lease in state["leases"].items()
+                if now - lease["at"] < GAS_COIN_LEASE_TTL}
+
+    def _fetch(self) -> dict:
+        """从全节点分页读取部署地址的 SUI 对象。不持有任何锁，结果由 _merge 合并进状态。"""
+        client = rpc.get_client()
+        coins, cursor = {}, None
+        while True:
+            page = client.call("suix_getCoins", [self.signer.address, _SUI_COIN_TYPE, cursor, _COINS_PAGE_SIZE])
+            for coin in page.get("data") or []:
+                coins[coin["coinObjectId"]] = {
+                    "objectId": coin["coinObjectId"],
+                    "version": int(coin["version"]),
+                    "digest": coin["digest"],
+                    "balance": int(coin["balance"]),
+                }
+            cursor = page.get("nextCursor")
+            if not page.get("hasNextPage") or not cursor:
+                return coins
+
+    def _merge(self, state: dict, coins: dict, changes: int):
+        """
+        用查询结果替换对象记录（调用方持有锁）。租用中的对象、以及查询期间归还后版本更新的对象保留本地记录；
+        查询开始后又有对象失效（changes 变化）时状态仍标记为需要重新查询。
+        """
+        leases = self._active_leases(state)
+        for object_id, coin in state["coins"].items():
+            if object_id in leases or (object_id in coins and coin["version"] > coins[object_id]["version"]):
+                coins[object_id] = coin
+        state["coins"] = coins
+        state["leases"] = leases
+        if state.get("changes", 0) == changes:
+            state["dirty"] = False
+
+    def _plan(self, state: dict):
+        """
+        选出本次维护的 Gas 来源对象（余额最大的空闲对象）、要合并的零碎对象与要拆分出的数量。
+        不需要维护时返回 None。
+        """
+        leased = self._active_leases(state)
+        idle = [coin for object_id, coin in state["coins"].items() if object_id not in leased]
+        if not idle:
+            return None
+        source = max(idle, key=lambda coin: coin["balance"])
+        threshold = self.coin_balance // _DUST_FRACTION
+        dust = [coin for coin in idle
+                if coin is not source and coin["balance"] < threshold][:_MAX_OBJECTS_PER_TX]
+        usable = sum(1 for coin in state["coins"].values()
+                     if coin is not source and coin["balance"] >= threshold)
+        # 拆分后来源对象自己仍保留至少一份余额，也作为池中的一个对象
+        available = source["balance"] + sum(coin["balance"] for coin in dust) - _MAINTAIN_BUDGET
+        split = min(self.size - 1 - usable, available // self.coin_balance - 1, _MAX_OBJECTS_PER_TX)
+        split = max(split, 0)
+        if not dust and not split:
+            return None
+        return source, dust, split
+
+    def maintain(self) -> bool:
+        """执行一次拆分与合并，提交了交易时返回 True。"""
+        with self._locked() as state:
+            changes = state.get("changes", 0)
+        coins = self._fetch()
+        with self._locked() as state:
+            self._merge(state, coins, changes)
+            plan = self._plan(state) if not state["dirty"] else None
+            if plan is None:
+                return False
+            source, dust, split = plan
+            object_ids = [source["objectId"]] + [coin["objectId"] for coin in dust]
+            for object_id in object_ids:
+                state["leases"][object_id] = {"pid": os.getpid(), "at": time.time()}
+
+        try:
+            self._submit(source, dust, split)
+        finally:
+            # 拆分与合并改变了对象集合，归还后重新查询
+            self._release(object_ids)
+        return True
+
+    def _submit(self, source: dict, dust: list, split: int):
+        sender = self.signer.address
+        inputs = [transaction.owned_object(_ref(coin)) for coin in dust]
+        commands = []
+        if dust:
+            commands.append(transaction.merge_coins_command(
+                transaction.GAS_COIN, [transaction.input_arg(i) for i in range(len(dust))]))
+        if split:
+            amount, recipient = len(inputs), len(inputs) + 1
+            inputs += [transaction.pure_u64(self.coin_balance), transaction.pure_address(sender)]
+            commands.append(transaction.split_coins_command(
+                transaction.GAS_COIN, [transaction.input_arg(amount)] * split))
+            split_index = len(commands) - 1
+            commands.append(transaction.transfer_objects_command(
+                [transaction.nested_result_arg(split_index, i) for i in range(split)],
+                transaction.input_arg(recipient)))
+
+        client = rpc.get_client()
+        gas_price = int(client.call("suix_getReferenceGasPrice", []))
+        tx_bytes = transaction.transaction_data(sender, inputs, commands, [_ref(source)], gas_price, _MAINTAIN_BUDGET)
+        result = client.call("sui_executeTransactionBlock",
+                             [base64.b64encode(tx_bytes).decode(), [self.signer.sign_transaction(tx_bytes)],
+                              {"showEffects": True}, "WaitForLocalExecution"])
+        status = result.get("effects", {}).get("status", {})
+        if status.get("status") != "success":
+            raise RuntimeError(f"交易 {result.get('digest')} 执行失败: {status.get('error')}")
+        self._split += split
+        self._merged += len(dust)
+        logger.info(f"Gas 对象池已拆分出 {split} 个对象、合并 {len(dust)} 个零碎对象（交易 {result.get('digest')}）。")
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """在锁内读取并修改池的状态；文件模式下用文件锁与其他进程互斥，修改后原子地写回。"""
+        with self._lock:
+            if not self.path:
+                yield self._state
+                return
+
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.path, encoding="utf-8") as f:
+                            stored = json.load(f)
+                    except (OSError, ValueError):
+                        stored = {}
+                    # 文件中可能保存着其他部署地址的对象
+                    state = stored.get(self.signer.address) or {"coins": {}, "leases": {}, "dirty": True}
+                    yield state
+                    stored[self.signer.address] = state
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(stored, f)
+                    os.replace(tmp_path, self.path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def _maintain_lease(self):
+        """文件模式下保证同一时间只有一个进程在拆分与合并；拿不到时产出 False。"""
+        if not self.path:
+            yield True
+            return
+        with open(self.path + ".maintain", "a") as lease_file:
+            try:
+                fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lease_file, fcntl.LOCK_UN)
+
+    def _maintain_loop(self):
+        while True:
+            try:
+                with self._maintain_lease() as leader:
+                    if leader:
+                        self.maintain()
+            except Exception as e:
+                self._failures += 1
+                logger.error(f"Gas 对象池拆分 / 合并失败: {e}")
+            self._wake.wait(GAS_COIN_MAINTAIN_INTERVAL)
+            self._wake.clear()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(signer) -> GasCoinPool:
+    """signer 地址对应的 Gas 对象池（进程内共享，首次取得时启动后台线程）。"""
+    with _pools_lock:
+        pool = _pools.get(signer.address)
+        if pool is None:
+            pool = _pools[signer.address] = GasCoinPool(signer)
+            pool.start()
+        return pool
+
+
+def stats() -> dict:
+    with _pools_lock:
+        pools = list(_pools.values())
+    if not pools:
+        return {"enabled": GAS_COIN_POOL_SIZE > 0}
+    return {pool.signer.address: pool.stats() for pool in pools}
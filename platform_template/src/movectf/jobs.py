@@ -0,0 +1,239 @@
+"""
+后台部署任务。
+
+“开始挑战”不再在 HTTP 请求内同步执行整个发布流程：请求只创建一个任务并立即返回任务 ID，
+发布在后台线程中进行，前端通过状态接口或 SSE（server-sent events）流获取进度。
+
+任务阶段：
+    queued     已接受，等待执行
+    building   正在编译并发布合约
+    submitted  发布交易已提交并执行，等待进入 checkpoint
+    finalized  部署完成（结果中包含 package_id、transaction_hash 与 created_objects）
+    failed     部署失败（结果中包含 error 与 details）
+
+提交时可以带幂等键（如请求头 Idempotency-Key）：相同的键在任务保留期内总是返回同一个任务，
+客户端因网络错误重试请求时不会创建新任务（有共享状态后端时，重试落到其他进程也是如此）。
+
+任务可以带作用域（如多租户模式下的租户令牌）：每个作用域同一时间只有一个未结束的任务，幂等键与任务查询
+也只在作用域内有效；不同作用域的任务由最多 DEPLOY_JOB_WORKERS 个线程并行执行。
+
+任务在创建它的进程中执行；传入共享状态后端（movectf/state.py）时，每次阶段变化同时写入后端，
+多个 worker 进程部署时，落到其他进程的状态查询与 SSE 流从后端读取（SSE 流按 REMOTE_POLL_INTERVAL 轮询）。
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+BUILDING = "building"
+SUBMITTED = "submitted"
+FINALIZED = "finalized"
+FAILED = "failed"
+
+TERMINAL_PHASES = (FINALIZED, FAILED)
+
+# 已结束的任务保留多久（秒）以便查询，之后被清理
+_FINISHED_TTL = 3600
+
+# SSE 流的心跳间隔（秒），防止代理因空闲断开连接
+SSE_HEARTBEAT_INTERVAL = 15
+
+# 同时执行的部署任务数（不同作用域之间），同一作用域的任务总是依次执行
+DEPLOY_JOB_WORKERS = int(os.getenv("DEPLOY_JOB_WORKERS", "4"))
+
+# 其他进程创建的任务，SSE 流从共享状态中读取进度的间隔（秒）
+REMOTE_POLL_INTERVAL = 0.5
+
+
+class DeployJob:
+    """单个部署任务的状态。version 每次更新加一，用于等待变化。"""
+
+    def __init__(self, scope: str = None):
+        self.id = uuid.uuid4().hex
+        self.scope = scope
+        self.phase = QUEUED
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+        self.history = [{"phase": QUEUED, "at": self.created_at}]
+        self.result = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "phase": self.phase,
+            "done": self.phase in TERMINAL_PHASES,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "history": list(self.history),
+            **self.result,
+        }
+
+
+class DeployJobs:
+    """
+    部署任务管理器。runner(report, scope) 执行实际部署并返回 deploy_contract 格式的结果字典，
+    过程中可调用 report(phase, **fields) 汇报阶段；scope 为提交任务时的作用域。
+    store 为共享状态后端，只在多个进程共享时使用。
+    """
+
+    def __init__(self, runner, max_workers: int = DEPLOY_JOB_WORKERS, store=None):
+        self.runner = runner
+        self.store = store if store is not None and store.shared else None
+        self._jobs = {}
+        self._keys = {}  # (作用域, 幂等键) -> 任务 ID
+        self._active = {}  # 作用域 -> 最近的任务
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="deploy-job")
+
+    def submit(self, idempotency_key: str = None, scope: str = None) -> tuple[dict, bool]:
+        """
+        创建部署任务并返回 (任务快照, 是否新建)。幂等键对应的任务仍在保留期内时返回该任务；
+        作用域内已有未结束的任务时直接返回该任务，避免重复点击触发多次发布。
+        有共享状态后端时，幂等键通过后端的原子 add 记录，落到其他进程的重试请求也返回同一个任务。
+        """
+        with self._cond:
+            self._cleanup()
+            job = self._jobs.get(self._keys.get((scope, idempotency_key)))
+            if job is not None:
+                return job.snapshot(), False
+            active = self._active.get(scope)
+            job = active if active is not None and active.phase not in TERMINAL_PHASES else DeployJob(scope)
+
+        if idempotency_key and self.store is not None:
+            # 后端请求不在 self._cond 内执行，避免阻塞本进程的任务状态更新
+            job_id, created = self.store.add(f"job-key:{scope or ''}:{idempotency_key}", job.id, ttl=_FINISHED_TTL)
+            if not created and job_id != job.id:
+                snapshot = self.get(job_id, scope)
+                if snapshot is not None:
+                    return snapshot, False
+
+        with self._cond:
+            if idempotency_key:
+                self._keys[(scope, idempotency_key)] = job.id
+            if job is active:
+                return job.snapshot(), False
+            self._jobs[job.id] = job
+            self._active[scope] = job
+            snapshot = job.snapshot()
+        self._publish(job, snapshot)
+        self._executor.submit(self._run, job)
+        logger.info(f"已创建部署任务 {job.id}。")
+        return snapshot, True
+
+    def get(self, job_id: str, scope: str = None):
+        """返回任务快照（本进程没有时从共享状态中读取）；任务不存在或属于其他作用域时返回 None。"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.snapshot() if job.scope == scope else None
+        record = self.store.get(f"job:{job_id}") if self.store else None
+        return record["snapshot"] if record and record["scope"] == scope else None
+
+    def drain(self, timeout: float) -> bool:
+        """等待所有进行中的任务结束（优雅退出时调用），超时返回 False。"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(job.phase in TERMINAL_PHASES for job in self._active.values()), timeout)
+
+    def wait(self, job_id: str, version: int = -1, timeout: float = None):
+        """
+        等待任务版本超过 version 后返回 (快照, 版本)；超时返回 (None, version)，任务不存在时抛出 KeyError。
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if not self._cond.wait_for(lambda: job.version > version, timeout):
+                return None, version
+            return job.snapshot(), job.version
+
+    def events(self, job_id: str):
+        """
+        以 SSE 格式逐条产出任务的阶段变化，任务结束后停止；空闲时发送心跳注释。
+        """
+        with self._cond:
+            local = job_id in self._jobs
+        if not local:
+            yield from self._remote_events(job_id)
+            return
+        version = -1
+        while True:
+            snapshot, version = self.wait(job_id, version, timeout=SSE_HEARTBEAT_INTERVAL)
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: phase\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+            if snapshot["done"]:
+                return
+
+    def _remote_events(self, job_id: str):
+        """其他进程创建的任务：轮询共享状态，阶段变化时产出事件。"""
+        seen = 0
+        idle = 0.0
+        while True:
+            record = self.store.get(f"job:{job_id}") if self.store else None
+            if record is None:
+                return
+            snapshot = record["snapshot"]
+            if len(snapshot["history"]) > seen:
+                seen = len(snapshot["history"])
+                idle = 0.0
+                yield f"event: phase\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+                if snapshot["done"]:
+                    return
+            elif idle >= SSE_HEARTBEAT_INTERVAL:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            time.sleep(REMOTE_POLL_INTERVAL)
+            idle += REMOTE_POLL_INTERVAL
+
+    def _update(self, job: DeployJob, phase: str, **fields):
+        with self._cond:
+            job.phase = phase
+            job.updated_at = time.time()
+            job.version += 1
+            job.history.append({"phase": phase, "at": job.updated_at})
+            job.result.update(fields)
+            snapshot = job.snapshot()
+            self._cond.notify_all()
+        self._publish(job, snapshot)
+        logger.info(f"部署任务 {job.id} 进入阶段 {phase}。")
+
+    def _publish(self, job: DeployJob, snapshot: dict):
+        if self.store is not None:
+            self.store.set(f"job:{job.id}", {"scope": job.scope, "snapshot": snapshot}, ttl=_FINISHED_TTL)
+
+    def _run(self, job: DeployJob):
+        def report(phase: str, **fields):
+            if phase not in TERMINAL_PHASES:
+                self._update(job, phase, **fields)
+
+        try:
+            result = self.runner(report, job.scope)
+        except Exception as e:
+            logger.critical(f"部署任务 {job.id} 发生意外错误: {e}", exc_info=True)
+            result = {"success": False, "error": f"部署合约时发生未知错误: {e}", "details": "请检查服务器日志获取更多信息。"}
+
+        if result["success"]:
+            self._update(job, FINALIZED, package_id=result["package_id"], transaction_hash=result["transaction_hash"],
+                         created_objects=result.get("created_objects", []))
+        else:
+            self._update(job, FAILED, error=result.get("error", "未知错误"),
+                         details=result.get("details", "请检查服务器日志获取更多信息。"))
+
+    def _cleanup(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.phase in TERMINAL_PHASES and now - job.updated_at > _FINISHED_TTL]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired:
+            self._keys = {key: job_id for key, job_id in self._keys.items() if job_id in self._jobs}
+            self._active = {scope: job for scope, job in self._active.items() if job.id in self._jobs}
@@ -0,0 +1,92 @@
+"""
+从 Sui CLI 的密钥库加载签名密钥，在进程内签名交易。
+
+密钥库（client.yaml 中 keystore.File 指向的文件）是 base64(flag || 私钥) 的 JSON 数组，
+目前只支持 Ed25519（flag 0x00）。签名需要 PyNaCl（可选依赖），未安装时 load_signer 抛出 KeystoreError。
+"""
+import base64
+import json
+import os
+import re
+
+from . import transaction
+
+try:
+    from nacl.signing import SigningKey
+except ImportError:  # PyNaCl 为可选依赖
+    SigningKey = None
+
+# --- 配置常量 ---
+# Sui CLI 配置文件（活跃地址与密钥库路径）
+SUI_CLIENT_CONFIG = os.getenv("SUI_CLIENT_CONFIG", os.path.expanduser("~/.sui/sui_config/client.yaml"))
+
+_ED25519_FLAG = 0
+
+
+class KeystoreError(Exception):
+    """无法读取 CLI 配置或密钥库，或找不到可用的签名密钥。"""
+
+
+class Ed25519Signer:
+    """持有一个 Ed25519 私钥，address 为对应的 Sui 地址。"""
+
+    def __init__(self, private_key: bytes):
+        self._key = SigningKey(private_key)
+        self.public_key = bytes(self._key.verify_key)
+        self.address = "0x" + transaction.blake2b256(bytes([_ED25519_FLAG]) + self.public_key).hex()
+
+    def sign_transaction(self, tx_bytes: bytes) -> str:
+        """返回 sui_executeTransactionBlock 需要的序列化签名：base64(flag || 签名 || 公钥)。"""
+        signature = self._key.sign(transaction.signing_digest(tx_bytes)).signature
+        return base64.b64encode(bytes([_ED25519_FLAG]) + signature + self.public_key).decode()
+
+
+def _read_config(config_path: str) -> str:
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            return f.read()
+    except OSError as e:
+        raise KeystoreError(f"无法读取 Sui CLI 配置 {config_path}: {e}") from e
+
+
+def active_address(config_path: str = SUI_CLIENT_CONFIG) -> str:
+    """读取 Sui CLI 配置中的活跃地址。"""
+    match = re.search(r'^active_address:\s*"?(0x[0-9a-fA-F]+)"?', _read_config(config_path), re.M)
+    if not match:
+        raise KeystoreError(f"Sui CLI 配置 {config_path} 中没有 active_address。")
+    return match.group(1)
+
+
+def keystore_path(config_path: str = SUI_CLIENT_CONFIG) -> str:
+    match = re.search(r'^\s*File:\s*"?([^"\n]+?)"?\s*$', _read_config(config_path), re.M)
+    if not match:
+        raise KeystoreError(f"Sui CLI 配置 {config_path} 中没有 keystore.File。")
+    return match.group(1)
+
+
+def load_signers(path: str) -> dict:
+    """加载密钥库中的全部 Ed25519 密钥，返回 {地址: Ed25519Signer}；其他签名方案的密钥被跳过。"""
+    if SigningKey is None:
+        raise KeystoreError("未安装 PyNaCl，无法在进程内签名交易。")
+    try:
+        with open(path, encoding="utf-8") as f:
+            encoded_keys = json.load(f)
+    except (OSError, ValueError) as e:
+        raise KeystoreError(f"无法读取密钥库 {path}: {e}") from e
+    signers = {}
+    for encoded in encoded_keys:
+        raw = base64.b64decode(encoded)
+        if raw[0] == _ED25519_FLAG and len(raw) == 33:
+            signer = Ed25519Signer(raw[1:])
+            signers[signer.address] = signer
+    return signers
+
+
+def load_signer(address: str = None, config_path: str = SUI_CLIENT_CONFIG) -> Ed25519Signer:
+    """加载指定地址（缺省为 CLI 的活跃地址）的签名密钥。"""
+    address = (address or active_address(config_path)).lower()
+    path = keystore_path(config_path)
+    signer = load_signers(path).get(address)
+    if signer is None:
+        raise KeystoreError(f"密钥库 {path} 中没有地址 {address} 的 Ed25519 密钥。")
+    return signer
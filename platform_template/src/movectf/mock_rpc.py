@@ -0,0 +1,740 @@
+"""
+本地模拟的 Sui JSON-RPC 服务，用于在无网络的单机上压测题目服务。
+
+支持 sui_getTransactionBlock、sui_multiGetTransactionBlocks、suix_queryEvents
+（以及预热用的 sui_getChainIdentifier）；部署用的 suix_getCoins、suix_getBalance、suix_getReferenceGasPrice 与
+sui_dryRunTransactionBlock、sui_executeTransactionBlock 解码 transaction.py 支持的交易子集，不校验签名。
+每个地址初始持有 3 个各 10 SUI 的 Gas 对象，执行交易时按 Sui 的规则检查并更新对象版本
+（引用了旧版本的交易被拒绝，可以暴露并发发布争用同一 Gas 对象的问题），支持 SplitCoins / MergeCoins；
+每次发布生成一个新的 Package ID（sui_multiGetObjects 可查询其 UpgradeCap），Gas 消耗按交易大小近似计算。交易来自录制的 fixture 文件；
+fixture 中没有的哈希按题目的 verify.toml 即时生成一笔能通过校验的合成交易，
+以 missing 开头的哈希视为不存在。可注入固定延迟、随机抖动、5xx、429 与挂起。
+
+    # 启动（在题目的 /app 目录下，合成交易按 move_contract/verify.toml 生成）
+    python3 -m movectf.mock_rpc serve --port 9000 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+
+    # 题目服务指向模拟节点，并使用与模拟节点相同的 Package ID
+    SUI_RPC_ENDPOINT=http://127.0.0.1:9000 DEPLOYED_PACKAGE_ID=<--package-id> python3 app.py
+
+    # 从真实全节点录制 fixture
+    python3 -m movectf.mock_rpc record --out fixtures.json <交易哈希> ...
+
+GET /stats 返回各方法的请求数与注入的错误数。
+"""
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import rpc, spec, transaction
+
+logger = logging.getLogger(__name__)
+
+# 合成交易默认使用的 Package ID
+MOCK_PACKAGE_ID = "0x" + "0" * 62 + "42"
+
+# sui_getTransactionBlock 的查询选项与响应字段的对应关系
+_OPTION_FIELDS = {
+    "showInput": "transaction",
+    "showRawInput": "rawTransaction",
+    "showEffects": "effects",
+    "showEvents": "events",
+    "showObjectChanges": "objectChanges",
+    "showBalanceChanges": "balanceChanges",
+}
+
+_FULL_OPTIONS = {option: True for option in _OPTION_FIELDS}
+
+# 全节点 suix_queryEvents 单页的最大条数
+_QUERY_EVENTS_MAX_LIMIT = 50
+
+
+class _RpcFault(Exception):
+    """返回给客户端的 JSON-RPC error。"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class TransactionStore:
+    """
+    模拟节点的交易数据：录制的 fixture 加上按需生成的合成交易。
+    合成交易的事件类型与字段由 verify.toml 推导，保证能通过题目的校验。
+    """
+
+    def __init__(self, package_id: str, verification: spec.VerificationSpec = None, context: dict = None,
+                 fixtures: list = None, event_pool: int = 0):
+        self.package_id = package_id
+        self.verification = verification
+        self.context = context or {}
+        self._fixtures = {block["digest"]: block for block in fixtures or []}
+        self._events = [event for block in self._fixtures.values() for event in block.get("events") or []]
+        for i in range(event_pool):
+            self._events.extend(self._synthetic(f"synthetic-{i:06d}")["events"])
+
+    def get(self, tx_digest: str):
+        """返回完整的交易块，不存在时返回 None。"""
+        block = self._fixtures.get(tx_digest)
+        if block is not None:
+            return block
+        if tx_digest.startswith("missing"):
+            return None
+        return self._synthetic(tx_digest)
+
+    def events(self) -> list:
+        return self._events
+
+    def add_executed(self, tx_digest: str, effects: dict, object_changes: list) -> dict:
+        """记录一笔已执行的交易（已进入 checkpoint），返回完整的交易块。"""
+        block = {
+            "digest": tx_digest,
+            "checkpoint": str(2_000_000 + len(self._fixtures)),
+            "timestampMs": str(int(time.time() * 1000)),
+            "effects": effects,
+            "events": [],
+            "objectChanges": object_changes,
+            "balanceChanges": [],
+        }
+        self._fixtures[tx_digest] = block
+        return block
+
+    def _synthetic(self, tx_digest: str) -> dict:
+        seed = int.from_bytes(hashlib.sha256(tx_digest.encode()).digest()[:8], "big")
+        sender = "0x" + hashlib.sha256(f"sender:{tx_digest}".encode()).hexdigest()
+        event_type, parsed_json = self._event_shape()
+        return {
+            "digest": tx_digest,
+            "checkpoint": str(1_000_000 + seed % 1_000_000),
+            "timestampMs": str(1_700_000_000_000 + seed % 10_000_000_000),
+            "transaction": {
+                "data": {
+                    "messageVersion": "v1",
+                    "transaction": {"kind": "ProgrammableTransaction", "inputs": [], "transactions": []},
+                    "sender": sender,
+                },
+                "txSignatures": [],
+            },
+            "rawTransaction": "",
+            "effects": {
+                "messageVersion": "v1",
+                "status": {"status": "success"},
+                "transactionDigest": tx_digest,
+                "gasUsed": {"computationCost": "1000000", "storageCost": "1976000",
+                            "storageRebate": "978120", "nonRefundableStorageFee": "9880"},
+            },
+            "events": [{
+                "id": {"txDigest": tx_digest, "eventSeq": "0"},
+                "packageId": self.package_id,
+                "transactionModule": event_type.split("::")[1],
+                "sender": sender,
+                "type": event_type,
+                "parsedJson": parsed_json,
+                "bcs": "",
+            }],
+            "objectChanges": [],
+            "balanceChanges": [],
+        }
+
+    def _event_shape(self) -> tuple[str, dict]:
+        verification = self.verification
+        if verification is None or verification.event_suffix is None:
+            return f"{self.package_id}::challenge::FlagEvent", {}
+        parsed_json = {}
+        for rule in verification.fields:
+            parsed_json[rule.name] = rule.expected(self.context) if rule.check == "equals" else True
+        return f"{self.package_id}{verification.event_suffix}", parsed_json
+
+
+def _select_fields(block: dict, options: dict) -> dict:
+    """按查询选项裁剪交易块，与全节点只返回请求字段的行为一致。"""
+    options = options or {}
+    hidden = {field for option, field in _OPTION_FIELDS.items() if not options.get(option)}
+    return {key: value for key, value in block.items() if key not in hidden}
+
+
+def _event_matches(event: dict, query: dict) -> bool:
+    if not query or "All" in query:
+        return True
+    if "MoveEventType" in query:
+        return event["type"] == query["MoveEventType"]
+    if "Transaction" in query:
+        return event["id"]["txDigest"] == query["Transaction"]
+    if "Sender" in query:
+        return event["sender"] == query["Sender"]
+    if "MoveModule" in query:
+        module = query["MoveModule"]
+        return event["packageId"] == module.get("package") and event["transactionModule"] == module.get("module")
+    if "MoveEventModule" in query:
+        module = query["MoveEventModule"]
+        return event["type"].startswith(f"{module.get('package')}::{module.get('module')}::")
+    raise _RpcFault(-32602, f"不支持的事件过滤条件: {', '.join(query)}")
+
+
+def _decode_tx_bytes(tx_bytes: str) -> bytes:
+    try:
+        return base64.b64decode(tx_bytes, validate=True)
+    except ValueError:
+        raise _RpcFault(-32602, "Invalid params: txBytes is not valid base64.")
+
+
+def _gas_used(raw: bytes) -> dict:
+    """近似的 Gas 消耗：固定的计算费，存储费与交易大小成正比（测试网存储价格 76 × 100 单位/字节）。"""
+    return {"computationCost": "1000000", "storageCost": str(len(raw) * 7600),
+            "storageRebate": "978120", "nonRefundableStorageFee": "9880"}
+
+
+class _BcsReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n: int) -> bytes:
+        if self.pos + n > len(self.data):
+            raise _RpcFault(-32602, "Invalid params: txBytes is truncated.")
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def u8(self) -> int:
+        return self.take(1)[0]
+
+    def u16(self) -> int:
+        return int.from_bytes(self.take(2), "little")
+
+    def u64(self) -> int:
+        return int.from_bytes(self.take(8), "little")
+
+    def uleb128(self) -> int:
+        n, shift = 0, 0
+        while True:
+            byte = self.u8()
+            n |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return n
+            shift += 7
+
+    def bytes_(self) -> bytes:
+        return self.take(self.uleb128())
+
+    def address(self) -> str:
+        return "0x" + self.take(32).hex()
+
+    def object_ref(self) -> dict:
+        return {"objectId": self.address(), "version": self.u64(), "digest": transaction.b58encode(self.bytes_())}
+
+    def argument(self) -> tuple:
+        kind = self.u8()
+        if kind == transaction._ARGUMENT_GAS_COIN:
+            return ("gas",)
+        if kind in (transaction._ARGUMENT_INPUT, transaction._ARGUMENT_RESULT):
+            return ("input" if kind == transaction._ARGUMENT_INPUT else "result", self.u16())
+        if kind == transaction._ARGUMENT_NESTED_RESULT:
+            return ("nested", self.u16(), self.u16())
+        raise _RpcFault(-32602, f"Invalid params: unknown argument kind {kind}.")
+
+
+def _parse_transaction(raw: bytes) -> dict:
+    """解码 transaction.py 编码的 TransactionData（不支持的命令与输入按参数错误拒绝）。"""
+    reader = _BcsReader(raw)
+    if reader.u8() != transaction._TRANSACTION_DATA_V1 or reader.u8() != transaction._KIND_PROGRAMMABLE:
+        raise _RpcFault(-32602, "Invalid params: only programmable transactions are supported by the mock node.")
+    inputs = []
+    for _ in range(reader.uleb128()):
+        kind = reader.u8()
+        if kind == transaction._CALL_ARG_PURE:
+            inputs.append(("pure", reader.bytes_()))
+        elif kind == transaction._CALL_ARG_OBJECT and reader.u8() == transaction._OBJECT_ARG_IMM_OR_OWNED:
+            inputs.append(("object", reader.object_ref()))
+        else:
+            raise _RpcFault(-32602, "Invalid params: unsupported input kind.")
+    commands = []
+    for _ in range(reader.uleb128()):
+        kind = reader.u8()
+        if kind == transaction._COMMAND_TRANSFER_OBJECTS:
+            objects = [reader.argument() for _ in range(reader.uleb128())]
+            commands.append(("transfer", objects, reader.argument()))
+        elif kind in (transaction._COMMAND_SPLIT_COINS, transaction._COMMAND_MERGE_COINS):
+            target = reader.argument()
+            args = [reader.argument() for _ in range(reader.uleb128())]
+            commands.append(("split" if kind == transaction._COMMAND_SPLIT_COINS else "merge", target, args))
+        elif kind == transaction._COMMAND_PUBLISH:
+            if sum(command[0] == "publish" for command in commands) >= transaction.MAX_PUBLISH_PER_TRANSACTION:
+                raise _RpcFault(-32602, f"Invalid params: more than {transaction.MAX_PUBLISH_PER_TRANSACTION} "
+                                        f"publish commands in one transaction.")
+            modules = [reader.bytes_() for _ in range(reader.uleb128())]
+            dependencies = [reader.address() for _ in range(reader.uleb128())]
+            commands.append(("publish", modules, dependencies))
+        else:
+            raise _RpcFault(-32602, f"Invalid params: command {kind} is not supported by the mock node.")
+    sender = reader.address()
+    payment = [reader.object_ref() for _ in range(reader.uleb128())]
+    reader.address()  # Gas 所有者
+    gas_price, gas_budget = reader.u64(), reader.u64()
+    return {"sender": sender, "inputs": inputs, "commands": commands, "gas_payment": payment,
+            "gas_price": gas_price, "gas_budget": gas_budget}
+
+
+def _coin_digest(object_id: str, version: int) -> str:
+    return transaction.b58encode(hashlib.sha256(f"{object_id}:{version}".encode()).digest())
+
+
+def _normalize_address(address: str) -> str:
+    return "0x" + transaction.address_bytes(address).hex()
+
+
+class MockSuiNode:
+    """JSON-RPC 方法的实现与错误注入配置。"""
+
+    def __init__(self, store: TransactionStore, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, throttle_rate: float = 0, hang_rate: float = 0, hang_ms: float = 30000):
+        self.store = store
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.hang_rate = hang_rate
+        self.hang = hang_ms / 1000
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._coins = {}  # object_id -> {"owner", "version", "balance"}
+        self._funded = set()
+        self._upgrade_caps = {}  # object_id -> {"package", "owner", "version"}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def inject(self):
+        """模拟网络延迟并按概率注入故障。返回要直接响应的 HTTP 状态码，正常处理时返回 None。"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        roll = random.random()
+        if roll < self.hang_rate:
+            self._count("injected_hang")
+            delay += self.hang
+        time.sleep(delay)
+        roll = random.random()
+        if roll < self.error_rate:
+            self._count("injected_503")
+            return 503
+        if roll < self.error_rate + self.throttle_rate:
+            self._count("injected_429")
+            return 429
+        return None
+
+    def handle(self, request: dict) -> dict:
+        method = request.get("method")
+        params = request.get("params") or []
+        self._count(method or "invalid")
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            handler = self._METHODS.get(method)
+            if handler is None:
+                raise _RpcFault(-32601, f"Method not found: {method}")
+            response["result"] = handler(self, *params)
+        except _RpcFault as e:
+            response["error"] = {"code": e.code, "message": e.message}
+        except TypeError as e:
+            response["error"] = {"code": -32602, "message": f"Invalid params: {e}"}
+        return response
+
+    def get_chain_identifier(self):
+        return "4c78adac"
+
+    def get_transaction_block(self, tx_digest: str, options: dict = None):
+        block = self.store.get(tx_digest)
+        if block is None:
+            raise _RpcFault(-32602, f"Could not find the referenced transaction [TransactionDigest({tx_digest})].")
+        return _select_fields(block, options)
+
+    def multi_get_transaction_blocks(self, tx_digests: list, options: dict = None):
+        if len(tx_digests) > rpc.MULTI_GET_MAX_DIGESTS:
+            raise _RpcFault(-32602, f"Requested {len(tx_digests)} digests, max {rpc.MULTI_GET_MAX_DIGESTS}.")
+        if len(set(tx_digests)) != len(tx_digests):
+            raise _RpcFault(-32602, "The list of digests in the input contain duplicates.")
+        results = []
+        for tx_digest in tx_digests:
+            block = self.store.get(tx_digest)
+            if block is None:
+                results.append({"digest": tx_digest, "errors": ["Could not find the referenced transaction."]})
+            else:
+                results.append(_select_fields(block, options))
+        return results
+
+    def query_events(self, query: dict, cursor: dict = None, limit: int = None, descending: bool = False):
+        events = [event for event in self.store.events() if _event_matches(event, query)]
+        if descending:
+            events.reverse()
+        start = 0
+        if cursor:
+            ids = [(event["id"]["txDigest"], event["id"]["eventSeq"]) for event in events]
+            key = (cursor.get("txDigest"), cursor.get("eventSeq"))
+            start = ids.index(key) + 1 if key in ids else len(ids)
+        limit = min(limit or _QUERY_EVENTS_MAX_LIMIT, _QUERY_EVENTS_MAX_LIMIT)
+        page = events[start:start + limit]
+        return {
+            "data": page,
+            "nextCursor": page[-1]["id"] if page else cursor,
+            "hasNextPage": start + limit < len(events),
+        }
+
+    def get_reference_gas_price(self):
+        return "1000"
+
+    def _fund(self, owner: str):
+        """地址第一次出现时发放 3 个各 10 SUI 的 Gas 对象（调用方持有锁）。"""
+        if owner in self._funded:
+            return
+        self._funded.add(owner)
+        for i in range(3):
+            object_id = "0x" + hashlib.sha256(f"coin:{owner}:{i}".encode()).hexdigest()
+            self._coins[object_id] = {"owner": owner, "version": 1, "balance": 10_000_000_000}
+
+    def get_coins(self, owner: str, coin_type: str = None, cursor: str = None, limit: int = None):
+        owner = _normalize_address(owner)
+        with self._lock:
+            self._fund(owner)
+            owned = sorted((object_id, dict(coin)) for object_id, coin in self._coins.items() if coin["owner"] == owner)
+        start = int(cursor) if cursor else 0
+        limit = limit or 50
+        page = owned[start:start + limit]
+        data = [{"coinType": coin_type or "0x2::sui::SUI", "coinObjectId": object_id,
+                 "version": str(coin["version"]), "digest": _coin_digest(object_id, coin["version"]),
+                 "balance": str(coin["balance"]), "previousTransaction": ""} for object_id, coin in page]
+        has_next = start + limit < len(owned)
+        return {"data": data, "nextCursor": str(start + limit) if has_next else None, "hasNextPage": has_next}
+
+    def get_balance(self, owner: str, coin_type: str = None):
+        owner = _normalize_address(owner)
+        with self._lock:
+            self._fund(owner)
+            owned = [coin["balance"] for coin in self._coins.values() if coin["owner"] == owner]
+        return {"coinType": coin_type or "0x2::sui::SUI", "coinObjectCount": len(owned),
+                "totalBalance": str(sum(owned)), "lockedBalance": {}}
+
+    def multi_get_objects(self, object_ids: list, options: dict = None):
+        """只返回发布时创建的 UpgradeCap（其 package 字段指向对应的包），其余对象视为不存在。"""
+        results = []
+        with self._lock:
+            for object_id in object_ids:
+                cap = self._upgrade_caps.get(object_id)
+                if cap is None:
+                    results.append({"error": {"code": "notExists", "object_id": object_id}})
+                    continue
+                data = {"objectId": object_id, "version": str(cap["version"]),
+                        "digest": _coin_digest(object_id, cap["version"]), "type": "0x2::package::UpgradeCap"}
+                if (options or {}).get("showContent"):
+                    data["content"] = {"dataType": "moveObject", "type": "0x2::package::UpgradeCap",
+                                       "hasPublicTransfer": True,
+                                       "fields": {"id": {"id": object_id}, "package": cap["package"],
+                                                  "policy": 0, "version": "1"}}
+                results.append({"data": data})
+        return results
+
+    def _execute(self, raw: bytes, commit: bool) -> tuple:
+        """
+        按账本执行交易，返回 (effects, objectChanges)。对象不存在、不属于发送者或版本不是最新时
+        按全节点的行为拒绝交易；commit 为 False 时（预执行）不修改账本。
+        """
+        tx = _parse_transaction(raw)
+        sender, tx_digest = tx["sender"], transaction.transaction_digest(raw)
+        with self._lock:
+            self._fund(sender)
+            refs = tx["gas_payment"] + [value for kind, value in tx["inputs"] if kind == "object"]
+            for ref in refs:
+                coin = self._coins.get(ref["objectId"])
+                if coin is None or coin["owner"] != sender:
+                    raise _RpcFault(-32002, f"Object {ref['objectId']} not found or not owned by {sender}.")
+                if coin["version"] != ref["version"] or _coin_digest(ref["objectId"], coin["version"]) != ref["digest"]:
+                    raise _RpcFault(-32002, f"Transaction needs to be rejected: object {ref['objectId']} version "
+                                            f"{ref['version']} is not available for consumption, "
+                                            f"current version: {coin['version']}.")
+            coins = {ref["objectId"]: dict(self._coins[ref["objectId"]]) for ref in refs}
+            gas_id = tx["gas_payment"][0]["objectId"]
+            # 多个 Gas 对象先合并到第一个
+            smashed = [ref["objectId"] for ref in tx["gas_payment"][1:]]
+            for object_id in smashed:
+                coins[gas_id]["balance"] += coins[object_id]["balance"]
+                coins[object_id]["balance"] = 0
+            if coins[gas_id]["balance"] < tx["gas_budget"]:
+                raise _RpcFault(-32002, f"Balance of gas object {gas_id} is lower than the needed amount: "
+                                        f"{tx['gas_budget']}.")
+
+            gas_used = _gas_used(raw)
+            used = int(gas_used["computationCost"]) + int(gas_used["storageCost"])
+            created, deleted, published = {}, [], []
+            error = None
+            if used > tx["gas_budget"]:
+                error = "InsufficientGas"
+                gas_used = dict(gas_used, storageCost="0", storageRebate="0", nonRefundableStorageFee="0")
+            else:
+                trial = {object_id: dict(coin) for object_id, coin in coins.items()}
+                try:
+                    created, deleted, published = self._run_commands(tx, tx_digest, trial, gas_id)
+                    coins = trial
+                except _RpcFault as e:
+                    error = e.message
+            deleted = deleted + smashed
+            net = int(gas_used["computationCost"]) + int(gas_used["storageCost"]) - int(gas_used["storageRebate"])
+            coins[gas_id]["balance"] -= net
+
+            # 交易修改的对象取得同一个新版本（输入对象的最大版本 + 1）
+            version = max(ref["version"] for ref in refs) + 1
+            changes = []
+            for object_id, coin in coins.items():
+                if object_id in deleted:
+                    changes.append({"type": "deleted", "sender": sender, "objectId": object_id, "version": str(version)})
+                    continue
+                coin["version"] = version
+                changes.append({"type": "mutated", "sender": sender, "owner": {"AddressOwner": coin["owner"]},
+                                "objectType": "0x2::coin::Coin<0x2::sui::SUI>", "objectId": object_id,
+                                "version": str(version), "digest": _coin_digest(object_id, version)})
+            for object_id, coin in created.items():
+                coin["version"] = version
+                changes.append({"type": "created", "sender": sender, "owner": {"AddressOwner": coin["owner"]},
+                                "objectType": "0x2::coin::Coin<0x2::sui::SUI>", "objectId": object_id,
+                                "version": str(version), "digest": _coin_digest(object_id, version)})
+            upgrade_caps = {}
+            for package_id in published:
+                cap_id = "0x" + hashlib.sha256(f"upgrade_cap:{package_id}".encode()).hexdigest()
+                upgrade_caps[cap_id] = {"package": package_id, "owner": sender, "version": version}
+                changes.append({"type": "published", "packageId": package_id, "version": "1",
+                                "digest": tx_digest, "modules": []})
+                changes.append({"type": "created", "sender": sender, "owner": {"AddressOwner": sender},
+                                "objectId": cap_id, "objectType": "0x2::package::UpgradeCap",
+                                "version": str(version), "digest": _coin_digest(cap_id, version)})
+            effects = {
+                "messageVersion": "v1",
+                "status": {"status": "failure", "error": error} if error else {"status": "success"},
+                "transactionDigest": tx_digest,
+                "gasUsed": gas_used,
+                "gasObject": {"owner": {"AddressOwner": sender},
+                              "reference": {"objectId": gas_id, "version": version,
+                                            "digest": _coin_digest(gas_id, version)}},
+            }
+            if commit:
+                for object_id, coin in coins.items():
+                    if object_id in deleted:
+                        self._coins.pop(object_id, None)
+                    else:
+                        self._coins[object_id] = coin
+                self._coins.update(created)
+                self._upgrade_caps.update(upgrade_caps)
+            return effects, changes
+
+    def _run_commands(self, tx: dict, tx_digest: str, coins: dict, gas_id: str) -> tuple:
+        """在 coins 的副本上执行命令，返回 (新建的对象, 删除的对象 ID, 发布的 Package ID)。"""
+        inputs, created, deleted, published, results = tx["inputs"], {}, [], [], []
+
+        def coin_of(arg: tuple) -> str:
+            if arg[0] == "gas":
+                return gas_id
+            if arg[0] == "input" and inputs[arg[1]][0] == "object":
+                return inputs[arg[1]][1]["objectId"]
+            if arg[0] == "nested" and arg[1] < len(results) and arg[2] < len(results[arg[1]]):
+                return results[arg[1]][arg[2]]
+            raise _RpcFault(-32002, f"Invalid coin argument {arg}.")
+
+        def pure_of(arg: tuple) -> bytes:
+            if arg[0] != "input" or inputs[arg[1]][0] != "pure":
+                raise _RpcFault(-32002, f"Invalid pure argument {arg}.")
+            return inputs[arg[1]][1]
+
+        for index, command in enumerate(tx["commands"]):
+            kind = command[0]
+            results.append([])
+            if kind == "split":
+                source = coin_of(command[1])
+                pool = created if source in created else coins
+                for j, arg in enumerate(command[2]):
+                    amount = int.from_bytes(pure_of(arg), "little")
+                    if pool[source]["balance"] < amount:
+                        raise _RpcFault(-32002, "InsufficientCoinBalance")
+                    pool[source]["balance"] -= amount
+                    object_id = "0x" + hashlib.sha256(f"split:{tx_digest}:{index}:{j}".encode()).hexdigest()
+                    created[object_id] = {"owner": tx["sender"], "version": 0, "balance": amount}
+                    results[index].append(object_id)
+            elif kind == "merge":
+                target = coin_of(command[1])
+                for arg in command[2]:
+                    source = coin_of(arg)
+                    if source == target or source == gas_id:
+                        raise _RpcFault(-32002, "Invalid merge source.")
+                    pool = created if source in created else coins
+                    (created if target in created else coins)[target]["balance"] += pool[source]["balance"]
+                    if source in created:
+                        del created[source]
+                    else:
+                        deleted.append(source)
+            elif kind == "transfer":
+                recipient = pure_of(command[2])
+                for arg in command[1]:
+                    if arg[0] == "result" and tx["commands"][arg[1]][0] == "publish":
+                        continue  # UpgradeCap 默认就属于发送者
+                    object_id = coin_of(arg)
+                    (created if object_id in created else coins)[object_id]["owner"] = "0x" + recipient.hex()
+            elif kind == "publish":
+                published.append("0x" + hashlib.sha256(f"package:{tx_digest}:{len(published)}".encode()).hexdigest())
+        return created, deleted, published
+
+    def dry_run_transaction_block(self, tx_bytes: str):
+        effects, changes = self._execute(_decode_tx_bytes(tx_bytes), commit=False)
+        return {"effects": effects, "events": [], "objectChanges": changes, "balanceChanges": [], "input": {}}
+
+    def execute_transaction_block(self, tx_bytes: str, signatures: list, options: dict = None, request_type: str = None):
+        if not signatures:
+            raise _RpcFault(-32602, "Invalid params: signatures must not be empty.")
+        raw = _decode_tx_bytes(tx_bytes)
+        effects, changes = self._execute(raw, commit=True)
+        block = self.store.add_executed(effects["transactionDigest"], effects, changes)
+        return _select_fields(block, options)
+
+    _METHODS = {
+        "sui_getChainIdentifier": get_chain_identifier,
+        "sui_getTransactionBlock": get_transaction_block,
+        "sui_multiGetTransactionBlocks": multi_get_transaction_blocks,
+        "suix_queryEvents": query_events,
+        "suix_getReferenceGasPrice": get_reference_gas_price,
+        "suix_getCoins": get_coins,
+        "suix_getBalance": get_balance,
+        "sui_multiGetObjects": multi_get_objects,
+        "sui_dryRunTransactionBlock": dry_run_transaction_block,
+        "sui_executeTransactionBlock": execute_transaction_block,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，与真实全节点的 keep-alive 行为一致
+    node: MockSuiNode = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status = self.node.inject()
+        if status is not None:
+            self._send(status, {"error": "injected"})
+            return
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send(200, {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}})
+            return
+        self._send(200, self.node.handle(request))
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, self.node.stats())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # socketserver 默认的监听队列只有 5：压测时异步客户端同时建立的连接会被内核丢弃，客户端 1 秒后才重发 SYN
+    request_queue_size = 128
+
+
+def _load_fixtures(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return list(data.values()) if isinstance(data, dict) else data
+
+
+def serve(args) -> int:
+    verification = None
+    if os.path.exists(args.spec):
+        verification = spec.load_spec(args.spec)
+    else:
+        logger.warning(f"未找到校验规则 {args.spec}，合成交易使用 challenge::FlagEvent 且不带字段。")
+    context = {"github_id": args.github_id, "move_flag": args.move_flag}
+    fixtures = _load_fixtures(args.fixtures) if args.fixtures else []
+    store = TransactionStore(args.package_id, verification, context, fixtures, args.event_pool)
+
+    _Handler.node = MockSuiNode(store, args.latency_ms, args.jitter_ms, args.error_rate,
+                                args.throttle_rate, args.hang_rate, args.hang_ms)
+    server = _Server((args.host, args.port), _Handler)
+    logger.info(f"模拟 Sui 全节点已启动: http://{args.host}:{args.port}，Package ID: {args.package_id}，"
+                f"fixture 交易 {len(fixtures)} 笔，事件池 {len(store.events())} 条")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def record(args) -> int:
+    client = rpc.SuiRpcClient(endpoints=[args.endpoint] if args.endpoint else None)
+    blocks = []
+    try:
+        for start in range(0, len(args.digests), rpc.MULTI_GET_MAX_DIGESTS):
+            chunk = args.digests[start:start + rpc.MULTI_GET_MAX_DIGESTS]
+            fetched = client.call("sui_multiGetTransactionBlocks", [chunk, _FULL_OPTIONS]) or []
+            blocks.extend(block for block in fetched if block and not block.get("errors"))
+    except rpc.RpcError as e:
+        print(f"录制失败: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(blocks, f, ensure_ascii=False, indent=2)
+    print(f"已录制 {len(blocks)}/{len(args.digests)} 笔交易到 {args.out}", file=sys.stderr)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="本地模拟的 Sui JSON-RPC 服务。")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="启动模拟节点")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=9000)
+    serve_parser.add_argument("--fixtures", help="录制的交易（JSON 数组或 {哈希: 交易} 对象）")
+    serve_parser.add_argument("--spec", default=os.path.join("move_contract", "verify.toml"),
+                              help="生成合成交易所依据的 verify.toml")
+    serve_parser.add_argument("--package-id", default=MOCK_PACKAGE_ID, help="合成交易的 Package ID")
+    serve_parser.add_argument("--github-id", default=os.getenv("GITHUB_ID", "0x0_DEFAULT_GH_ID"))
+    serve_parser.add_argument("--move-flag", default=os.getenv("MOVE_CONTRACT_FLAG", ""))
+    serve_parser.add_argument("--event-pool", type=int, default=0, help="供 suix_queryEvents 查询的合成交易数")
+    serve_parser.add_argument("--latency-ms", type=float, default=0, help="每个请求的固定延迟")
+    serve_parser.add_argument("--jitter-ms", type=float, default=0, help="在固定延迟上叠加的随机延迟上限")
+    serve_parser.add_argument("--error-rate", type=float, default=0, help="返回 HTTP 503 的概率")
+    serve_parser.add_argument("--throttle-rate", type=float, default=0, help="返回 HTTP 429 的概率")
+    serve_parser.add_argument("--hang-rate", type=float, default=0, help="挂起请求的概率（用于触发客户端超时）")
+    serve_parser.add_argument("--hang-ms", type=float, default=30000, help="挂起的时长")
+
+    record_parser = commands.add_parser("record", help="从全节点录制交易为 fixture")
+    record_parser.add_argument("digests", nargs="+", help="交易哈希")
+    record_parser.add_argument("--out", required=True, help="输出文件")
+    record_parser.add_argument("--endpoint", help="全节点地址，缺省使用 SUI_RPC_ENDPOINT")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    return serve(args) if args.command == "serve" else record(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
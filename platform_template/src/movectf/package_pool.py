@@ -0,0 +1,207 @@
+"""
+预发布的合约包池。
+
+`sui client publish` 需要编译、签名、提交并等待终结，耗时数秒；同一批用户同时点击“开始挑战”时更慢。
+开启后，后台线程提前发布 PACKAGE_POOL_SIZE 个当前合约的包并记录 package_id 与交易哈希，
+部署时直接从池中取出一个（毫秒级），池随后在后台异步补充到目标数量；
+PACKAGE_POOL_BATCH_SIZE 大于 1 时每个交易发布多个包，分摊签名、提交与等待终结的开销。
+
+池中的每个包都记录了发布时的合约内容哈希，合约源码变化后旧包不会再被取出。
+设置 PACKAGE_POOL_PATH 后池保存在 JSON 文件中（文件锁保护），服务重启后仍可使用；
+多个进程或挂载同一目录的多个容器可共享一个池，同一时间只有一个进程在补充。
+"""
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 池中保持的预发布包数量，0 表示关闭（每个包都会消耗一次发布的 Gas）
+PACKAGE_POOL_SIZE = int(os.getenv("PACKAGE_POOL_SIZE", "0"))
+
+# 池文件路径，留空只保存在进程内存中
+PACKAGE_POOL_PATH = os.getenv("PACKAGE_POOL_PATH", "")
+
+# 预发布包的最长保留时间（秒），0 表示不过期（测试网重置后旧包失效，可据此设置）
+PACKAGE_POOL_MAX_AGE = float(os.getenv("PACKAGE_POOL_MAX_AGE", "0"))
+
+# 每个补充交易最多发布的包数（协议限制单个交易最多 5 个）
+PACKAGE_POOL_BATCH_SIZE = int(os.getenv("PACKAGE_POOL_BATCH_SIZE", "1"))
+
+# 发布失败后等待多久再重试（秒）
+PACKAGE_POOL_RETRY_INTERVAL = float(os.getenv("PACKAGE_POOL_RETRY_INTERVAL", "30"))
+
+
+class PackagePool:
+    """
+    预发布包池。publish_fn(count) 发布 count 个包，返回与 deploy.publish_packages 相同格式的结果字典。
+    """
+
+    def __init__(self, publish_fn, contract_hash: str, target: int = PACKAGE_POOL_SIZE, path: str = PACKAGE_POOL_PATH,
+                 batch_size: int = PACKAGE_POOL_BATCH_SIZE):
+        self.publish_fn = publish_fn
+        self.contract_hash = contract_hash
+        self.target = target
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._acquired = 0
+        self._misses = 0
+        self._published = 0
+        self._failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.target > 0
+
+    def start(self):
+        """启动后台补充线程。未开启池时不做任何事。"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._refill_loop, name="package-pool", daemon=True)
+        self._thread.start()
+        logger.info(f"预发布合约池已启动，目标数量: {self.target}，存储: {self.path or '内存'}")
+
+    def acquire(self):
+        """
+        取出一个预发布的包，返回 {"success": True, "package_id", "transaction_hash", "published_at", "created_objects",
+        "from_pool": True}；
+        池为空或未开启时返回 None，调用方应回退到同步发布。
+        """
+        if not self.enabled:
+            return None
+        with self._locked() as entries:
+            entry = entries.popleft() if entries else None
+        self._wake.set()  # 通知后台线程补充
+        if entry is None:
+            self._misses += 1
+            logger.warning("预发布合约池为空，回退到同步发布。")
+            return None
+        self._acquired += 1
+        logger.info(f"从预发布合约池取出包 {entry['package_id']}。")
+        return {
+            "success": True,
+            "package_id": entry["package_id"],
+            "transaction_hash": entry["transaction_hash"],
+            "published_at": entry["published_at"],
+            "created_objects": entry.get("created_objects", []),
+            "from_pool": True,
+        }
+
+    def size(self) -> int:
+        with self._locked() as entries:
+            return len(entries)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "target": self.target,
+            "batch_size": self.batch_size,
+            "size": self.size() if self.enabled else 0,
+            "acquired": self._acquired,
+            "misses": self._misses,
+            "published": self._published,
+            "failures": self._failures,
+        }
+
+    def _usable(self, entry: dict, now: float) -> bool:
+        if entry.get("contract_hash") != self.contract_hash:
+            return False
+        return not PACKAGE_POOL_MAX_AGE or now - entry.get("published_at", 0) < PACKAGE_POOL_MAX_AGE
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        在锁内读取并修改池的内容（deque）。只保留仍对应当前合约且未过期的包；
+        文件模式下用文件锁与其他进程互斥，修改后原子地写回。
+        """
+        with self._lock:
+            if not self.path:
+                now = time.time()
+                self._entries = deque(entry for entry in self._entries if self._usable(entry, now))
+                yield self._entries
+                return
+
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(self.path, encoding="utf-8") as f:
+                            stored = json.load(f)
+                    except (OSError, ValueError):
+                        stored = []
+                    now = time.time()
+                    entries = deque(entry for entry in stored if self._usable(entry, now))
+                    yield entries
+                    # 其他合约版本的包保留在文件中，供对应版本的服务使用
+                    others = [entry for entry in stored if entry.get("contract_hash") != self.contract_hash]
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(others + list(entries), f)
+                    os.replace(tmp_path, self.path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextlib.contextmanager
+    def _refill_lease(self):
+        """文件模式下保证同一时间只有一个进程在发布补充；拿不到时产出 False。"""
+        if not self.path:
+            yield True
+            return
+        with open(self.path + ".refill", "a") as lease_file:
+            try:
+                fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lease_file, fcntl.LOCK_UN)
+
+    def _refill_loop(self):
+        while True:
+            try:
+                missing = self.target - self.size()
+                if missing <= 0:
+                    self._wake.wait()
+                    self._wake.clear()
+                    continue
+                with self._refill_lease() as leader:
+                    # 其他进程正在补充，稍后再检查
+                    result = self.publish_fn(min(missing, self.batch_size)) if leader else None
+            except Exception as e:
+                logger.critical(f"预发布合约池补充时发生意外错误: {e}", exc_info=True)
+                result = {"success": False, "error": str(e)}
+
+            if result is None:
+                self._wake.wait(PACKAGE_POOL_RETRY_INTERVAL)
+                self._wake.clear()
+            elif result["success"]:
+                packages = result["packages"]
+                self._published += len(packages)
+                with self._locked() as entries:
+                    for package in packages:
+                        entries.append({
+                            "package_id": package["package_id"],
+                            "transaction_hash": package["transaction_hash"],
+                            "published_at": package.get("published_at", time.time()),
+                            "created_objects": package.get("created_objects", []),
+                            "contract_hash": self.contract_hash,
+                        })
+                    size = len(entries)
+                logger.info(f"预发布合约池已补充 {', '.join(package['package_id'] for package in packages)}，"
+                            f"当前 {size}/{self.target}。")
+            else:
+                self._failures += 1
+                logger.error(f"预发布合约失败，{PACKAGE_POOL_RETRY_INTERVAL:.0f} 秒后重试: {result.get('error')}")
+                time.sleep(PACKAGE_POOL_RETRY_INTERVAL)
@@ -0,0 +1,85 @@
+"""
+RPC 调用的容错策略：截止时间预算、带抖动的指数退避重试、熔断器。
+
+每次校验有一个总的时间预算（截止时间），重试与每次尝试的超时都从预算中扣除，
+而不是每次都使用固定的超时；预算不足以再等一次退避时直接放弃。
+熔断器记录每个端点的连续失败，连续失败达到阈值后在冷却期内不再向其发请求，
+所有端点都处于熔断状态时立即失败，避免在全节点故障期间堆积等待中的请求。
+"""
+import random
+import time
+
+_CLOSED = "closed"
+_OPEN = "open"
+_HALF_OPEN = "half_open"
+
+
+class Deadline:
+    """单次调用的时间预算。"""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, budget: float):
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def attempt_timeout(self, cap: float) -> float:
+        """本次尝试可用的超时：不超过单次尝试上限，也不超过剩余预算。"""
+        return min(cap, self.remaining())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """第 attempt 次重试（从 0 开始）前的等待时间，使用 full jitter，避免大量客户端同时重试。"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    单个端点的熔断器。
+
+    closed：正常放行；连续失败 threshold 次后进入 open，cooldown 秒内拒绝请求；
+    冷却结束后进入 half_open，只放行一个探测请求，其余请求被拒绝（转到其他端点或立即失败），
+    探测结果成功则恢复 closed，失败则重新 open。探测请求 cooldown 秒内没有结果
+    （如放行后并未实际发出）时再放行下一个探测。
+    非线程安全，由调用方加锁。
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = _CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_at = None  # half_open 时放行的探测请求的时间
+        self.trips = 0
+
+    def allow(self, now: float) -> bool:
+        if self.state == _CLOSED:
+            return True
+        if self.state == _OPEN:
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = _HALF_OPEN
+            self.probe_at = None
+        if self.probe_at is not None and now - self.probe_at < self.cooldown:
+            return False
+        self.probe_at = now
+        return True
+
+    def record(self, ok: bool, now: float):
+        self.probe_at = None
+        if ok:
+            self.state = _CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state == _HALF_OPEN or (self.threshold > 0 and self.failures >= self.threshold):
+            if self.state != _OPEN:
+                self.trips += 1
+            self.state = _OPEN
+            self.opened_at = now
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
@@ -0,0 +1,476 @@
+"""
+Sui JSON-RPC 客户端。
+
+所有题目服务共享同一个带 keep-alive 连接池的 HTTP 会话，
+避免每次校验交易都重新与全节点建立 TCP+TLS 连接。
+
+可配置多个全节点端点：客户端记录每个端点的延迟与错误率，把请求路由到最健康的端点，
+失败时转到次优端点；开启对冲后，主请求超过 p95 延迟仍未返回时会向次优端点再发一次，
+取先返回的结果，使测试网抖动期间的尾延迟保持有界。
+
+每次调用在一个总的时间预算内完成：超时、网络错误、429 与 5xx 会以带抖动的指数退避重试，
+端点连续失败后被熔断，所有端点都熔断时立即抛出 RpcUnavailable（见 resilience.py）。
+"""
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import cache_key, tx_cache
+from .decode import RESPONSE_DECODERS
+from .resilience import CircuitBreaker, Deadline, backoff_delay
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# SUI 全节点 RPC 端点，优先从环境变量 SUI_RPC_ENDPOINT 获取，否则使用测试网默认值
+RPC_ENDPOINT = os.getenv("SUI_RPC_ENDPOINT", "https://fullnode.testnet.sui.io:443")
+
+# 多个全节点端点（逗号分隔），设置后覆盖 SUI_RPC_ENDPOINT
+RPC_ENDPOINTS = [url.strip() for url in os.getenv("SUI_RPC_ENDPOINTS", RPC_ENDPOINT).split(",") if url.strip()]
+
+# 单次 RPC 调用的总时间预算（秒），包含重试与退避等待
+RPC_TIMEOUT = float(os.getenv("SUI_RPC_TIMEOUT", "20"))
+
+# 每次尝试的超时上限（秒），避免一次卡住的连接耗尽整个预算
+RPC_ATTEMPT_TIMEOUT = float(os.getenv("SUI_RPC_ATTEMPT_TIMEOUT", "8"))
+
+# 超时、网络错误、429 与 5xx 的最大重试次数
+RPC_MAX_RETRIES = int(os.getenv("SUI_RPC_MAX_RETRIES", "3"))
+
+# 重试退避的基准与上限（毫秒），实际等待在 [0, min(上限, 基准 * 2^n)] 之间随机
+RPC_BACKOFF_BASE = float(os.getenv("SUI_RPC_BACKOFF_BASE_MS", "200")) / 1000
+RPC_BACKOFF_MAX = float(os.getenv("SUI_RPC_BACKOFF_MAX_MS", "3000")) / 1000
+
+# 端点连续失败多少次后熔断（0 表示不熔断），以及熔断的冷却时间（秒）
+RPC_BREAKER_THRESHOLD = int(os.getenv("SUI_RPC_BREAKER_THRESHOLD", "5"))
+RPC_BREAKER_COOLDOWN = float(os.getenv("SUI_RPC_BREAKER_COOLDOWN", "15"))
+
+# 连接池中保持的最大 keep-alive 连接数，应不小于服务的并发线程数
+RPC_POOL_SIZE = int(os.getenv("SUI_RPC_POOL_SIZE", "32"))
+
+# 是否使用 HTTP/2 传输（需要额外安装 httpx[http2]，未安装时自动回退到 requests）
+RPC_HTTP2 = os.getenv("SUI_RPC_HTTP2", "0") == "1"
+
+# 启动时是否预热连接（提前完成 DNS 解析与 TLS 握手）
+RPC_WARMUP = os.getenv("SUI_RPC_WARMUP", "1") == "1"
+
+# 是否开启对冲请求（仅在配置了多个端点时生效）
+RPC_HEDGE = os.getenv("SUI_RPC_HEDGE", "0") == "1"
+
+# 对冲延迟（毫秒），留空则使用主端点最近请求延迟的 p95
+RPC_HEDGE_DELAY_MS = os.getenv("SUI_RPC_HEDGE_DELAY_MS", "")
+
+# 端点返回 429 后暂停向其路由的时间（秒）
+RPC_THROTTLE_COOLDOWN = float(os.getenv("SUI_RPC_THROTTLE_COOLDOWN", "5"))
+
+# 全节点 sui_multiGetTransactionBlocks 单次允许查询的最大交易数
+MULTI_GET_MAX_DIGESTS = 50
+
+# 不允许对冲的方法（有副作用的写操作）
+_NO_HEDGE_METHODS = {"sui_executeTransactionBlock"}
+
+
+class RpcError(Exception):
+    """RPC 调用失败（网络错误、HTTP 错误或响应无法解析）。status 为 HTTP 状态码（如有）。"""
+
+    def __init__(self, message, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RpcTimeout(RpcError):
+    """RPC 调用超时。"""
+
+
+class RpcResponseError(RpcError):
+    """全节点返回了 JSON-RPC error 字段。"""
+
+    def __init__(self, error):
+        super().__init__(error)
+        self.error = error
+
+
+class RpcUnavailable(RpcError):
+    """所有端点都处于熔断状态，请求未发出即失败。消息可直接展示给用户。"""
+
+    def __init__(self):
+        super().__init__("RPC 服务降级：Sui 全节点暂时不可用，请稍后再试。")
+
+
+def is_retryable(error: RpcError) -> bool:
+    """超时、网络错误、429 与 5xx 可以重试；节点返回的 JSON-RPC 错误与其他 4xx 不重试。"""
+    if isinstance(error, (RpcResponseError, RpcUnavailable)):
+        return False
+    return error.status is None or error.status == 429 or error.status >= 500
+
+
+class _RequestsTransport:
+    """基于 requests.Session 的 HTTP/1.1 keep-alive 传输。"""
+
+    name = "http/1.1"
+
+    def __init__(self, pool_size: int, hosts: int):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def post_json(self, url: str, payload: dict, timeout: float, decode=None) -> dict:
+        try:
+            resp = self._session.post(url, json=payload, timeout=timeout)
+            resp.raise_for_status()
+            return decode(resp.content) if decode else resp.json()
+        except requests.exceptions.Timeout as e:
+            raise RpcTimeout(str(e)) from e
+        except requests.exceptions.HTTPError as e:
+            raise RpcError(str(e), status=e.response.status_code) from e
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise RpcError(str(e)) from e
+
+    def close(self):
+        self._session.close()
+
+
+class _HttpxTransport:
+    """基于 httpx 的 HTTP/2 传输，多个请求复用同一条连接。"""
+
+    name = "http/2"
+
+    def __init__(self, pool_size: int, hosts: int):
+        import httpx
+
+        self._httpx = httpx
+        limits = httpx.Limits(max_connections=pool_size * hosts, max_keepalive_connections=pool_size * hosts)
+        self._client = httpx.Client(http2=True, limits=limits)
+
+    def post_json(self, url: str, payload: dict, timeout: float, decode=None) -> dict:
+        try:
+            resp = self._client.post(url, json=payload, timeout=timeout)
+            resp.raise_for_status()
+            return decode(resp.content) if decode else resp.json()
+        except self._httpx.TimeoutException as e:
+            raise RpcTimeout(str(e)) from e
+        except self._httpx.HTTPStatusError as e:
+            raise RpcError(str(e), status=e.response.status_code) from e
+        except (self._httpx.HTTPError, ValueError) as e:
+            raise RpcError(str(e)) from e
+
+    def close(self):
+        self._client.close()
+
+
+def _make_transport(pool_size: int, hosts: int, http2: bool):
+    if http2:
+        try:
+            import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+            return _HttpxTransport(pool_size, hosts)
+        except ImportError:
+            logger.warning("未安装 httpx[http2]，RPC 客户端回退到 HTTP/1.1 keep-alive 连接池。")
+    return _RequestsTransport(pool_size, hosts)
+
+
+class _Endpoint:
+    """单个全节点端点的健康状态：延迟与错误率的指数滑动平均，以及最近的延迟样本。"""
+
+    _ALPHA = 0.2             # 滑动平均的权重
+    _ERROR_HALF_LIFE = 30.0  # 错误率的衰减半衰期（秒），使故障端点在恢复后重新获得流量
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None
+        self.error_rate = 0.0
+        self.updated_at = time.monotonic()
+        self.cooldown_until = 0.0
+        self.samples = deque(maxlen=200)
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker(RPC_BREAKER_THRESHOLD, RPC_BREAKER_COOLDOWN)
+
+    def record(self, elapsed: float, ok: bool, throttled: bool = False):
+        now = time.monotonic()
+        self.requests += 1
+        self.errors += not ok
+        self.error_rate = self._decayed_error_rate(now) * (1 - self._ALPHA) + (0 if ok else self._ALPHA)
+        self.latency = elapsed if self.latency is None else self.latency * (1 - self._ALPHA) + elapsed * self._ALPHA
+        self.updated_at = now
+        if ok:
+            self.samples.append(elapsed)
+        if throttled:
+            self.cooldown_until = now + RPC_THROTTLE_COOLDOWN
+        self.breaker.record(ok, now)
+
+    def _decayed_error_rate(self, now: float) -> float:
+        return self.error_rate * 0.5 ** ((now - self.updated_at) / self._ERROR_HALF_LIFE)
+
+    def score(self, now: float) -> float:
+        """分数越低越健康。尚未测量过延迟的端点优先被探测。"""
+        if now < self.cooldown_until:
+            return math.inf
+        error_rate = self._decayed_error_rate(now)
+        return (self.latency or 0.0) * (1 + 10 * error_rate) + error_rate
+
+    def p95(self):
+        if len(self.samples) < 20:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def snapshot(self, now: float) -> dict:
+        p95 = self.p95()
+        return {
+            "url": self.url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self._decayed_error_rate(now), 4),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "cooling_down": now < self.cooldown_until,
+            "breaker": self.breaker.snapshot(),
+        }
+
+
+class SuiRpcClient:
+    """
+    Sui JSON-RPC 客户端，线程安全，可被所有请求共享。
+    """
+
+    def __init__(self, endpoints: list = None, timeout: float = RPC_TIMEOUT,
+                 pool_size: int = RPC_POOL_SIZE, http2: bool = RPC_HTTP2, hedge: bool = RPC_HEDGE):
+        self.endpoints = [_Endpoint(url) for url in (endpoints or RPC_ENDPOINTS)]
+        self.timeout = timeout
+        self.hedge = hedge and len(self.endpoints) > 1
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._hedges = 0
+        self._retries = 0
+        self._rejected = 0
+        self._transport = _make_transport(pool_size, len(self.endpoints), http2)
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rpc-hedge") if self.hedge else None
+
+    @property
+    def endpoint(self) -> str:
+        """当前最健康的端点地址。"""
+        now = time.monotonic()
+        with self._lock:
+            return min(self.endpoints, key=lambda endpoint: endpoint.score(now)).url
+
+    def call(self, method: str, params: list, timeout: float = None):
+        """
+        调用 JSON-RPC 方法并返回 result 字段。timeout 为本次调用的总时间预算（含重试）。
+        失败时抛出 RpcError（超时为 RpcTimeout，节点返回 error 为 RpcResponseError，
+        所有端点熔断时为 RpcUnavailable）。
+        """
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        deadline = Deadline(timeout or self.timeout)
+        # 交易查询的响应只解码校验用到的字段（见 decode.py）
+        decode = RESPONSE_DECODERS.get(method)
+        attempt = 0
+        while True:
+            ranked = self._ranked()
+            attempt_timeout = deadline.attempt_timeout(RPC_ATTEMPT_TIMEOUT)
+            try:
+                if self.hedge and len(ranked) > 1 and method not in _NO_HEDGE_METHODS:
+                    data = self._post_hedged(ranked[0], ranked[1], payload, attempt_timeout, decode)
+                else:
+                    data = self._post_with_failover(ranked, payload, attempt_timeout, decode)
+                break
+            except RpcError as e:
+                delay = self._retry_delay(method, attempt, e, deadline)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+        if "error" in data:
+            raise RpcResponseError(data["error"])
+        return data.get("result")
+
+    def _retry_delay(self, method: str, attempt: int, error: RpcError, deadline: Deadline):
+        """返回下一次重试前的等待时间；不应重试或剩余预算不足时返回 None。"""
+        if not is_retryable(error) or attempt >= RPC_MAX_RETRIES:
+            return None
+        delay = backoff_delay(attempt, RPC_BACKOFF_BASE, RPC_BACKOFF_MAX)
+        # 等待之后至少还要留出一小段时间给下一次尝试
+        if deadline.remaining() < delay + 0.1:
+            return None
+        with self._lock:
+            self._retries += 1
+        logger.warning(f"RPC 调用 {method} 失败，{delay * 1000:.0f} ms 后第 {attempt + 1} 次重试: {error}")
+        return delay
+
+    def _ranked(self) -> list:
+        """按健康度排序的可用端点；所有端点都处于熔断状态时抛出 RpcUnavailable。"""
+        now = time.monotonic()
+        with self._lock:
+            available = [endpoint for endpoint in self.endpoints if endpoint.breaker.allow(now)]
+            if not available:
+                self._rejected += 1
+                raise RpcUnavailable()
+            return sorted(available, key=lambda endpoint: endpoint.score(now))
+
+    def _post(self, endpoint: _Endpoint, payload: dict, timeout: float, decode=None) -> dict:
+        start = time.monotonic()
+        try:
+            data = self._transport.post_json(endpoint.url, payload, timeout, decode)
+        except RpcError as e:
+            with self._lock:
+                endpoint.record(time.monotonic() - start, ok=False, throttled=e.status == 429)
+            raise
+        with self._lock:
+            endpoint.record(time.monotonic() - start, ok=True)
+        return data
+
+    def _post_with_failover(self, ranked: list, payload: dict, timeout: float, decode=None) -> dict:
+        # 最健康的端点失败时，转到次优端点再试一次
+        for i, endpoint in enumerate(ranked[:2]):
+            try:
+                return self._post(endpoint, payload, timeout, decode)
+            except RpcError as e:
+                if i == len(ranked[:2]) - 1:
+                    raise
+                logger.warning(f"RPC 端点 {endpoint.url} 请求失败，切换到 {ranked[i + 1].url}: {e}")
+
+    def _hedge_delay(self, endpoint: _Endpoint, timeout: float) -> float:
+        if RPC_HEDGE_DELAY_MS:
+            return float(RPC_HEDGE_DELAY_MS) / 1000
+        p95 = endpoint.p95()
+        # 样本不足时使用 1 秒作为保守的对冲延迟
+        return min(max(p95, 0.05), timeout) if p95 is not None else min(1.0, timeout)
+
+    def _post_hedged(self, primary: _Endpoint, secondary: _Endpoint, payload: dict, timeout: float,
+                     decode=None) -> dict:
+        first = self._hedge_pool.submit(self._post, primary, payload, timeout, decode)
+        done, _ = wait([first], timeout=self._hedge_delay(primary, timeout))
+        if done and first.exception() is None:
+            return first.result()
+
+        # 主请求超过对冲延迟仍未返回（或已失败），向次优端点发出第二个请求，取先成功的结果
+        with self._lock:
+            self._hedges += 1
+        second = self._hedge_pool.submit(self._post, secondary, payload, timeout, decode)
+        error = None
+        for future in as_completed([first, second]):
+            try:
+                return future.result()
+            except RpcError as e:
+                error = e
+        raise error
+
+    def warm_up(self):
+        """向每个端点发送一个轻量请求，提前建立连接并获得初始延迟。失败只记录日志。"""
+        payload = {"jsonrpc": "2.0", "id": 0, "method": "sui_getChainIdentifier", "params": []}
+        for endpoint in self.endpoints:
+            try:
+                chain_id = self._post(endpoint, payload, 5).get("result")
+                logger.info(f"RPC 连接预热完成 ({self._transport.name})。端点: {endpoint.url}, 链 ID: {chain_id}")
+            except RpcError as e:
+                logger.warning(f"RPC 连接预热失败，将在首次请求时重试。端点: {endpoint.url}: {e}")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "hedge": self.hedge,
+                "hedged_requests": self._hedges,
+                "retries": self._retries,
+                "breaker_rejections": self._rejected,
+                "endpoints": [endpoint.snapshot(now) for endpoint in self.endpoints],
+            }
+
+    def close(self):
+        self._transport.close()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+# 同一交易（哈希 + 查询选项）的在途查询表
+_tx_flight = SingleFlight()
+
+
+def get_client() -> SuiRpcClient:
+    """返回进程内共享的 RPC 客户端，首次调用时创建。"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SuiRpcClient()
+    return _client
+
+
+def warm_up_in_background():
+    """在后台线程中预热连接，不阻塞应用启动。"""
+    if not RPC_WARMUP:
+        return
+    threading.Thread(target=get_client().warm_up, name="rpc-warmup", daemon=True).start()
+
+
+def get_transaction_block(tx_digest: str, options: dict, timeout: float = None):
+    """
+    通过共享客户端调用 sui_getTransactionBlock，返回交易结果字典。
+    已终结的成功交易会写入 tx_cache，之后的相同查询不再访问全节点；
+    同一交易的并发查询只发出一次 RPC，所有调用者共享结果。
+    返回的字典可能被多个请求共享，调用方不应修改它。
+    """
+    result = tx_cache.get(tx_digest, options)
+    if result is not None:
+        return result
+    return _tx_flight.do(cache_key(tx_digest, options), _fetch_transaction_block, tx_digest, options, timeout)
+
+
+def _fetch_transaction_block(tx_digest: str, options: dict, timeout: float):
+    result = get_client().call("sui_getTransactionBlock", [tx_digest, options], timeout=timeout)
+    tx_cache.put(tx_digest, options, result)
+    return result
+
+
+def multi_get_transaction_blocks(tx_digests: list, options: dict, timeout: float = None) -> dict:
+    """
+    通过 sui_multiGetTransactionBlocks 批量查询交易，返回 {交易哈希: 交易结果或 None}。
+    已缓存的交易不再查询；单次调用超过 MULTI_GET_MAX_DIGESTS 时自动分块。
+    任一分块 RPC 失败时抛出 RpcError。
+    """
+    results = {}
+    missing = []
+    for tx_digest in dict.fromkeys(tx_digests):  # 全节点拒绝包含重复哈希的请求
+        cached = tx_cache.get(tx_digest, options)
+        if cached is not None:
+            results[tx_digest] = cached
+        else:
+            missing.append(tx_digest)
+
+    for start in range(0, len(missing), MULTI_GET_MAX_DIGESTS):
+        chunk = missing[start:start + MULTI_GET_MAX_DIGESTS]
+        fetched = get_client().call("sui_multiGetTransactionBlocks", [chunk, options], timeout=timeout) or []
+        # 按返回结果中的 digest 对应，未找到的交易可能被省略或带有 errors 字段
+        by_digest = {item.get("digest"): item for item in fetched if item and not item.get("errors")}
+        for tx_digest in chunk:
+            result = by_digest.get(tx_digest)
+            if result is not None:
+                tx_cache.put(tx_digest, options, result)
+            results[tx_digest] = result
+    return results
+
+
+def stats() -> dict:
+    """汇总 RPC 层的运行统计，供 /stats 路由返回。"""
+    return {
+        "rpc": get_client().stats(),
+        "tx_cache": tx_cache.stats(),
+        "tx_singleflight": _tx_flight.stats(),
+    }
@@ -0,0 +1,134 @@
+"""
+生产环境的服务启动器。
+
+容器入口默认以此启动题目服务（取代 app.run 的开发服务器，后者是单进程并且带有重载器与调试器）：
+gunicorn 管理预先 fork 的 worker 进程，默认每个 worker 以多个线程运行 Flask（gthread），
+也可以改用 uvicorn 运行 ASGI 入口（asgi，提交校验走异步路径）。
+
+    # 在题目的 /app 目录下
+    python3 -m movectf.serve
+    SERVE_WORKERS=2 SERVE_THREADS=64 SUI_RPC_POOL_SIZE=64 python3 -m movectf.serve
+
+- 预加载（SERVE_PRELOAD=1）：master 进程导入 app.py、读取题目配置并编译校验规则，worker 通过 fork 共享这些内存；
+  后台线程与网络连接不能跨 fork 使用，由每个 worker 启动后各自创建（见 movectf/engine.py 的 start）。
+- 优雅退出：收到 SIGTERM 后停止接受新连接，在 SERVE_GRACEFUL_TIMEOUT 秒内处理完进行中的请求，
+  并等待进行中的部署任务结束后再退出（入口脚本需以 exec 启动，使信号送达本进程）。
+"""
+import argparse
+import importlib
+import logging
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+
+from . import engine, state
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 监听地址
+SERVE_BIND = os.getenv("SERVE_BIND", "0.0.0.0:8080")
+
+# 题目应用模块（导出 app 与 asgi_app）
+SERVE_APP = os.getenv("SERVE_APP", "app")
+
+# worker 进程数；多个 worker 之间的部署互斥见 movectf/deploy_lock.py，
+# 部署记录、部署任务进度与交易缓存通过共享状态后端（STATE_BACKEND 见 movectf/state.py）在 worker 之间共享
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "1"))
+
+# worker 类型：gthread（多线程 WSGI）或 asgi（uvicorn，提交校验不占用线程）
+SERVE_WORKER_CLASS = os.getenv("SERVE_WORKER_CLASS", "gthread")
+
+# gthread worker 的线程数，即每个 worker 同时处理的请求数；RPC 连接池（SUI_RPC_POOL_SIZE）应不小于此值。
+# ASGI worker 中执行 Flask 路由的线程数见 movectf/asgi.py 的 ASGI_WSGI_THREADS
+SERVE_THREADS = int(os.getenv("SERVE_THREADS", "32"))
+
+# 是否在 master 进程中预加载应用（1 开启）
+SERVE_PRELOAD = os.getenv("SERVE_PRELOAD", "1") == "1"
+
+# HTTP keep-alive 连接的空闲超时（秒）
+SERVE_KEEPALIVE = int(os.getenv("SERVE_KEEPALIVE", "5"))
+
+# 优雅退出时等待进行中的请求与部署任务的最长时间（秒）
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+
+# worker 无响应多久后被 master 重启（秒）
+SERVE_TIMEOUT = int(os.getenv("SERVE_TIMEOUT", "60"))
+
+# 每个 worker 处理多少个请求后重启（带随机抖动），0 表示不重启
+SERVE_MAX_REQUESTS = int(os.getenv("SERVE_MAX_REQUESTS", "0"))
+
+_WORKER_CLASSES = {
+    "asgi": "uvicorn_worker.UvicornWorker",
+    "gthread": "gthread",
+}
+
+
+def _post_fork(server, worker):
+    engine.start()
+
+
+def _worker_exit(server, worker):
+    engine.stop(SERVE_GRACEFUL_TIMEOUT)
+
+
+class ChallengeServer(BaseApplication):
+    """以 gunicorn 运行题目应用模块。"""
+
+    def __init__(self, module: str, options: dict):
+        self.module = module
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        if self.cfg.preload_app:
+            # 预加载时 create_app 只加载配置，后台线程与连接在每个 worker fork 之后启动
+            engine.defer_start()
+            self.cfg.set("post_fork", _post_fork)
+        self.cfg.set("worker_exit", _worker_exit)
+
+    def load(self):
+        module = importlib.import_module(self.module)
+        return module.asgi_app if self.options["worker_class"] == _WORKER_CLASSES["asgi"] else module.app
+
+
+def options(workers: int = SERVE_WORKERS, worker_class: str = SERVE_WORKER_CLASS, bind: str = SERVE_BIND) -> dict:
+    """gunicorn 配置项。"""
+    if worker_class not in _WORKER_CLASSES:
+        raise ValueError(f"SERVE_WORKER_CLASS 只能是 {' / '.join(_WORKER_CLASSES)}，而不是 {worker_class}。")
+    return {
+        "bind": bind,
+        "workers": max(1, workers),
+        "worker_class": _WORKER_CLASSES[worker_class],
+        "threads": SERVE_THREADS,
+        "preload_app": SERVE_PRELOAD,
+        "keepalive": SERVE_KEEPALIVE,
+        "graceful_timeout": SERVE_GRACEFUL_TIMEOUT,
+        "timeout": SERVE_TIMEOUT,
+        "max_requests": SERVE_MAX_REQUESTS,
+        "max_requests_jitter": SERVE_MAX_REQUESTS // 10,
+        "accesslog": None,
+        "errorlog": "-",
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="以生产配置启动题目服务。")
+    parser.add_argument("--app", default=SERVE_APP, help="题目应用模块（默认 app）")
+    parser.add_argument("--bind", default=SERVE_BIND, help="监听地址")
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS, help="worker 进程数")
+    parser.add_argument("--worker-class", default=SERVE_WORKER_CLASS, choices=sorted(_WORKER_CLASSES))
+    args = parser.parse_args(argv)
+
+    if args.workers > 1 and state.STATE_BACKEND == "memory":
+        logger.warning("STATE_BACKEND=memory 时各 worker 的部署状态互不可见，多个 worker 应使用 sqlite 或 kv 后端。")
+    sys.path.insert(0, os.getcwd())
+    ChallengeServer(args.app, options(args.workers, args.worker_class, args.bind)).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
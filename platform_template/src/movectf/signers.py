@@ -0,0 +1,184 @@
+"""
+发布使用的签名地址集合。
+
+同一地址的自有对象交易需要依次排队，单个地址的发布吞吐有上限。设置 DEPLOY_SIGNERS 后，进程内发布从 CLI
+密钥库加载多个 Ed25519 密钥，把发布分散到这些地址上：
+
+- 带实例键（如用户的 GitHub ID）的发布总是交给同一个地址（按实例键做 rendezvous 哈希，增减地址时只有少数实例
+  改变归属），发布时创建的 UpgradeCap 等对象因此都归同一地址所有；
+- 没有实例键的发布（如预发布池的补充）交给进行中发布最少的地址。
+
+每个地址记录余额与进行中的发布数：余额低于单次发布所需的地址暂不分配（实例改由哈希顺序中的下一个地址发布），
+进行中的发布达到 DEPLOY_SIGNER_MAX_IN_FLIGHT 时，后来的发布等待该地址空闲。
+余额每 DEPLOY_SIGNER_BALANCE_TTL 秒从全节点刷新一次，期间按每次发布的 Gas 消耗扣减。
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from . import keystore, rpc
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 发布使用的地址：留空只用 CLI 的活跃地址，all 使用密钥库中全部 Ed25519 密钥，或逗号分隔的地址列表
+DEPLOY_SIGNERS = os.getenv("DEPLOY_SIGNERS", "")
+
+# 每个地址同时进行的发布数上限（未开启 Gas 对象池时同一地址的发布仍串行提交）
+DEPLOY_SIGNER_MAX_IN_FLIGHT = int(os.getenv("DEPLOY_SIGNER_MAX_IN_FLIGHT", "4"))
+
+# 余额低于此值（MIST）的地址不再分配发布，0 表示只要求不低于本次发布的 Gas 预算
+DEPLOY_SIGNER_MIN_BALANCE = int(os.getenv("DEPLOY_SIGNER_MIN_BALANCE", "0"))
+
+# 从全节点刷新地址余额的间隔（秒）
+DEPLOY_SIGNER_BALANCE_TTL = float(os.getenv("DEPLOY_SIGNER_BALANCE_TTL", "60"))
+
+# 等待空闲地址的最长时间（秒）
+DEPLOY_SIGNER_WAIT_TIMEOUT = float(os.getenv("DEPLOY_SIGNER_WAIT_TIMEOUT", "60"))
+
+_SUI_COIN_TYPE = "0x2::sui::SUI"
+
+
+class SignerUnavailable(Exception):
+    """没有余额足够的地址，或在 DEPLOY_SIGNER_WAIT_TIMEOUT 内没有地址空闲。"""
+
+
+class SignerSet:
+    """一组签名地址及其余额、进行中的发布数。signers 为 keystore.Ed25519Signer 列表。"""
+
+    def __init__(self, signers: list, max_in_flight: int = DEPLOY_SIGNER_MAX_IN_FLIGHT,
+                 min_balance: int = DEPLOY_SIGNER_MIN_BALANCE):
+        self.signers = {signer.address: signer for signer in signers}
+        self.max_in_flight = max_in_flight
+        self.min_balance = min_balance
+        self._cond = threading.Condition()
+        self._state = {address: {"balance": None, "checked_at": 0.0, "in_flight": 0, "publishes": 0, "spent": 0}
+                       for address in self.signers}
+        self._waits = 0
+
+    def order(self, instance: str = None) -> list:
+        """
+        实例键对应的地址顺序（rendezvous 哈希，第一个为该实例的固定地址）；
+        没有实例键时按进行中的发布数从少到多排列。
+        """
+        if instance is None:
+            return sorted(self.signers, key=lambda address: self._state[address]["in_flight"])
+        return sorted(self.signers, reverse=True,
+                      key=lambda address: hashlib.sha256(f"{instance}:{address}".encode()).digest())
+
+    @contextlib.contextmanager
+    def lease(self, instance: str = None, gas_budget: int = 0, timeout: float = DEPLOY_SIGNER_WAIT_TIMEOUT):
+        """为一次发布选择地址，产出 Ed25519Signer；期间计入该地址进行中的发布数。"""
+        required = max(self.min_balance, gas_budget)
+        self._refresh_balances()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                address = self._choose(instance, required)
+                if address is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SignerUnavailable(f"{timeout:.0f} 秒内没有空闲的发布地址（实例 {instance}）。")
+                self._waits += 1
+                self._cond.wait(remaining)
+            self._state[address]["in_flight"] += 1
+        try:
+            yield self.signers[address]
+        finally:
+            with self._cond:
+                self._state[address]["in_flight"] -= 1
+                self._state[address]["publishes"] += 1
+                self._cond.notify_all()
+
+    def charge(self, address: str, amount: int):
+        """按一次交易的净 Gas 消耗扣减地址的已知余额。"""
+        with self._cond:
+            state = self._state.get(address)
+            if state is None:
+                return
+            state["spent"] += amount
+            if state["balance"] is not None:
+                state["balance"] -= amount
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "signers": {address: dict(state) for address, state in self._state.items()},
+                "max_in_flight": self.max_in_flight,
+                "waits": self._waits,
+            }
+
+    def _choose(self, instance: str, required: int):
+        """调用方持有锁。余额足够的地址中，实例的固定地址忙时等待，只有余额不足时才顺延到下一个地址。"""
+        funded = [address for address in self.order(instance)
+                  if self._state[address]["balance"] is None or self._state[address]["balance"] >= required]
+        if not funded:
+            raise SignerUnavailable(f"所有发布地址的余额都低于 {required} MIST，请为部署地址充值。")
+        candidates = funded[:1] if instance is not None else funded
+        for address in candidates:
+            if self._state[address]["in_flight"] < self.max_in_flight:
+                return address
+        return None
+
+    def _refresh_balances(self):
+        """刷新过期的余额记录；查询失败时保留原值（未知余额视为足够）。"""
+        now = time.time()
+        with self._cond:
+            stale = [address for address, state in self._state.items()
+                     if now - state["checked_at"] >= DEPLOY_SIGNER_BALANCE_TTL]
+        for address in stale:
+            try:
+                balance = int(rpc.get_client().call("suix_getBalance", [address, _SUI_COIN_TYPE])["totalBalance"])
+            except (rpc.RpcError, KeyError, TypeError, ValueError) as e:
+                logger.warning(f"查询发布地址 {address} 的余额失败: {e}")
+                continue
+            with self._cond:
+                self._state[address]["balance"] = balance
+                self._state[address]["checked_at"] = now
+                self._cond.notify_all()
+
+
+def load_signers(spec: str = DEPLOY_SIGNERS, config_path: str = keystore.SUI_CLIENT_CONFIG) -> list:
+    """按 DEPLOY_SIGNERS 的格式从 CLI 密钥库加载签名密钥，失败时抛出 keystore.KeystoreError。"""
+    if not spec:
+        return [keystore.load_signer(config_path=config_path)]
+    path = keystore.keystore_path(config_path)
+    available = keystore.load_signers(path)
+    if spec.strip().lower() == "all":
+        if not available:
+            raise keystore.KeystoreError(f"密钥库 {path} 中没有 Ed25519 密钥。")
+        return [available[address] for address in sorted(available)]
+    signers = []
+    for address in spec.split(","):
+        address = address.strip().lower()
+        if not address:
+            continue
+        if address not in available:
+            raise keystore.KeystoreError(f"密钥库 {path} 中没有地址 {address} 的 Ed25519 密钥。")
+        signers.append(available[address])
+    return signers
+
+
+_signer_set = None
+_signer_set_lock = threading.Lock()
+
+
+def get_signer_set() -> SignerSet:
+    """进程内共享的签名地址集合，首次调用时加载。"""
+    global _signer_set
+    with _signer_set_lock:
+        if _signer_set is None:
+            signers = load_signers()
+            _signer_set = SignerSet(signers)
+            logger.info(f"发布使用 {len(signers)} 个地址: {', '.join(signer.address for signer in signers)}")
+        return _signer_set
+
+
+def stats() -> dict:
+    with _signer_set_lock:
+        signer_set = _signer_set
+    return signer_set.stats() if signer_set is not None else {"signers": {}}
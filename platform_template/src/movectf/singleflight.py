@@ -0,0 +1,62 @@
+"""
+单飞（single-flight）请求合并。
+
+同一个键的并发调用只会真正执行一次：第一个到达的调用者执行函数，
+其余调用者等待它完成并共享同一个结果（或同一个异常）。
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    进程内的在途请求表，线程安全。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        执行 fn(*args, **kwargs)；若相同 key 的调用正在进行，则等待并复用其结果。
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self._stats["executed"] += 1
+            else:
+                leader = False
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
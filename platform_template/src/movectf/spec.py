@@ -0,0 +1,167 @@
+"""
+声明式的交易校验规则。
+
+每个题目在 Move.toml 旁放置一个 verify.toml，描述提交的交易需要满足的条件
+（交易状态、交易类型、第一个事件的类型与字段）。服务启动时将其编译为匹配器，
+并据此推导出 sui_getTransactionBlock 所需的最小查询选项，避免拉取校验用不到的字段。
+
+verify.toml 示例：
+
+    [transaction]
+    status = "success"                  # effects.status 必须为 success（需要 showEffects）
+    kind = "ProgrammableTransaction"    # 交易类型（需要 showInput）
+
+    [event]                             # 校验第一个事件（需要 showEvents）
+    module = "challenge"
+    name = "FlagEvent"                  # 事件类型须为 {部署的 package_id}::challenge::FlagEvent
+
+    [[event.fields]]
+    name = "github_id"
+    equals = "$github_id"               # 以 $ 开头的值在校验时从上下文中取
+    message = "交易中的 GitHub ID 不匹配。请确认你的 GitHub ID ({expected}) 与交易相关联。"
+
+字段规则为 equals = <值>、present = true（不为 null）、truthy = true（真值）三者之一；
+message 可使用 {name}、{expected}、{actual} 占位符。
+"""
+import logging
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
+logger = logging.getLogger(__name__)
+
+_FIELD_CHECKS = ("equals", "present", "truthy")
+
+
+class FieldRule:
+    """编译后的单个事件字段规则。"""
+
+    __slots__ = ("name", "check", "value", "variable", "message")
+
+    def __init__(self, name: str, check: str, value, message: str):
+        self.name = name
+        self.check = check
+        # "$github_id" 之类的值在校验时才从上下文中解析
+        self.variable = value[1:] if isinstance(value, str) and value.startswith("$") else None
+        self.value = value
+        self.message = message or "交易事件中的字段 {name} 不符合要求 (实际: {actual})。"
+
+    def expected(self, context: dict):
+        return context.get(self.variable) if self.variable else self.value
+
+    def matches(self, actual, context: dict) -> bool:
+        if self.check == "equals":
+            return actual == self.expected(context)
+        if self.check == "present":
+            return actual is not None
+        return bool(actual)
+
+
+class VerificationSpec:
+    """
+    编译后的交易校验规则。check() 的返回值与 check_submission 一致：(是否通过, 消息)。
+    """
+
+    def __init__(self, status: str, kind: str, event_module: str, event_name: str, fields: list, source: str = ""):
+        self.status = status
+        self.kind = kind
+        self.event_suffix = f"::{event_module}::{event_name}" if event_module and event_name else None
+        self.fields = fields
+        self.source = source
+        self.transaction_options = self._required_options()
+
+    def _required_options(self) -> dict:
+        """只请求规则实际会读取的字段，缩小每次 RPC 响应与 JSON 解析开销。"""
+        return {
+            "showInput": bool(self.kind),
+            "showRawInput": False,
+            "showEffects": bool(self.status),
+            "showEvents": self.event_suffix is not None or bool(self.fields),
+            "showObjectChanges": False,
+            "showBalanceChanges": False,
+        }
+
+    def check(self, tx_digest: str, tx_details: dict, expected_package_id: str, context: dict) -> tuple[bool, str]:
+        """
+        按规则校验交易详情。context 提供 $变量 的取值（如 github_id、move_flag）。
+        """
+        # 1. 检查交易执行是否成功
+        if self.status:
+            effects = tx_details.get("effects")
+            if not effects or effects.get("status", {}).get("status") != self.status:
+                logger.warning(f"交易 {tx_digest} 状态不成功或效果缺失。")
+                return False, "交易执行失败，请检查你的交易是否成功。"
+
+        # 2. 检查交易类型
+        if self.kind:
+            transaction = tx_details.get("transaction", {}).get("data", {}).get("transaction", {})
+            if transaction.get("kind") != self.kind:
+                logger.warning(f"交易 {tx_digest} 不是可编程交易或缺失交易详情。")
+                return False, "提交的交易不是有效的 Move 可编程交易。"
+
+        if self.event_suffix is None and not self.fields:
+            return True, "交易校验成功。"
+
+        # 3. 检查第一个事件的类型（Package ID）与字段
+        events = tx_details.get("events") or []
+        if not events:
+            logger.warning(f"交易 {tx_digest} 中未找到任何事件。")
+            return False, "交易未产生任何事件，无法验证。"
+
+        if self.event_suffix is not None:
+            expected_type = f"{expected_package_id}{self.event_suffix}"
+            event_type = events[0].get("type")
+            if event_type != expected_type:
+                logger.warning(f"PackageID 或事件类型不匹配：交易 {tx_digest}。预期: {expected_type}, 实际: {event_type}")
+                return False, f"交易中的 PackageID 或事件类型不匹配。请确认你的交易调用了部署的合约并触发了正确的事件 ({expected_type})。"
+
+        parsed_json = events[0].get("parsedJson")
+        if not parsed_json:
+            logger.warning(f"交易 {tx_digest} 的第一个事件中未找到 parsedJson。")
+            return False, "交易事件数据不完整，无法验证。"
+
+        for rule in self.fields:
+            actual = parsed_json.get(rule.name)
+            if not rule.matches(actual, context):
+                expected = rule.expected(context)
+                logger.warning(f"字段 {rule.name} 不匹配：交易 {tx_digest}。预期: {expected}, 实际: {actual}")
+                return False, rule.message.format(name=rule.name, expected=expected, actual=actual)
+            logger.info(f"交易 {tx_digest} 中的 {rule.name} 匹配: {actual}")
+
+        return True, "交易校验成功。"
+
+
+def compile_spec(raw: dict, source: str = "") -> VerificationSpec:
+    """把解析后的 TOML 字典编译为 VerificationSpec，规则不合法时抛出 ValueError。"""
+    transaction = raw.get("transaction", {})
+    event = raw.get("event", {})
+
+    fields = []
+    for i, entry in enumerate(event.get("fields", [])):
+        checks = [check for check in _FIELD_CHECKS if check in entry]
+        if not entry.get("name") or len(checks) != 1:
+            raise ValueError(f"{source}: event.fields[{i}] 需要 name 以及 equals / present / truthy 中的一项。")
+        fields.append(FieldRule(entry["name"], checks[0], entry[checks[0]], entry.get("message")))
+
+    if bool(event.get("module")) != bool(event.get("name")):
+        raise ValueError(f"{source}: event.module 与 event.name 必须同时设置。")
+
+    return VerificationSpec(
+        status=transaction.get("status", "success"),
+        kind=transaction.get("kind", "ProgrammableTransaction"),
+        event_module=event.get("module"),
+        event_name=event.get("name"),
+        fields=fields,
+        source=source,
+    )
+
+
+def load_spec(path: str) -> VerificationSpec:
+    """读取并编译 verify.toml。文件缺失或规则不合法时直接抛出异常，使服务启动失败。"""
+    with open(path, "rb") as f:
+        spec = compile_spec(tomllib.load(f), source=path)
+    enabled = [name for name, on in spec.transaction_options.items() if on]
+    logger.info(f"已加载交易校验规则 {path}，RPC 查询选项: {', '.join(enabled)}")
+    return spec
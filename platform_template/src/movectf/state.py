@@ -0,0 +1,398 @@
+"""
+多个 worker 进程共享的状态后端。
+
+部署记录（movectf/deployment_store.py）、部署任务的进度（movectf/jobs.py）与已终结交易的查询结果
+（movectf/cache.py）通过同一个键值接口读写，后端由 STATE_BACKEND 选择：
+
+- memory：只保存在本进程内存中，适合单 worker 或本地调试；
+- sqlite：同一台机器上的 worker 共享一个数据库文件（WAL 模式），容器重启后仍然有效；
+- kv：本地键值服务，代替 Redis 等外部服务，所有 worker 连接同一个服务进程：
+
+    python3 -m movectf.state serve --bind 127.0.0.1:7390 &
+    STATE_BACKEND=kv python3 -m movectf.serve
+
+值为可 JSON 序列化的对象，可以带过期时间。读写失败只记录日志：读取视为未命中，写入被放弃。
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 共享状态后端：memory / sqlite / kv
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+
+# sqlite 后端的数据库路径，留空时改用 memory（容器重建后仍要保留部署记录时应放在挂载的卷上）
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "state.db")
+
+# kv 后端的服务地址
+STATE_KV_ADDRESS = os.getenv("STATE_KV_ADDRESS", "127.0.0.1:7390")
+
+# ReadCache 中未命中结果的缓存时间（秒），即其他 worker 写入的记录最迟多久后可见
+STATE_MISS_TTL = float(os.getenv("STATE_MISS_TTL", "1"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+)
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at)"
+
+# 每写入多少次清理一次过期记录
+_CLEANUP_INTERVAL = 256
+
+
+def _encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _expires_at(ttl: float = None):
+    return time.time() + ttl if ttl else None
+
+
+class MemoryBackend:
+    """只在本进程内有效的后端。值以 JSON 文本保存，读取时返回副本。"""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # 键 -> (JSON 文本, 过期时间)
+        self._writes = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._live(key)
+        return json.loads(entry[0]) if entry else None
+
+    def set(self, key: str, value, ttl: float = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value, ttl: float = None) -> tuple:
+        """键不存在（或已过期）时写入，返回 (当前的值, 是否由本次写入)。"""
+        with self._lock:
+            entry = self._live(key)
+            if entry is not None:
+                return json.loads(entry[0]), False
+            self._store(key, value, ttl)
+        return value, True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def describe(self) -> str:
+        return "memory"
+
+    def _store(self, key: str, value, ttl: float):
+        """写入一个键（调用方持有锁），并定期清理其他已过期的键，过期后不再读取的键不会一直占用内存。"""
+        self._entries[key] = (_encode(value), _expires_at(ttl))
+        self._writes += 1
+        if self._writes % _CLEANUP_INTERVAL == 0:
+            now = time.time()
+            expired = [k for k, (_, expires_at) in self._entries.items() if expires_at is not None and expires_at <= now]
+            for k in expired:
+                del self._entries[k]
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+
+class SqliteBackend:
+    """同一台机器上的多个进程共享的 SQLite 后端。"""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writes = 0
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(_INDEX)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接，避免跨线程共享连接；WAL 模式下 NORMAL 提交时不再 fsync，断电最多丢失最近的写入
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str):
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT value, expires_at FROM state WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"读取共享状态 {self.path} 失败: {e}")
+            return None
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float = None):
+        self._write("INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (key, _encode(value), _expires_at(ttl)))
+
+    def add(self, key: str, value, ttl: float = None) -> tuple:
+        """键不存在（或已过期）时写入，返回 (当前的值, 是否由本次写入)。写入失败时返回 (value, False)。"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM state WHERE key = ? AND expires_at <= ?", (key, time.time()))
+                    cursor = conn.execute("INSERT OR IGNORE INTO state VALUES (?, ?, ?)",
+                                          (key, _encode(value), _expires_at(ttl)))
+                    if cursor.rowcount:
+                        return value, True
+                    row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"写入共享状态 {self.path} 失败: {e}")
+            return value, False
+        return json.loads(row[0]), False
+
+    def delete(self, key: str):
+        self._write("DELETE FROM state WHERE key = ?", (key,))
+
+    def describe(self) -> str:
+        return f"sqlite:{self.path}"
+
+    def _write(self, sql: str, params: tuple):
+        self._writes += 1
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(sql, params)
+                    if self._writes % _CLEANUP_INTERVAL == 0:
+                        conn.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"写入共享状态 {self.path} 失败: {e}")
+
+
+class KvBackend:
+    """
+    本地键值服务（KvServer）的客户端。每个线程保持一条 TCP 连接，
+    请求与响应各为一行 JSON；连接断开时重连一次。
+    """
+
+    shared = True
+
+    def __init__(self, address: str):
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self._local = threading.local()
+
+    def get(self, key: str):
+        return self._call("get", None, key=key)
+
+    def set(self, key: str, value, ttl: float = None):
+        self._call("set", None, key=key, value=value, ttl=ttl)
+
+    def add(self, key: str, value, ttl: float = None) -> tuple:
+        """键不存在（或已过期）时写入，返回 (当前的值, 是否由本次写入)。服务不可用时返回 (value, False)。"""
+        return tuple(self._call("add", (value, False), key=key, value=value, ttl=ttl))
+
+    def delete(self, key: str):
+        self._call("delete", None, key=key)
+
+    def describe(self) -> str:
+        return f"kv:{self.address[0]}:{self.address[1]}"
+
+    def _call(self, op: str, default, **fields):
+        request = (_encode(dict(fields, op=op)) + "\n").encode("utf-8")
+        for attempt in range(2):
+            try:
+                stream = self._stream()
+                stream.write(request)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("连接已关闭")
+            except OSError as e:
+                self._close()
+                if attempt:
+                    logger.error(f"共享状态服务 {self.describe()} 不可用: {e}")
+                    return default
+                continue
+            response = json.loads(line)
+            if not response.get("ok"):
+                logger.error(f"共享状态服务 {self.describe()} 处理 {op} 失败: {response.get('error')}")
+                return default
+            return response.get("result")
+
+    def _stream(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection(self.address, timeout=5)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            stream = self._local.stream = sock.makefile("rwb")
+            self._local.sock = sock
+        return stream
+
+    def _close(self):
+        for name in ("stream", "sock"):
+            item = getattr(self._local, name, None)
+            if item is not None:
+                try:
+                    item.close()
+                except OSError:
+                    pass
+                setattr(self._local, name, None)
+
+
+class _KvHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        store = self.server.store
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                op = request["op"]
+                if op == "get":
+                    result = store.get(request["key"])
+                elif op == "set":
+                    result = store.set(request["key"], request["value"], request.get("ttl"))
+                elif op == "add":
+                    result = store.add(request["key"], request["value"], request.get("ttl"))
+                elif op == "delete":
+                    result = store.delete(request["key"])
+                else:
+                    raise ValueError(f"未知操作 {op}")
+                response = {"ok": True, "result": result}
+            except (KeyError, TypeError, ValueError) as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write((_encode(response) + "\n").encode("utf-8"))
+
+
+class KvServer(socketserver.ThreadingTCPServer):
+    """本地键值服务：数据只保存在服务进程的内存中，服务重启后清空。"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address: tuple):
+        self.store = MemoryBackend()
+        super().__init__(address, _KvHandler)
+
+
+class ReadCache:
+    """
+    共享状态的进程内读缓存，用于写入后不再变化的记录（如某份合约的部署结果）：
+    读到的值一直缓存；未命中的结果缓存 miss_ttl 秒，其他进程写入的记录最迟 miss_ttl 秒后可见。
+    """
+
+    def __init__(self, backend, miss_ttl: float = STATE_MISS_TTL):
+        self.backend = backend
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._values = {}
+        self._misses = {}  # 键 -> 未命中的时间
+        self._stats = {"hits": 0, "reads": 0}
+
+    def get(self, key: str, fresh: bool = False):
+        """fresh 为 True 时跳过未命中的缓存，直接读取后端（如在部署锁内确认是否已部署）。"""
+        now = time.monotonic()
+        with self._lock:
+            if key in self._values:
+                self._stats["hits"] += 1
+                return self._values[key]
+            missed_at = self._misses.get(key)
+            if not fresh and missed_at is not None and now - missed_at < self.miss_ttl:
+                self._stats["hits"] += 1
+                return None
+        value = self.backend.get(key)
+        with self._lock:
+            self._stats["reads"] += 1
+            if value is None:
+                self._misses[key] = now
+            else:
+                self._values[key] = value
+                self._misses.pop(key, None)
+        return value
+
+    def set(self, key: str, value):
+        self.backend.set(key, value)
+        with self._lock:
+            self._values[key] = value
+            self._misses.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, cached=len(self._values), backend=self.backend.describe())
+
+
+def open_backend(kind: str = STATE_BACKEND):
+    """按 STATE_BACKEND 创建后端；sqlite 数据库无法打开时回退到 memory。"""
+    if kind == "kv":
+        return KvBackend(STATE_KV_ADDRESS)
+    if kind == "sqlite" and STATE_DB_PATH:
+        try:
+            return SqliteBackend(STATE_DB_PATH)
+        except sqlite3.Error as e:
+            logger.error(f"无法打开共享状态数据库 {STATE_DB_PATH}，状态只保存在进程内存中: {e}")
+    elif kind not in ("memory", "sqlite"):
+        raise ValueError(f"STATE_BACKEND 只能是 memory / sqlite / kv，而不是 {kind}。")
+    return MemoryBackend()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """本进程共用的后端（首次调用时创建）。"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = open_backend()
+        return _backend
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="共享状态的本地键值服务。")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="启动键值服务")
+    serve_parser.add_argument("--bind", default=STATE_KV_ADDRESS, help="监听地址")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    host, port = args.bind.rsplit(":", 1)
+    server = KvServer((host, int(port)))
+    logger.info(f"共享状态服务已启动: {args.bind}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
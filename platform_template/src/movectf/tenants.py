@@ -0,0 +1,272 @@
+"""
+多租户模式的租户表。
+
+默认每个选手一个容器：入口脚本写入 /uuid 与 /flag，服务启动时读入进程。开启 MULTI_TENANT 后，
+一个进程为多个选手服务：平台通过管理接口为每个选手创建租户（GitHub ID 与根 Flag），得到一个随机令牌，
+选手访问 /t/<令牌>/ 下的题目页面；每个租户部署自己的合约，部署结果也记录在租户表中。
+
+租户表保存在 SQLite（WAL 模式）中，多个 worker 进程共享同一个数据库文件；TENANT_DB_PATH 留空时只保存在进程内存中。
+已部署合约的租户读取后在进程内缓存 TENANT_CACHE_TTL 秒；尚未部署的租户每次从数据库读取，其他进程完成的部署因此立即可见，
+在其他进程中删除的租户最迟 TENANT_CACHE_TTL 秒后不再可用。
+
+租户部署的合约保存为不可变的 Deployment（Package ID 与交易哈希），部署完成时整体替换（compare-and-set）：
+请求线程读取 tenant.deployment 得到一致的快照，不需要加锁，也不会读到不成对的 Package ID 与交易哈希。
+"""
+import hmac
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# --- 配置常量 ---
+# 是否开启多租户模式（1 开启）
+MULTI_TENANT = os.getenv("MULTI_TENANT", "0") == "1"
+
+# 租户数据库路径，留空只保存在进程内存中（多 worker 部署时应使用文件）
+TENANT_DB_PATH = os.getenv("TENANT_DB_PATH", "tenants.db")
+
+# 已部署合约的租户在进程内的缓存时间（秒），即其他 worker 删除的租户最迟多久后失效
+TENANT_CACHE_TTL = float(os.getenv("TENANT_CACHE_TTL", "5"))
+
+# 租户管理接口的访问令牌（请求头 Authorization: Bearer <token>），未设置时接口关闭
+TENANT_ADMIN_TOKEN = os.getenv("TENANT_ADMIN_TOKEN", "")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tenants (
+    token TEXT PRIMARY KEY,
+    challenge TEXT NOT NULL,
+    github_id TEXT NOT NULL,
+    root_flag TEXT NOT NULL,
+    package_id TEXT,
+    transaction_hash TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (challenge, github_id)
+)
+"""
+
+_COLUMNS = ("token", "challenge", "github_id", "root_flag", "package_id", "transaction_hash", "created_at")
+
+# 部署结果的写入互斥。只有写入方（部署完成、恢复部署状态）获取，读取方直接读取 tenant.deployment
+_publish_lock = threading.Lock()
+
+
+class Deployment(NamedTuple):
+    """题目实例部署的合约。transaction_hash 可能为空（如由 DEPLOYED_PACKAGE_ID 预置）。"""
+    package_id: str
+    transaction_hash: str = None
+
+
+class Tenant:
+    """
+    一个选手的题目实例。token 为空字符串表示单租户模式下由 /uuid 与 /flag 确定的默认实例。
+    deployment 为已部署的合约（尚未部署时为 None），只通过 publish 替换；读取方应只读取一次并使用该快照。
+    """
+
+    __slots__ = ("token", "challenge", "github_id", "root_flag", "deployment", "created_at")
+
+    def __init__(self, token: str, challenge: str, github_id: str, root_flag: str, package_id: str = None,
+                 transaction_hash: str = None, created_at: float = None):
+        self.token = token
+        self.challenge = challenge
+        self.github_id = github_id
+        self.root_flag = root_flag
+        self.deployment = Deployment(package_id, transaction_hash) if package_id else None
+        self.created_at = created_at if created_at is not None else time.time()
+
+    @property
+    def package_id(self):
+        deployment = self.deployment
+        return deployment.package_id if deployment else None
+
+    @property
+    def transaction_hash(self):
+        deployment = self.deployment
+        return deployment.transaction_hash if deployment else None
+
+    def publish(self, deployment: Deployment, expected: Deployment = None) -> bool:
+        """
+        当前部署仍为 expected（默认尚未部署）时替换为 deployment，返回是否替换。
+        其他线程已先写入时返回 False，调用方应改用 self.deployment 中的结果。
+        """
+        with _publish_lock:
+            if self.deployment is not expected:
+                return False
+            self.deployment = deployment
+            return True
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+
+class TenantStore:
+    """租户表的读写。path 为空时只保存在进程内存中。"""
+
+    def __init__(self, path: str = TENANT_DB_PATH, cache_ttl: float = TENANT_CACHE_TTL):
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._memory = {}  # 内存模式下的全部租户
+        self._cache = {}  # 令牌 -> (已部署合约的租户, 缓存时间)
+        self._hits = 0
+        self._reads = 0
+        if not path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"无法打开租户数据库 {path}，租户只保存在进程内存中: {e}")
+            self.path = ""
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接，避免跨线程共享连接
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, challenge: str, github_id: str, root_flag: str) -> tuple[Tenant, bool]:
+        """
+        为选手创建租户，返回 (租户, 是否新建)。同一题目下相同 GitHub ID 的租户已存在时返回该租户，
+        平台重试创建请求时不会得到两个实例。
+        """
+        tenant = Tenant(secrets.token_urlsafe(16), challenge, github_id, root_flag)
+        if not self.path:
+            with self._lock:
+                for existing in self._memory.values():
+                    if existing.challenge == challenge and existing.github_id == github_id:
+                        return existing, False
+                self._memory[tenant.token] = tenant
+            return tenant, True
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO tenants VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    tuple(getattr(tenant, name) for name in _COLUMNS),
+                )
+            if cursor.rowcount:
+                logger.info(f"已创建题目 {challenge} 的租户，GitHub ID: {github_id}")
+                return tenant, True
+            row = conn.execute("SELECT * FROM tenants WHERE challenge = ? AND github_id = ?",
+                               (challenge, github_id)).fetchone()
+        finally:
+            conn.close()
+        return Tenant(**dict(row)), False
+
+    def get(self, challenge: str, token: str):
+        """按令牌查找租户，不存在（或属于其他题目）时返回 None。"""
+        with self._lock:
+            self._reads += 1
+            if not self.path:
+                tenant = self._memory.get(token)
+            else:
+                tenant, cached_at = self._cache.get(token, (None, 0))
+                if tenant is not None and time.monotonic() - cached_at >= self.cache_ttl:
+                    # 过期后重新读取数据库，其他进程删除的租户不会一直可用
+                    del self._cache[token]
+                    tenant = None
+                if tenant is not None:
+                    self._hits += 1
+        if tenant is None and self.path:
+            tenant = self._load(token)
+        if tenant is None or tenant.challenge != challenge:
+            return None
+        return tenant
+
+    def set_deployment(self, tenant: Tenant, deployment: Deployment):
+        """
+        记录租户部署的合约。租户已有部署结果（其他线程先写入）时保留已有结果；
+        写入数据库失败只记录日志（部署结果仍由 deployment_store 持久化）。
+        """
+        if not tenant.publish(deployment):
+            return
+        if not self.path:
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("UPDATE tenants SET package_id = ?, transaction_hash = ? WHERE token = ?",
+                                 (deployment.package_id, deployment.transaction_hash, tenant.token))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"写入租户 {tenant.github_id} 的部署结果失败: {e}")
+            return
+        with self._lock:
+            self._cache[tenant.token] = (tenant, time.monotonic())
+
+    def delete(self, challenge: str, token: str) -> bool:
+        """删除租户（如选手的比赛结束后），返回是否存在。"""
+        with self._lock:
+            self._cache.pop(token, None)
+            if not self.path:
+                tenant = self._memory.get(token)
+                if tenant is None or tenant.challenge != challenge:
+                    return False
+                del self._memory[token]
+                return True
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM tenants WHERE token = ? AND challenge = ?", (token, challenge))
+        finally:
+            conn.close()
+        return cursor.rowcount > 0
+
+    def list(self, challenge: str) -> list:
+        if not self.path:
+            with self._lock:
+                return [tenant for tenant in self._memory.values() if tenant.challenge == challenge]
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM tenants WHERE challenge = ? ORDER BY created_at",
+                                (challenge,)).fetchall()
+        finally:
+            conn.close()
+        return [Tenant(**dict(row)) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": MULTI_TENANT,
+                "storage": self.path or "memory",
+                "cached": len(self._cache) if self.path else len(self._memory),
+                "reads": self._reads,
+                "cache_hits": self._hits,
+            }
+
+    def _load(self, token: str):
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT * FROM tenants WHERE token = ?", (token,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"读取租户数据库 {self.path} 失败: {e}")
+            return None
+        if row is None:
+            return None
+        tenant = Tenant(**dict(row))
+        if tenant.deployment is not None:
+            with self._lock:
+                self._cache[token] = (tenant, time.monotonic())
+        return tenant
+
+
+def is_authorized(auth_header: str) -> bool:
+    """检查请求头中的访问令牌。未配置 TENANT_ADMIN_TOKEN 时一律拒绝。"""
+    if not TENANT_ADMIN_TOKEN or not auth_header:
+        return False
+    return hmac.compare_digest(auth_header, f"Bearer {TENANT_ADMIN_TOKEN}")
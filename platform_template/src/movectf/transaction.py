@@ -0,0 +1,185 @@
+"""
+Sui 交易的 BCS 编码。
+
+只实现发布合约与管理 Gas 对象用到的最小子集：TransactionData::V1 + ProgrammableTransaction，
+命令 Publish、TransferObjects、SplitCoins、MergeCoins，输入 Pure 与自有对象，
+参数 GasCoin / Input / Result / NestedResult。
+编码格式与 `sui client publish` 提交的 txBytes 相同，可直接交给
+sui_executeTransactionBlock 执行；交易摘要按全节点的规则在本地计算，提交前即可得知。
+"""
+import base64
+import hashlib
+
+# BCS 枚举的变体序号（与 sui-types 中的声明顺序一致）
+_TRANSACTION_DATA_V1 = 0
+_KIND_PROGRAMMABLE = 0
+_CALL_ARG_PURE = 0
+_CALL_ARG_OBJECT = 1
+_OBJECT_ARG_IMM_OR_OWNED = 0
+_COMMAND_TRANSFER_OBJECTS = 1
+_COMMAND_SPLIT_COINS = 2
+_COMMAND_MERGE_COINS = 3
+_COMMAND_PUBLISH = 4
+_ARGUMENT_GAS_COIN = 0
+_ARGUMENT_INPUT = 1
+_ARGUMENT_RESULT = 2
+_ARGUMENT_NESTED_RESULT = 3
+_EXPIRATION_NONE = 0
+
+# 单个可编程交易中 Publish / Upgrade 命令数的上限（协议参数 max_publish_or_upgrade_per_ptb）
+MAX_PUBLISH_PER_TRANSACTION = 5
+
+# 签名意图前缀：TransactionData、V0、Sui
+_TRANSACTION_INTENT = bytes([0, 0, 0])
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def b58encode(data: bytes) -> str:
+    n = int.from_bytes(data, "big")
+    out = ""
+    while n:
+        n, r = divmod(n, 58)
+        out = _BASE58_ALPHABET[r] + out
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + out
+
+
+def b58decode(text: str) -> bytes:
+    n = 0
+    for ch in text:
+        n = n * 58 + _BASE58_ALPHABET.index(ch)
+    body = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return b"\0" * (len(text) - len(text.lstrip("1"))) + body
+
+
+def blake2b256(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def address_bytes(address: str) -> bytes:
+    """0x 开头的地址或对象 ID（可省略前导零，如 0x2）转换为 32 字节。"""
+    hex_digits = address[2:] if address.startswith("0x") else address
+    return bytes.fromhex(hex_digits.rjust(64, "0"))
+
+
+def _uleb128(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _u16(n: int) -> bytes:
+    return n.to_bytes(2, "little")
+
+
+def _u64(n: int) -> bytes:
+    return int(n).to_bytes(8, "little")
+
+
+def _bytes(data: bytes) -> bytes:
+    return _uleb128(len(data)) + data
+
+
+def _vector(items: list) -> bytes:
+    return _uleb128(len(items)) + b"".join(items)
+
+
+def _object_ref(ref: dict) -> bytes:
+    # ObjectRef = (ObjectID, SequenceNumber, ObjectDigest)，ObjectDigest 按字节向量编码
+    return address_bytes(ref["objectId"]) + _u64(ref["version"]) + _bytes(b58decode(ref["digest"]))
+
+
+# --- 输入（CallArg） ---
+
+def pure(value: bytes) -> bytes:
+    """Pure 输入，value 为参数值的 BCS 编码。"""
+    return bytes([_CALL_ARG_PURE]) + _bytes(value)
+
+
+def pure_u64(n: int) -> bytes:
+    return pure(_u64(n))
+
+
+def pure_address(address: str) -> bytes:
+    return pure(address_bytes(address))
+
+
+def owned_object(ref: dict) -> bytes:
+    """自有（或不可变）对象输入，ref 为 {"objectId", "version", "digest"}。"""
+    return bytes([_CALL_ARG_OBJECT, _OBJECT_ARG_IMM_OR_OWNED]) + _object_ref(ref)
+
+
+# --- 参数（Argument） ---
+
+GAS_COIN = bytes([_ARGUMENT_GAS_COIN])
+
+
+def input_arg(i: int) -> bytes:
+    return bytes([_ARGUMENT_INPUT]) + _u16(i)
+
+
+def result_arg(i: int) -> bytes:
+    return bytes([_ARGUMENT_RESULT]) + _u16(i)
+
+
+def nested_result_arg(i: int, j: int) -> bytes:
+    return bytes([_ARGUMENT_NESTED_RESULT]) + _u16(i) + _u16(j)
+
+
+# --- 命令（Command） ---
+
+def publish_command(modules: list, dependencies: list) -> bytes:
+    """Publish(模块字节码, 依赖包 ID)。modules 为 base64 字符串。"""
+    return (bytes([_COMMAND_PUBLISH])
+            + _vector([_bytes(base64.b64decode(module)) for module in modules])
+            + _vector([address_bytes(dep) for dep in dependencies]))
+
+
+def transfer_objects_command(objects: list, recipient: bytes) -> bytes:
+    return bytes([_COMMAND_TRANSFER_OBJECTS]) + _vector(objects) + recipient
+
+
+def split_coins_command(coin: bytes, amounts: list) -> bytes:
+    return bytes([_COMMAND_SPLIT_COINS]) + coin + _vector(amounts)
+
+
+def merge_coins_command(target: bytes, sources: list) -> bytes:
+    return bytes([_COMMAND_MERGE_COINS]) + target + _vector(sources)
+
+
+def transaction_data(sender: str, inputs: list, commands: list, gas_payment: list,
+                     gas_price: int, gas_budget: int) -> bytes:
+    """
+    编码 TransactionData::V1。inputs 与 commands 为已编码的输入和命令，
+    gas_payment 为 {"objectId", "version", "digest"} 形式的 Gas 对象引用。
+    """
+    kind = bytes([_KIND_PROGRAMMABLE]) + _vector(inputs) + _vector(commands)
+    gas_data = (_vector([_object_ref(coin) for coin in gas_payment])
+                + address_bytes(sender) + _u64(gas_price) + _u64(gas_budget))
+    return bytes([_TRANSACTION_DATA_V1]) + kind + address_bytes(sender) + gas_data + bytes([_EXPIRATION_NONE])
+
+
+def publish_transaction(sender: str, modules: list, dependencies: list, gas_payment: list,
+                        gas_price: int, gas_budget: int, copies: int = 1) -> bytes:
+    """发布 copies 个相同的包（各自独立的 Package ID）并把它们的 UpgradeCap 转给发送者的交易。"""
+    if not 1 <= copies <= MAX_PUBLISH_PER_TRANSACTION:
+        raise ValueError(f"一个交易最多发布 {MAX_PUBLISH_PER_TRANSACTION} 个包，收到 {copies}。")
+    commands = [publish_command(modules, dependencies) for _ in range(copies)]
+    commands.append(transfer_objects_command([result_arg(i) for i in range(copies)], input_arg(0)))
+    return transaction_data(sender, [pure_address(sender)], commands, gas_payment, gas_price, gas_budget)
+
+
+def signing_digest(tx_bytes: bytes) -> bytes:
+    """签名的消息：带意图前缀的交易数据的 Blake2b-256。"""
+    return blake2b256(_TRANSACTION_INTENT + tx_bytes)
+
+
+def transaction_digest(tx_bytes: bytes) -> str:
+    """交易摘要（base58），与全节点返回的 transactionDigest 一致。"""
+    return b58encode(blake2b256(b"TransactionData::" + tx_bytes))
@@ -0,0 +1,41 @@
+"""多租户模式下 /api/batch_verify 没有当前实例时的处理。"""
+import os
+
+os.environ.setdefault("BATCH_VERIFY_TOKEN", "test-token")
+
+import pytest
+
+from movectf import engine
+
+_TEMPLATE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # 租户表与部署状态的数据库文件写在临时目录中
+    monkeypatch.chdir(tmp_path)
+    config_path = tmp_path / "challenge.toml"
+    config_path.write_text(
+        "[challenge]\n"
+        'name = "challenge"\n'
+        f'contract = "{os.path.join(_TEMPLATE_DIR, "move_contract")}"\n',
+        encoding="utf-8",
+    )
+    challenge = engine.Challenge(engine.load_config(str(config_path)), multi_tenant=True)
+    return challenge.app.test_client()
+
+
+def _post(client, items):
+    return client.post("/api/batch_verify", json={"items": items},
+                       headers={"Authorization": "Bearer test-token"})
+
+
+def test_items_without_ids_are_rejected(client):
+    response = _post(client, ["0xdigest"])
+    assert response.status_code == 400
+    assert "package_id" in response.get_json()["message"]
+
+
+def test_items_missing_github_id_are_rejected(client):
+    response = _post(client, [{"tx_digest": "0xdigest", "package_id": "0x1"}])
+    assert response.status_code == 400